@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+パーサーのベンチマーク
+合成K-fileアーカイブを作成し、BoatRaceAnalyzer と QuickKekkaf2024Processor の
+処理速度（files/s, rows/s）・ピークメモリ・処理段階ごとの時間を計測する
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import queue
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをパスに追加
+project_root = Path(__file__).parent
+sys.path.append(str(project_root))
+
+from src.discovery import iter_kfiles
+from src.synthetic import SyntheticKFileGenerator
+
+
+def peak_rss_mb():
+    """プロセスのピークメモリ使用量（MB、取得できない環境ではNone）"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linuxはキロバイト、macOSはバイト単位
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.Process().memory_info()
+    return getattr(memory, 'peak_wset', memory.rss) / (1024 * 1024)
+
+
+class StageTimer:
+    """処理段階ごとの経過時間を記録"""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def bench_analyzer(data_dir, output_dir, options):
+    """BoatRaceAnalyzer: 解析 → 人間用DataFrame → 機械学習用DataFrame → 保存"""
+    from src.boat_race_analyzer import BoatRaceAnalyzer
+
+    timer = StageTimer()
+    analyzer = BoatRaceAnalyzer(use_mmap=options['mmap'])
+    with timer.stage('parse'):
+        analyzer.process_files(data_dir, parallel=options['parallel'],
+                               max_workers=options['workers'], chunksize=options['chunksize'],
+                               async_io=options['async_io'], files_in_flight=options['files_in_flight'])
+    with timer.stage('human_frame'):
+        analyzer.get_human_readable_data()
+    with timer.stage('ml_frame'):
+        analyzer.get_ml_ready_data()
+    with timer.stage('save'):
+        analyzer.save_analysis_results(output_dir, output_format=options['format'])
+    return len(analyzer.race_data), timer.timings
+
+
+def bench_convert(data_dir, output_dir, options):
+    """QuickKekkaf2024Processor: 解析 → 保存"""
+    from src.convert import QuickKekkaf2024Processor
+
+    timer = StageTimer()
+    processor = QuickKekkaf2024Processor(use_mmap=options['mmap'])
+    with timer.stage('parse'):
+        processor.process_sample_files(data_dir, max_files=None, parallel=options['parallel'],
+                                       max_workers=options['workers'], chunksize=options['chunksize'])
+    with timer.stage('save'):
+        processor.save_sample_dataset(output_dir, output_format=options['format'])
+    return len(processor.race_data), timer.timings
+
+
+TARGETS = {
+    'analyzer': bench_analyzer,
+    'convert': bench_convert
+}
+
+
+def run_target(name, data_dir, files, options, results):
+    """子プロセスで1回分の計測を行う（ピークメモリを対象ごとに分けるため、失敗した場合はエラーを返す）"""
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                rows, timings = TARGETS[name](data_dir, output_dir, options)
+            elapsed = time.perf_counter() - start
+    except Exception as e:
+        results.put({'target': name, 'files': files, 'error': f"{type(e).__name__}: {e}"})
+        return
+    results.put({
+        'target': name,
+        'files': files,
+        'rows': rows,
+        'seconds': elapsed,
+        'files_per_sec': files / elapsed if elapsed else None,
+        'rows_per_sec': rows / elapsed if elapsed else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': timings
+    })
+
+
+def measure(name, data_dir, files, options):
+    """新しいプロセスで計測し、結果を返す（子プロセスが結果を返さずに終了した場合はエラーの結果）"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_target, args=(name, str(data_dir), files, options, results))
+    process.start()
+    result = None
+    while result is None:
+        try:
+            result = results.get(timeout=1)
+        except queue.Empty:
+            if process.is_alive():
+                continue
+            # 終了直前に送られた結果がないか確かめてから、異常終了として扱う
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                result = {'target': name, 'files': files,
+                          'error': f"子プロセスが結果を返さずに終了しました (exit code {process.exitcode})"}
+    process.join()
+    return result
+
+
+def print_result(result):
+    """計測結果を1行で表示"""
+    if 'error' in result:
+        print(f"{result['target']:<9} エラー: {result['error']}")
+        return
+    stages = ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in result['stages'].items())
+    peak = f"{result['peak_rss_mb']:.1f}MB" if result['peak_rss_mb'] is not None else "N/A"
+    print(f"{result['target']:<9} {result['files']:>5} files {result['rows']:>8} rows "
+          f"{result['seconds']:>8.3f}s {result['files_per_sec']:>8.1f} files/s "
+          f"{result['rows_per_sec']:>10.0f} rows/s  peak {peak}  [{stages}]")
+
+
+def main(argv=None):
+    """コマンドラインからベンチマークを実行"""
+    parser = argparse.ArgumentParser(description="K-fileパーサーのベンチマーク")
+    parser.add_argument('--data-dir', help="既存のK-fileディレクトリ（省略時は合成データを作成）")
+    parser.add_argument('--days', type=int, default=30, help="合成データの日数")
+    parser.add_argument('--venues', type=int, default=12, help="合成データの1日あたりの会場数")
+    parser.add_argument('--races', type=int, default=12, help="合成データの1会場あたりのレース数")
+    parser.add_argument('--seed', type=int, default=0, help="合成データの乱数シード")
+    parser.add_argument('--targets', nargs='+', choices=sorted(TARGETS), default=sorted(TARGETS))
+    parser.add_argument('--repeat', type=int, default=1, help="計測回数")
+    parser.add_argument('--parallel', action='store_true', help="プロセスプールで解析")
+    parser.add_argument('--workers', type=int, default=None, help="並列処理のワーカー数")
+    parser.add_argument('--chunksize', type=int, default=1, help="並列処理のチャンクサイズ")
+    parser.add_argument('--mmap', action='store_true', help="メモリマップでバイト列のまま解析")
+    parser.add_argument('--async-io', action='store_true', help="asyncioで先読みしながら解析（analyzer のみ）")
+    parser.add_argument('--files-in-flight', type=int, default=8, help="asyncioで同時に扱うファイル数")
+    parser.add_argument('--format', default='csv', choices=['csv', 'parquet', 'feather'], help="保存形式")
+    parser.add_argument('--output', help="結果をJSON Lines形式で追記するファイル")
+    args = parser.parse_args(argv)
+
+    options = {'parallel': args.parallel, 'workers': args.workers,
+               'chunksize': args.chunksize, 'format': args.format, 'mmap': args.mmap,
+               'async_io': args.async_io, 'files_in_flight': args.files_in_flight}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = Path(tmp_dir) / 'kekkaf'
+            generator = SyntheticKFileGenerator(seed=args.seed)
+            generator.write_archive(data_dir, datetime(2024, 1, 1).date(), args.days, args.venues, args.races)
+            print(f"合成データ作成: {args.days} 日 x {args.venues} 会場 x {args.races} レース")
+
+        files = sum(1 for _ in iter_kfiles(data_dir))
+        failed = False
+        for _ in range(args.repeat):
+            for name in args.targets:
+                result = measure(name, data_dir, files, options)
+                failed = failed or 'error' in result
+                result.update({'timestamp': datetime.now().isoformat(timespec='seconds'), **options})
+                print_result(result)
+                if args.output:
+                    with open(args.output, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,32 @@
 from src import wkwk, QuickKekkaf2024Processor
+from src.manifest import IngestManifest
 import yaml
 import os
+import sys
 config_path = os.path.join(os.path.dirname(__file__), 'config', 'config.yaml')
 with open(config_path, 'r') as f:
     config = yaml.safe_load(f)
 
-def main():
-    """メイン実行"""
+def main(incremental=False):
+    """メイン実行（incremental=True で前回からの差分のみ処理）"""
     print("=== 2024年競艇データ特化処理（クイック版） ===")
     print("要求データ: レース場、着順、艇番、レーサーNo、展示タイム、スタートタイミング、タイム")
     
    # kekkaf_dir = config['file_path']['kekkaf_dir']
     kekkaf_dir = r"G:\マイドライブ\BR_python\kekkaf"
+    output_dir = "kekkaf_2024_sample"
     processor = QuickKekkaf2024Processor()
+    manifest = IngestManifest.for_output_dir(output_dir) if incremental else None
     
-    # サンプルファイルを処理
-    if processor.process_sample_files(kekkaf_dir, max_files=12):
-        processor.save_sample_dataset()
+    # 2024年のK-fileをすべて処理（件数では打ち切らず、期間で範囲を指定）
+    if processor.process_sample_files(kekkaf_dir, max_files=None, start_date="2024-01-01", end_date="2024-12-31",
+                                      manifest=manifest):
+        processor.save_sample_dataset(output_dir, manifest=manifest)
+    elif incremental:
+        print("新しいファイルはありません")
     else:
         print("ファイル処理に失敗しました")
 
 if __name__ == "__main__":
-    main()
+    main(incremental='--incremental' in sys.argv)
 
@@ -0,0 +1,265 @@
+"""
+K-fileアーカイブのヘッダー索引
+ファイルを復号せずにバイト列のまま1度走査し、日付・会場セクション・レースのバイト位置をJSONに保存する
+索引を使うと必要なセクション・レースだけを seek して読み込める
+"""
+
+import argparse
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .discovery import DateLike, iter_kfiles, parse_kfile_date, resolve_venue_codes, to_date
+from .kfile_parser import KFileParser, KFileSection, ParsedSection, VENUE_MAPPING, VENUE_SCAN_LINES
+
+INDEX_FILE_NAME = "archive_index.json"
+INDEX_VERSION = 1
+KFILE_ENCODING = 'shift_jis'
+
+# バイト列に対するパターン（Shift-JISでもASCII部分はそのまま比較できる）
+SECTION_BEGIN_BYTES = re.compile(rb'^\s*(\d{2})KBGN')
+SECTION_END_BYTES = re.compile(rb'^\s*(\d{2})KEND')
+# 各レースの見出し行（例: "   1R       予選  ...  H1800m"）。払戻金サマリーの "1R  1-2-3" とは距離の表記で区別する
+RACE_HEADER_BYTES = re.compile(rb'^\s*(\d{1,2})R\s.*H\d{3,4}m')
+
+
+class IndexedSection(NamedTuple):
+    """索引から選んだ会場セクション"""
+    path: Path
+    date: str
+    venue_code: str
+    # 区切り行のあるセクションかどうか（ないファイルは会場名から判定した会場コード）
+    marked: bool
+    # セクション見出し（払戻金サマリーを含む）のバイト範囲
+    header: Tuple[int, int]
+    # レース番号 → バイト範囲
+    races: Dict[int, Tuple[int, int]]
+
+
+def decode_lines(data: bytes) -> List[str]:
+    """バイト列をテキストモードで読んだ場合と同じ行リストに変換"""
+    text = data.decode(KFILE_ENCODING, errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+    return text.splitlines(keepends=True)
+
+
+def scan_sections(file_path: Union[str, Path], parser: KFileParser) -> List[Dict]:
+    """
+    ファイルを走査してセクション・レースのバイト位置を取得
+    区切り行がない場合はファイル全体を1セクションとし、先頭行の会場名から会場を判定する
+    """
+    sections = []
+    section = None
+    race_number = None
+    offset = 0
+    head = []
+
+    def close_race(end: int):
+        if section is not None and race_number is not None:
+            section['races'][str(race_number)][1] = end
+
+    with open(file_path, 'rb') as f:
+        for line in f:
+            line_start, offset = offset, offset + len(line)
+            if len(head) < VENUE_SCAN_LINES:
+                head.append(line)
+            begin_match = SECTION_BEGIN_BYTES.match(line)
+            if begin_match:
+                if section is not None:
+                    close_race(line_start)
+                    section['end'] = line_start
+                section = {'venue_code': begin_match.group(1).decode('ascii'), 'marked': True,
+                           'start': offset, 'header_end': None, 'end': None, 'races': {}}
+                sections.append(section)
+                race_number = None
+                continue
+            if section is None:
+                continue
+            if SECTION_END_BYTES.match(line):
+                close_race(line_start)
+                section['end'] = line_start
+                if section['header_end'] is None:
+                    section['header_end'] = line_start
+                section, race_number = None, None
+                continue
+            race_match = RACE_HEADER_BYTES.match(line)
+            if race_match:
+                close_race(line_start)
+                race_number = int(race_match.group(1))
+                section['races'][str(race_number)] = [line_start, offset]
+                if section['header_end'] is None:
+                    section['header_end'] = line_start
+
+    # 終了行がないまま終わったセクション
+    if section is not None:
+        close_race(offset)
+        section['end'] = offset
+        if section['header_end'] is None:
+            section['header_end'] = offset
+
+    if not sections:
+        venue = None
+        for line in decode_lines(b''.join(head)):
+            venue = parser.find_venue(line)
+            if venue is not None:
+                break
+        sections.append({'venue_code': venue.code if venue else '', 'marked': False,
+                         'start': 0, 'header_end': offset, 'end': offset, 'races': {}})
+    return sections
+
+
+class ArchiveIndex:
+    """
+    アーカイブの索引（ファイル → 日付・セクション・レースのバイト位置）
+    build で作成し、サイズ・更新時刻が変わっていないファイルは既存の索引を再利用する
+    """
+
+    def __init__(self, root: Union[str, Path], files: Optional[Dict[str, Dict]] = None,
+                 venue_mapping: Optional[Dict[str, str]] = None):
+        self.root = Path(root)
+        # ルートからの相対パス → エントリ
+        self.files: Dict[str, Dict] = files or {}
+        self.venue_mapping = dict(venue_mapping or VENUE_MAPPING)
+        self.parser = KFileParser(self.venue_mapping)
+
+    @classmethod
+    def build(cls, root: Union[str, Path], start_date: DateLike = None, end_date: DateLike = None,
+              existing: Optional['ArchiveIndex'] = None,
+              venue_mapping: Optional[Dict[str, str]] = None) -> 'ArchiveIndex':
+        """アーカイブを走査して索引を作成"""
+        index = cls(root, venue_mapping=venue_mapping)
+        previous = existing.files if existing is not None else {}
+        for file_path in iter_kfiles(root, start_date, end_date):
+            key = file_path.relative_to(index.root).as_posix()
+            stat = os.stat(file_path)
+            entry = previous.get(key)
+            if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+                entry = {
+                    'date': parse_kfile_date(file_path.name).isoformat(),
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'sections': scan_sections(file_path, index.parser)
+                }
+            index.files[key] = entry
+        return index
+
+    def save(self, path: Union[str, Path, None] = None) -> Path:
+        """索引をJSONで保存（省略時はアーカイブ直下）"""
+        path = Path(path) if path is not None else self.root / INDEX_FILE_NAME
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'root': str(self.root), 'files': self.files},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path], root: Union[str, Path, None] = None,
+             venue_mapping: Optional[Dict[str, str]] = None) -> 'ArchiveIndex':
+        """保存した索引を読み込む（root を省略すると作成時のアーカイブの場所）"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION:
+            raise ValueError(f"対応していない索引のバージョンです: {data.get('version')}")
+        return cls(root if root is not None else data['root'], data['files'], venue_mapping)
+
+    def query(self, venues: Optional[Sequence[Union[str, int]]] = None,
+              race_numbers: Optional[Sequence[int]] = None,
+              start_date: DateLike = None, end_date: DateLike = None) -> Iterator[IndexedSection]:
+        """条件に一致するセクションを日付順に返す（レース番号の指定は races に反映）"""
+        venue_codes = resolve_venue_codes(venues, self.venue_mapping)
+        race_set = set(race_numbers) if race_numbers is not None else None
+        start, end = to_date(start_date), to_date(end_date)
+        for key in sorted(self.files, key=lambda k: (self.files[k]['date'], k)):
+            entry = self.files[key]
+            file_date = to_date(entry['date'])
+            if (start and file_date < start) or (end and file_date > end):
+                continue
+            for section in entry['sections']:
+                if venue_codes is not None and section['venue_code'] not in venue_codes:
+                    continue
+                races = {int(number): tuple(span) for number, span in section['races'].items()
+                         if race_set is None or int(number) in race_set}
+                if race_set is not None and section['marked'] and not races:
+                    continue
+                yield IndexedSection(self.root / key, entry['date'], section['venue_code'], section['marked'],
+                                     (section['start'], section['header_end']), races)
+
+    def read_section(self, f, section: IndexedSection) -> KFileSection:
+        """開いているファイルから見出しと対象レースのバイト範囲だけを読み込む（区切り行のないファイルは全体）"""
+        spans = [section.header]
+        if section.marked:
+            spans += [section.races[number] for number in sorted(section.races)]
+        lines = []
+        for start, end in spans:
+            f.seek(start)
+            lines.extend(decode_lines(f.read(end - start)))
+        return KFileSection(section.venue_code if section.marked else None, lines)
+
+    def iter_parsed(self, parser: KFileParser, venues: Optional[Sequence[Union[str, int]]] = None,
+                    race_numbers: Optional[Sequence[int]] = None, start_date: DateLike = None,
+                    end_date: DateLike = None) -> Iterator[Tuple[IndexedSection, ParsedSection]]:
+        """条件に一致するセクションを seek で読み込んで解析"""
+        race_set = set(race_numbers) if race_numbers is not None else None
+        current_path, f = None, None
+        try:
+            for section in self.query(venues, race_numbers, start_date, end_date):
+                if section.path != current_path:
+                    if f is not None:
+                        f.close()
+                    current_path, f = section.path, open(section.path, 'rb')
+                yield section, parser.parse_section(self.read_section(f, section), race_set)
+        finally:
+            if f is not None:
+                f.close()
+
+    def summary(self) -> Dict[str, int]:
+        """索引の件数"""
+        sections = [section for entry in self.files.values() for section in entry['sections']]
+        return {
+            'files': len(self.files),
+            'sections': len(sections),
+            'races': sum(len(section['races']) for section in sections)
+        }
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """コマンドラインから索引の作成・検索を行う"""
+    parser = argparse.ArgumentParser(description="K-fileアーカイブの索引")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="索引を作成・更新")
+    build_parser.add_argument('root', help="kekkaf ディレクトリ")
+    build_parser.add_argument('--output', help=f"索引ファイル（省略時は root/{INDEX_FILE_NAME}）")
+    build_parser.add_argument('--start', help="開始日 (YYYY-MM-DD)")
+    build_parser.add_argument('--end', help="終了日 (YYYY-MM-DD)")
+
+    query_parser = subparsers.add_parser('query', help="索引からレースを検索")
+    query_parser.add_argument('index', help="索引ファイル")
+    query_parser.add_argument('--venue', action='append', help="会場名または会場コード（複数指定可）")
+    query_parser.add_argument('--race', type=int, action='append', help="レース番号（複数指定可）")
+    query_parser.add_argument('--start', help="開始日 (YYYY-MM-DD)")
+    query_parser.add_argument('--end', help="終了日 (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        output = Path(args.output) if args.output else Path(args.root) / INDEX_FILE_NAME
+        existing = ArchiveIndex.load(output, args.root) if output.exists() else None
+        index = ArchiveIndex.build(args.root, args.start, args.end, existing)
+        index.save(output)
+        summary = index.summary()
+        print(f"索引作成: {output} ({summary['files']} ファイル, {summary['sections']} セクション, "
+              f"{summary['races']} レース)")
+    else:
+        index = ArchiveIndex.load(args.index)
+        count = 0
+        for section in index.query(args.venue, args.race, args.start, args.end):
+            races = ", ".join(f"{number}R@{start}-{end}" for number, (start, end) in sorted(section.races.items()))
+            print(f"{section.date} {section.venue_code} {section.path.name} {races}")
+            count += len(section.races) if section.marked else 1
+        print(f"{count} 件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+圧縮アーカイブ（ZIP / LZH）からのK-fileの読み込み
+公式サイトの日次ダウンロード（k240101.lzh など）を展開せずに、メンバーをメモリ上で取り出してパーサーに渡す
+一時ファイルは作らない。LZHの復号には lhafile が必要（ZIPは標準ライブラリのみで読める）
+"""
+
+import re
+import zipfile
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from .discovery import DateLike, KFILE_NAME_PATTERN, KFileDiscovery, parse_kfile_date
+from .kfile_parser import KFileParser, SectionFilter
+from .pipeline import FileResult, iter_parsed_files
+
+ARCHIVE_SUFFIXES = {'.zip', '.lzh', '.lha'}
+# 日次のアーカイブ（k240101.lzh など）は名前の日付で範囲外を判定する
+DAILY_ARCHIVE_PATTERN = re.compile(r'^K(\d{2})(\d{2})(\d{2})\.(?:LZH|LHA|ZIP)$', re.IGNORECASE)
+
+# (アーカイブのパス, メンバーごとの結果, アーカイブを開けなかった場合のエラーメッセージ)
+ArchiveResult = Tuple[Path, List[FileResult], Optional[str]]
+
+
+def load_lhafile():
+    """LZHの復号に使う lhafile を読み込む"""
+    try:
+        import lhafile
+    except ImportError as e:
+        raise ImportError("LZH形式のアーカイブの読み込みには lhafile が必要です (pip install lhafile)") from e
+    return lhafile
+
+
+def member_basename(name: str) -> str:
+    """メンバー名からディレクトリを除いたファイル名"""
+    return re.split(r'[\\/]', name)[-1]
+
+
+class KFileArchive:
+    """
+    K-fileを含むZIP / LZHアーカイブ
+    with 文で開き、members でK-fileのメンバー名を列挙し、read でメンバーの内容を取り出す
+    """
+
+    def __init__(self, archive_path: Union[str, Path]):
+        self.archive_path = Path(archive_path)
+        suffix = self.archive_path.suffix.lower()
+        if suffix == '.zip':
+            self.archive = zipfile.ZipFile(self.archive_path)
+            names = self.archive.namelist()
+        elif suffix in ('.lzh', '.lha'):
+            self.file = open(self.archive_path, 'rb')
+            try:
+                self.archive = load_lhafile().LhaFile(self.file)
+            except BaseException:
+                self.file.close()
+                raise
+            names = self.archive.namelist() or []
+        else:
+            raise ValueError(f"対応していないアーカイブ形式です: {self.archive_path.name}")
+        self.names = names
+
+    def __enter__(self) -> 'KFileArchive':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self.archive, zipfile.ZipFile):
+            self.archive.close()
+        else:
+            self.file.close()
+
+    def members(self, start_date: DateLike = None, end_date: DateLike = None) -> List[str]:
+        """K-fileのメンバー名（開催日が範囲内のもの）をファイル名順に返す"""
+        discovery = KFileDiscovery(start_date, end_date)
+        return sorted((name for name in self.names if discovery.accepts_file(member_basename(name))),
+                      key=lambda name: member_basename(name).upper())
+
+    def read(self, name: str) -> bytes:
+        """メンバーの内容を取り出す"""
+        return self.archive.read(name)
+
+
+class ArchiveDiscovery(KFileDiscovery):
+    """アーカイブ配下のZIP / LZHを列挙する（日次のアーカイブは名前の日付で絞り込み、それ以外はメンバーで絞り込む）"""
+
+    def accepts_file(self, name: str) -> bool:
+        if Path(name).suffix.lower() not in ARCHIVE_SUFFIXES:
+            return False
+        file_date = parse_kfile_date(name, DAILY_ARCHIVE_PATTERN)
+        return file_date is None or self.accepts_date(file_date)
+
+
+def iter_archives(root: Union[str, Path], start_date: DateLike = None, end_date: DateLike = None) -> Iterator[Path]:
+    """ZIP / LZHアーカイブを逐次列挙"""
+    return ArchiveDiscovery(start_date, end_date).iter_files(root)
+
+
+def parse_archive(parser: KFileParser, archive_path: Path, section_filter: Optional[SectionFilter] = None,
+                  start_date: DateLike = None, end_date: DateLike = None) -> ArchiveResult:
+    """
+    アーカイブ内のK-fileをメンバー名の順に解析
+    メンバーのパスは「アーカイブのパス/メンバー名」とし、ファイル名から開催日を判定できるようにする
+    """
+    results = []
+    try:
+        with KFileArchive(archive_path) as archive:
+            for name in archive.members(start_date, end_date):
+                try:
+                    results.append((archive_path / name, parser.parse_member(archive.read(name), section_filter), None))
+                except Exception as e:
+                    results.append((archive_path / name, None, str(e)))
+    except Exception as e:
+        return archive_path, results, str(e)
+    return archive_path, results, None
+
+
+def parse_archive_chunk(parser: KFileParser, archive_paths: List[Path],
+                        section_filter: Optional[SectionFilter] = None,
+                        start_date: DateLike = None, end_date: DateLike = None) -> List[ArchiveResult]:
+    """ワーカープロセスでアーカイブ群を解析"""
+    return [parse_archive(parser, archive_path, section_filter, start_date, end_date)
+            for archive_path in archive_paths]
+
+
+def iter_parsed_archives(parser: KFileParser, archive_paths: Iterable[Path],
+                         section_filter: Optional[SectionFilter] = None,
+                         start_date: DateLike = None, end_date: DateLike = None,
+                         parallel: bool = False, max_workers: Optional[int] = None,
+                         chunksize: int = 1) -> Iterator[ArchiveResult]:
+    """
+    アーカイブごとに解析結果を入力順に返す
+    parallel=True の場合はアーカイブ単位でプロセスプールに振り分ける（メンバーの取り出し・復号もワーカーで行う）
+    """
+    if parallel:
+        task = partial(parse_archive_chunk, start_date=start_date, end_date=end_date)
+        return iter_parsed_files(parser, archive_paths, max_workers, chunksize, section_filter, task)
+    return (parse_archive(parser, archive_path, section_filter, start_date, end_date)
+            for archive_path in archive_paths)
@@ -0,0 +1,113 @@
+"""
+asyncioによる取り込みのパイプライン
+ファイルの列挙・読み込み（スレッド）→ 復号・解析（エグゼキューター）→ 取り込みの段を上限付きのキューでつなぎ、
+ネットワーク上のファイルシステム（NFS・Google Drive など）で読み込みの待ち時間を解析と重ねる
+同時に扱うファイル数（読み込み中・解析中・取り込み待ち）は files_in_flight 件までで、取り込みが遅れると先読みも止まる
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional, Tuple
+
+from .kfile_parser import KFileParser, ParsedKFile, SectionFilter
+from .pipeline import FileResult
+
+# 既定の同時に扱うファイル数
+DEFAULT_FILES_IN_FLIGHT = 8
+
+
+def read_file_bytes(file_path: Path) -> Tuple[bytes, float]:
+    """ファイルの内容と読み込み時間（秒）"""
+    start = time.perf_counter()
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return data, time.perf_counter() - start
+
+
+def parse_prefetched(parser: KFileParser, data: bytes, section_filter: Optional[SectionFilter],
+                     read_seconds: float) -> ParsedKFile:
+    """先読みした内容を解析（cache を指定したパーサーはキャッシュを使う）し、読み込み時間を解析結果に加える"""
+    parsed = parser.parse_member(data, section_filter)
+    return parsed._replace(read_seconds=parsed.read_seconds + read_seconds)
+
+
+async def aiter_parsed_files(parser: KFileParser, file_paths: Iterable[Path],
+                             section_filter: Optional[SectionFilter] = None,
+                             files_in_flight: int = DEFAULT_FILES_IN_FLIGHT,
+                             parse_executor: Optional[Executor] = None,
+                             io_executor: Optional[Executor] = None) -> AsyncIterator[FileResult]:
+    """
+    ファイルを先読みしながら解析し、入力順に結果を返す
+    file_paths の列挙（ディレクトリの走査）とファイルの読み込みは io_executor（省略時は files_in_flight スレッド）、
+    解析は parse_executor（省略時は1スレッド、ProcessPoolExecutor を渡すと複数プロセス）で行う
+    読み込み・解析のエラーは (ファイルパス, None, エラーメッセージ) として返す
+    """
+    if files_in_flight < 1:
+        raise ValueError(f"同時に扱うファイル数には1以上を指定してください: {files_in_flight}")
+    loop = asyncio.get_running_loop()
+    owned = []
+    if io_executor is None:
+        io_executor = ThreadPoolExecutor(files_in_flight, thread_name_prefix='kfile-read')
+        owned.append(io_executor)
+    if parse_executor is None:
+        parse_executor = ThreadPoolExecutor(1, thread_name_prefix='kfile-parse')
+        owned.append(parse_executor)
+
+    # ファイルごとに読み込みの前に取得し、結果を返した後で解放する（同時に扱うファイル数の上限）
+    slots = asyncio.Semaphore(files_in_flight)
+    read_queue: asyncio.Queue = asyncio.Queue(files_in_flight)
+    parse_queue: asyncio.Queue = asyncio.Queue(files_in_flight)
+
+    async def prefetch():
+        paths = iter(file_paths)
+        try:
+            while True:
+                await slots.acquire()
+                file_path = await loop.run_in_executor(io_executor, next, paths, None)
+                if file_path is None:
+                    break
+                await read_queue.put((file_path, loop.run_in_executor(io_executor, read_file_bytes, file_path)))
+        except Exception:
+            # 列挙のエラーでも後段を終了させる（例外は結果を返す段の最後で送出する）
+            read_queue.put_nowait(None)
+            raise
+        await read_queue.put(None)
+
+    async def decode():
+        while (item := await read_queue.get()) is not None:
+            file_path, reading = item
+            try:
+                data, read_seconds = await reading
+            except Exception:
+                # 読み込みのエラーは結果を返す段で受け取る
+                await parse_queue.put(item)
+                continue
+            parsing = loop.run_in_executor(parse_executor, partial(
+                parse_prefetched, parser, data, section_filter, read_seconds))
+            await parse_queue.put((file_path, parsing))
+        await parse_queue.put(None)
+
+    stages = [asyncio.create_task(prefetch()), asyncio.create_task(decode())]
+    try:
+        while (item := await parse_queue.get()) is not None:
+            file_path, parsing = item
+            try:
+                parsed = await parsing
+            except Exception as e:
+                yield file_path, None, str(e)
+            else:
+                yield file_path, parsed, None
+            slots.release()
+        # 段の中で起きた例外（ファイルの列挙のエラーなど）を送出する
+        for stage in stages:
+            await stage
+    finally:
+        # 途中で打ち切られた場合は先読みを止め、未着手の読み込み・解析を取り消す
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+        for executor in owned:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,154 @@
+"""
+B-file（番組表TXT）ストリーミングパーサー
+出走表の選手行（艇番・登番・級別・全国/当地勝率・モーター/ボートの番号と2連率）を1パスで抽出する
+1日分のファイルは会場ごとのセクション（NNBBGN～NNBEND）に分割し、K-fileと同じ SectionFilter で絞り込む
+"""
+
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Union
+
+from .kfile_parser import KFileSection, SectionFilter, TEXT_PATTERNS, VENUE_SCAN_LINES, open_kfile, split_sections
+
+# レースの見出し行（例: "　１Ｒ  予選 ..."、レース番号は全角数字）
+PROGRAM_RACE_PATTERN = re.compile(r'^[\s　]*([0-9０-９]{1,2})[RＲ](?:[\s　]|$)')
+# 出走表の選手行（例: "1 4337池田　浩48三重52B1 5.41 34.09 4.93 31.58 30 32.31 38 30.23"）
+#   艇番・登番・選手名（全角4文字）・年齢・支部（全角2文字）・体重・級別
+#   全国勝率・全国2連率・当地勝率・当地2連率・モーターNO・2連率・ボートNO・2連率
+PROGRAM_ENTRY_PATTERN = re.compile(
+    r'^([1-6]) (\d{4})(.{4})(\d{2})(.{2})(\d{2})([AB][12])\s*(\d+\.\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)'
+    r'\s+(\d+)\s+(\d+\.\d+)\s+(\d+)\s+(\d+\.\d+)'
+)
+
+# セクションの区切り行（01BBGN / 01BEND）
+PROGRAM_PATTERNS = TEXT_PATTERNS._replace(
+    section_begin=re.compile(r'^\s*(\d{2})BBGN'),
+    section_end=re.compile(r'^\s*(\d{2})BEND'),
+    section_tokens=('BBGN', 'BEND')
+)
+
+FULL_WIDTH_DIGITS = str.maketrans('０１２３４５６７８９', '0123456789')
+
+
+class EntryRow(NamedTuple):
+    """出走表の選手行のイベント"""
+    race_number: int
+    boat_number: int
+    racer_id: int
+    racer_name: str
+    age: int
+    branch: str
+    weight: int
+    racer_class: str
+    national_win_rate: float
+    national_top2_rate: float
+    local_win_rate: float
+    local_top2_rate: float
+    motor_number: int
+    motor_top2_rate: float
+    boat_id: int
+    boat_top2_rate: float
+
+
+class ParsedProgramSection(NamedTuple):
+    """1会場セクション分の出走表"""
+    venue_code: str
+    venue_name: str
+    entries: List[EntryRow]
+    # セクションの行数
+    line_count: int = 0
+
+
+class ParsedBFile(NamedTuple):
+    """1ファイル分の解析結果（会場セクションの出現順）"""
+    sections: List[ParsedProgramSection]
+    # 解析時間（秒）: 読み込み・復号・セクション分割 / 行の照合
+    read_seconds: float = 0.0
+    match_seconds: float = 0.0
+
+    def select_venues(self, venue_codes: Optional[Set[str]]) -> List[ParsedProgramSection]:
+        """指定した会場コードのセクションのみを返す（None は全セクション）"""
+        if venue_codes is None:
+            return list(self.sections)
+        return [section for section in self.sections if section.venue_code in venue_codes]
+
+
+class BFileParser:
+    """
+    B-file（番組表）のパーサー
+    KFileParser と同じく parse_file(file_path, section_filter) で1ファイルを解析するため、並列解析（pipeline）にもそのまま渡せる
+    """
+
+    def __init__(self, venue_mapping: Dict[str, str]):
+        self.venue_mapping = dict(venue_mapping)
+
+    def find_venue(self, lines: List[str]) -> Optional[str]:
+        """区切り行のないファイルの先頭行から会場コードを探す"""
+        for line in lines[:VENUE_SCAN_LINES]:
+            for code, name in self.venue_mapping.items():
+                if f'ボートレース{name}' in line:
+                    return code
+        return None
+
+    def parse_entry_line(self, race_number: int, line: str) -> Optional[EntryRow]:
+        """選手行を解析（一致しない・変換できない行はNone）"""
+        match = PROGRAM_ENTRY_PATTERN.match(line)
+        if not match:
+            return None
+        (boat, racer_id, name, age, branch, weight, racer_class, national_win, national_top2,
+         local_win, local_top2, motor, motor_top2, boat_id, boat_top2) = match.groups()
+        try:
+            return EntryRow(
+                race_number, int(boat), int(racer_id), name.replace('　', ' ').strip(), int(age),
+                branch.strip(), int(weight), racer_class, float(national_win), float(national_top2),
+                float(local_win), float(local_top2), int(motor), float(motor_top2), int(boat_id), float(boat_top2)
+            )
+        except ValueError:
+            return None
+
+    def iter_entries(self, lines: Iterable[str], race_numbers: Optional[Set[int]] = None) -> Iterable[EntryRow]:
+        """行イテレータから選手行を順に生成（race_numbers を指定すると、それ以外のレースの行は解析しない）"""
+        race_number = 0
+        skipping = False
+        for line in lines:
+            race_match = PROGRAM_RACE_PATTERN.match(line)
+            if race_match:
+                race_number = int(race_match.group(1).translate(FULL_WIDTH_DIGITS))
+                skipping = race_numbers is not None and race_number not in race_numbers
+                continue
+            if skipping or not race_number:
+                continue
+            entry = self.parse_entry_line(race_number, line)
+            if entry is not None:
+                yield entry
+
+    def parse_section(self, section: KFileSection, race_numbers: Optional[Set[int]] = None) -> ParsedProgramSection:
+        """会場セクションを解析（区切り行がない場合は先頭行の会場名から会場を判定する）"""
+        venue_code = section.venue_code
+        if venue_code is None:
+            venue_code = self.find_venue(section.lines) or ''
+        entries = list(self.iter_entries(section.lines, race_numbers))
+        return ParsedProgramSection(venue_code, self.venue_mapping.get(venue_code, ''), entries, len(section.lines))
+
+    def parse(self, lines: Iterable[str], section_filter: Optional[SectionFilter] = None) -> ParsedBFile:
+        """会場セクションごとに解析して1ファイル分の解析結果を作成"""
+        section_filter = section_filter or SectionFilter()
+        sections = []
+        match_seconds = 0.0
+        start = time.perf_counter()
+        for section in split_sections(lines, section_filter.venue_codes, PROGRAM_PATTERNS):
+            section_start = time.perf_counter()
+            parsed = self.parse_section(section, section_filter.race_numbers)
+            match_seconds += time.perf_counter() - section_start
+            # 区切り行のないファイルは会場名から判定した会場で絞り込む
+            if section.venue_code is None and not section_filter.accepts_venue(parsed.venue_code):
+                continue
+            sections.append(parsed)
+        return ParsedBFile(sections, time.perf_counter() - start - match_seconds, match_seconds)
+
+    def parse_file(self, file_path: Union[str, Path], section_filter: Optional[SectionFilter] = None) -> ParsedBFile:
+        """ファイルをストリーミングで読み込んで解析"""
+        with open_kfile(file_path) as f:
+            return self.parse(f, section_filter)
+
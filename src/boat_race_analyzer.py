@@ -1,20 +1,71 @@
 import pandas as pd
 import numpy as np
-import re
+import asyncio
+import sys
+import time
 import json
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Union
+from typing import Dict, Iterable, List, Set, Tuple, Optional, Union
 from datetime import datetime
 import warnings
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 warnings.filterwarnings('ignore')
 
+from .kfile_parser import (
+    KFileParser, ParsedKFile, ParsedSection, RaceResult, SectionFilter, VENUE_SCAN_LINES
+)
+from .pipeline import iter_parsed_files
+from .archives import ArchiveResult, iter_archives, iter_parsed_archives
+from .async_pipeline import DEFAULT_FILES_IN_FLIGHT, aiter_parsed_files
+from .discovery import DateLike, iter_kfiles, resolve_venue_codes
+from .manifest import IngestManifest
+from .archive_index import ArchiveIndex
+from .writers import DatasetWriter, get_writer
+from .columnar import ColumnarRecordBuffer, FrameCache
+from .features import ODDS_PREFIX, FeatureTransformer
+from .metrics import IngestMetrics
+from .parse_cache import ParseCache
+from .racer_stats import RACER_STATS_FILE_NAME, RacerStatsStore
+from .query import BufferSource, DatasetQuery, FileSource
+from .streaming import DEFAULT_CHUNK_ROWS, RunningSummary, StreamingSink
+
+# 出力データセット名（拡張子なし）
+HUMAN_READABLE_NAME = "boat_race_human_readable"
+ML_READY_NAME = "boat_race_ml_ready"
+ODDS_NAME = "boat_race_odds"
+RACER_FEATURES_NAME = "boat_race_racer_features"
+FEATURE_TRANSFORMER_FILE_NAME = "feature_transformer.json"
+
+# 選手単位レコードの列
+RACE_DATA_SCHEMA = [
+    ('日付', 'str'), ('レース場コード', 'str'), ('レース場名', 'str'), ('レース番号', 'int'),
+    ('選手枠番', 'int'), ('選手ナンバー', 'int'), ('レーサーID', 'int'), ('レーサー名', 'str'),
+    ('年齢', 'int'), ('体重', 'int'), ('展示タイム', 'float'), ('スタートタイミング', 'float'),
+    ('レースタイム', 'str'), ('最終着順', 'int')
+]
+
+# オッズテーブルの列（レース単位・券種・組番ごとに1行、払戻金は100円あたり、人気は記載のない券種で0）
+ODDS_DATA_SCHEMA = [
+    ('日付', 'str'), ('レース場コード', 'str'), ('レース番号', 'int'),
+    ('券種', 'str'), ('組番', 'str'), ('オッズ', 'float'), ('払戻金', 'int'), ('人気', 'int')
+]
+
+# 選手データとオッズを結合するキー
+RACE_KEY_COLUMNS = ['日付', 'レース場コード', 'レース番号']
+
+# 保存済みのCSVを読み込むときに文字列として扱う列（会場コードの先頭の0を保つ）
+HUMAN_READABLE_READ_DTYPES = {'レース場コード': str, 'レース場名': str, 'レーサー名': str, 'レースタイム': str}
+ODDS_READ_DTYPES = {'レース場コード': str, '券種': str, '組番': str}
+
 class BoatRaceAnalyzer:
     """
     競艇データ分析用クラス
     2024年の結果TXTファイルからデータを抽出し、人間が読みやすく機械学習に適した形式で出力
     """
     
-    def __init__(self):
+    def __init__(self, use_mmap: bool = False, metrics: Optional[IngestMetrics] = None,
+                 parse_cache: Optional[ParseCache] = None):
         # 会場マッピング
         self.venue_mapping = {
             '01': '桐生', '02': '戸田', '03': '江戸川', '04': '平和島', 
@@ -25,22 +76,50 @@ class BoatRaceAnalyzer:
             '21': '芦屋', '22': '福岡', '23': '唐津', '24': '大村'
         }
         
-        # データ格納用
-        self.race_data = []
-        self.odds_data = []
-        
-        # 正規表現パターン
-        self.patterns = {
-            'race_result': re.compile(r'(\d+)R\s+([1-6]-[1-6]-[1-6])\s+(\d+)'),
-            'racer_info': re.compile(r'\s*(\d{2})\s+(\d)\s+(\d{4})\s+(.{8,12})\s+(\d{2})\s+(\d{1,3})\s+(\d\.\d{2})\s+(\d)\s+([\d\.+-]+)\s+([\d\.:]*)'),
-            'odds_single': re.compile(r'単勝\s*(\d+)\s*(\d+\.\d+)'),
-            'odds_place': re.compile(r'複勝\s*(\d+)\s*(\d+\.\d+)'),
-            'odds_exacta': re.compile(r'2連単\s*(\d+)-(\d+)\s*(\d+\.\d+)'),
-            'odds_quinella': re.compile(r'2連複\s*(\d+)-(\d+)\s*(\d+\.\d+)'),
-            'odds_wide': re.compile(r'拡連複\s*(\d+)-(\d+)\s*(\d+\.\d+)'),
-            'odds_trifecta': re.compile(r'3連複\s*(\d+)-(\d+)-(\d+)\s*(\d+\.\d+)'),
-            'odds_trio': re.compile(r'3連単\s*(\d+)-(\d+)-(\d+)\s*(\d+\.\d+)')
-        }
+        # 型変換済みDataFrameのキャッシュ（レコード追加時は追加分のみ変換）
+        self.human_cache = FrameCache(self.apply_human_readable_dtypes)
+        self.odds_cache = FrameCache(self.apply_odds_dtypes)
+        self.ml_cache: Optional[Tuple[tuple, pd.DataFrame, FeatureTransformer]] = None
+        
+        # データ格納用（選手行・オッズは列指向バッファに蓄積）
+        self.race_data = ColumnarRecordBuffer(RACE_DATA_SCHEMA)
+        self.odds_data = ColumnarRecordBuffer(ODDS_DATA_SCHEMA)
+        # 選手行の解析経路ごとの行数（固定列 / 正規表現 / 不一致）
+        self.racer_line_counts = Counter()
+        # 取り込みの計測（出力先を指定した IngestMetrics を渡すとファイルごとに出力する）
+        self.metrics = metrics or IngestMetrics()
+        
+        # ストリーミングパーサー（use_mmap=True でバイト列のまま解析、parse_cache を渡すと解析結果をキャッシュする）
+        self.parser = KFileParser(self.venue_mapping, use_mmap=use_mmap, cache=parse_cache)
+        
+        # 直近の機械学習用データの作成に使った特徴量変換（推論時のバッチ変換に再利用できる）
+        self.feature_transformer = FeatureTransformer(self.venue_mapping)
+        
+        # ストリーミング出力（start_streaming で開始し、finish_streaming で統計情報を保存して終了）
+        self.sink: Optional[StreamingSink] = None
+        self.stream_options: Dict = {}
+    
+    @property
+    def race_data(self) -> ColumnarRecordBuffer:
+        """選手単位のレコード"""
+        return self._race_data
+    
+    @race_data.setter
+    def race_data(self, records):
+        # dictのリストを代入した場合も列指向バッファに変換し、オッズ_* 列はオッズテーブルに移す
+        if not isinstance(records, ColumnarRecordBuffer):
+            buffer = ColumnarRecordBuffer(RACE_DATA_SCHEMA)
+            self.odds_data = ColumnarRecordBuffer(ODDS_DATA_SCHEMA)
+            seen_odds = set()
+            for record in records:
+                buffer.append_row([record[name] for name, _ in RACE_DATA_SCHEMA])
+                race_key = (record['日付'], record['レース場コード'], record['レース番号'])
+                for key, value in record.items():
+                    if key.startswith('オッズ_') and (race_key, key) not in seen_odds:
+                        seen_odds.add((race_key, key))
+                        self.append_odds_row(race_key, key[len('オッズ_'):], value)
+            records = buffer
+        self._race_data = records
     
     def extract_date_from_filename(self, filename: str) -> str:
         """ファイル名から日付を抽出"""
@@ -56,213 +135,248 @@ class BoatRaceAnalyzer:
     
     def extract_venue_from_content(self, lines: List[str]) -> Tuple[str, str]:
         """ファイル内容から会場情報を抽出"""
-        venue_patterns = list(self.venue_mapping.values())
-        
-        for line in lines[:30]:
-            for venue in venue_patterns:
-                if venue in line:
-                    for code, name in self.venue_mapping.items():
-                        if name == venue:
-                            return code, venue
+        for line in lines[:VENUE_SCAN_LINES]:
+            venue = self.parser.find_venue(line)
+            if venue is not None:
+                return venue.code, venue.name
         return '', ''
     
     def extract_race_results(self, lines: List[str]) -> Dict[int, Dict]:
         """レース結果（着順）を抽出"""
         race_results = {}
-        for line in lines:
-            line = line.strip()
-            match = self.patterns['race_result'].search(line)
-            if match:
-                race_number = int(match.group(1))
-                finish_combination = match.group(2)
-                positions = finish_combination.split('-')
-                if len(positions) == 3:
-                    race_results[race_number] = {
-                        'first': int(positions[0]),
-                        'second': int(positions[1]), 
-                        'third': int(positions[2])
-                    }
+        for event in self.parser.iter_events(lines):
+            if isinstance(event, RaceResult):
+                race_results[event.race_number] = {
+                    'first': event.first,
+                    'second': event.second,
+                    'third': event.third
+                }
         return race_results
     
     def extract_odds_data(self, lines: List[str]) -> Dict[int, Dict]:
-        """オッズデータを抽出"""
-        odds_data = {}
-        current_race = None
+        """オッズデータを {レース番号: {'exacta_1_3': オッズ}} 形式で抽出（複数会場のファイルは後のセクションを優先）"""
+        odds = {}
+        for section in self.parser.parse(lines).sections:
+            for race_number, entries in section.odds.items():
+                odds[race_number] = {f"{entry.bet_type}_{entry.combination.replace('-', '_')}": entry.odds
+                                     for entry in entries}
+        return odds
+    
+    def append_odds_row(self, race_key: Tuple[str, str, int], odds_key: str, odds_value: float):
+        """オッズを1行追加（odds_key は 'exacta_1_3' 形式、払戻金はオッズから換算し人気は0）"""
+        bet_type, _, combination = odds_key.partition('_')
+        self.odds_data.append_row((*race_key, bet_type, combination.replace('_', '-'), odds_value,
+                                   round(odds_value * 100), 0))
+    
+    def append_race_records(self, date_str: str, section: ParsedSection):
+        """会場セクションの解析結果を選手単位のレコードとオッズテーブルの行として列バッファに追加"""
+        append_row = self.race_data.append_row
+        venue_code, venue_name = section.venue_code, section.venue_name
+        self.racer_line_counts.update(section.racer_line_counts)
+        for racer in section.racers:
+            append_row((
+                date_str, venue_code, venue_name, racer.race_number, racer.frame_number,
+                racer.boat_number, racer.racer_id, racer.racer_name, racer.age, racer.weight,
+                racer.exhibition_time, racer.start_timing, racer.race_time,
+                section.finish_position(racer.race_number, racer.boat_number)
+            ))
         
-        for line in lines:
-            line = line.strip()
-            
-            # レース番号の検出
-            race_match = re.search(r'(\d+)R', line)
-            if race_match:
-                current_race = int(race_match.group(1))
-                odds_data[current_race] = {}
-                continue
-            
-            if current_race is None:
-                continue
-            
-            # 各種オッズの抽出
-            odds_types = [
-                ('single', self.patterns['odds_single']),
-                ('place', self.patterns['odds_place']),
-                ('exacta', self.patterns['odds_exacta']),
-                ('quinella', self.patterns['odds_quinella']),
-                ('wide', self.patterns['odds_wide']),
-                ('trifecta', self.patterns['odds_trifecta']),
-                ('trio', self.patterns['odds_trio'])
-            ]
-            
-            for odds_type, pattern in odds_types:
-                match = pattern.search(line)
-                if match:
-                    if odds_type in ['single', 'place']:
-                        boat_num = int(match.group(1))
-                        odds_value = float(match.group(2))
-                        odds_data[current_race][f'{odds_type}_{boat_num}'] = odds_value
-                    elif odds_type in ['exacta', 'quinella', 'wide']:
-                        boat1 = int(match.group(1))
-                        boat2 = int(match.group(2))
-                        odds_value = float(match.group(3))
-                        odds_data[current_race][f'{odds_type}_{boat1}_{boat2}'] = odds_value
-                    elif odds_type in ['trifecta', 'trio']:
-                        boat1 = int(match.group(1))
-                        boat2 = int(match.group(2))
-                        boat3 = int(match.group(3))
-                        odds_value = float(match.group(4))
-                        odds_data[current_race][f'{odds_type}_{boat1}_{boat2}_{boat3}'] = odds_value
-        
-        return odds_data
-    
-    def process_single_file(self, file_path: Path) -> bool:
-        """単一ファイルを処理"""
+        # オッズはレース単位で1度だけ保持（選手行には複製しない）
+        for race_number, race_odds in section.odds.items():
+            race_key = (date_str, venue_code, race_number)
+            for entry in race_odds:
+                self.odds_data.append_row((*race_key, entry.bet_type, entry.combination, entry.odds,
+                                           entry.payout, entry.popularity))
+    
+    def ingest_parsed_file(self, file_path: Path, parsed: ParsedKFile, venue_codes: Optional[Set[str]] = None):
+        """解析済みの結果を会場セクションごとにレコードとして追加（会場指定がある場合は一致するもののみ）"""
+        start = time.perf_counter()
+        date_str = self.extract_date_from_filename(file_path.stem)
+        sections = parsed.select_venues(venue_codes)
+        for section in sections:
+            self.append_race_records(date_str, section)
+        self.metrics.record_file(file_path, parsed, sections, time.perf_counter() - start)
+    
+    def process_single_file(self, file_path: Path, venue_codes: Optional[Set[str]] = None,
+                            race_numbers: Optional[Set[int]] = None) -> bool:
+        """単一ファイルを処理（1パスのストリーミング解析、対象外の会場・レースは解析しない）"""
         print(f"処理中: {file_path.name}")
         
         try:
-            with open(file_path, 'r', encoding='shift_jis', errors='ignore') as f:
-                lines = f.readlines()
-            
-            # 基本情報の抽出
-            date_str = self.extract_date_from_filename(file_path.stem)
-            venue_code, venue_name = self.extract_venue_from_content(lines)
-            
-            # レース結果とオッズデータの抽出
-            race_results = self.extract_race_results(lines)
-            odds_data = self.extract_odds_data(lines)
-            
-            # 選手データの抽出
-            current_race = None
-            for line_num, line in enumerate(lines):
-                line_original = line
-                line = line.strip()
-                
-                # レース番号の検出
-                race_match = re.search(r'(\d+)R', line)
-                if race_match:
-                    current_race = int(race_match.group(1))
-                
-                # 選手情報の抽出
-                if current_race and len(line_original) >= 40:
-                    try:
-                        match = self.patterns['racer_info'].match(line_original)
-                        if match:
-                            frame_number = int(match.group(1))
-                            boat_number = int(match.group(2))
-                            racer_id = int(match.group(3))
-                            racer_name = match.group(4).strip()
-                            age = int(match.group(5))
-                            weight = int(match.group(6))
-                            exhibition_time = float(match.group(7))
-                            position = int(match.group(8))
-                            start_timing = float(match.group(9)) if match.group(9) and match.group(9) != '.' else 0.0
-                            race_time = match.group(10) if match.group(10) and match.group(10) != '.' else ""
-                            
-                            # 着順の計算
-                            finish_position = 0
-                            if current_race in race_results:
-                                result = race_results[current_race]
-                                if boat_number == result['first']:
-                                    finish_position = 1
-                                elif boat_number == result['second']:
-                                    finish_position = 2
-                                elif boat_number == result['third']:
-                                    finish_position = 3
-                                else:
-                                    finish_position = 4  # 4着以下
-                            
-                            # オッズ情報の取得
-                            race_odds = odds_data.get(current_race, {})
-                            
-                            # 基本データの保存
-                            race_record = {
-                                '日付': date_str,
-                                'レース場コード': venue_code,
-                                'レース場名': venue_name,
-                                'レース番号': current_race,
-                                '選手枠番': frame_number,
-                                '選手ナンバー': boat_number,
-                                'レーサーID': racer_id,
-                                'レーサー名': racer_name,
-                                '年齢': age,
-                                '体重': weight,
-                                '展示タイム': exhibition_time,
-                                'スタートタイミング': start_timing,
-                                'レースタイム': race_time,
-                                '最終着順': finish_position
-                            }
-                            
-                            # オッズ情報の追加
-                            for odds_key, odds_value in race_odds.items():
-                                race_record[f'オッズ_{odds_key}'] = odds_value
-                            
-                            self.race_data.append(race_record)
-                            
-                    except Exception as e:
-                        continue
-            
+            parsed = self.parser.parse_file(file_path, SectionFilter(venue_codes, race_numbers))
+            self.ingest_parsed_file(file_path, parsed, venue_codes)
             return True
             
         except Exception as e:
             print(f"エラー: {file_path} - {e}")
+            self.metrics.record_file(file_path, error=str(e))
             return False
     
-    def process_files(self, directory_path: str, max_files: Optional[int] = None) -> int:
-        """複数ファイルを処理"""
-        directory = Path(directory_path)
+    def process_files(self, directory_path: str, max_files: Optional[int] = None,
+                      start_date: DateLike = None, end_date: DateLike = None,
+                      venues: Optional[List[Union[str, int]]] = None,
+                      parallel: bool = False, max_workers: Optional[int] = None,
+                      chunksize: int = 1, manifest: Optional[IngestManifest] = None,
+                      race_numbers: Optional[List[int]] = None, archives: bool = False,
+                      async_io: bool = False, files_in_flight: int = DEFAULT_FILES_IN_FLIGHT) -> int:
+        """
+        複数ファイルを処理
+        ディレクトリ配下の全K-fileを日付順に処理する（start_date/end_date で期間、venues で会場、race_numbers でレース番号を指定）
+        期間はフォルダ・ファイル名、会場・レース番号はセクション・レースの見出しで判定し、対象外の部分は解析しない
+        parallel=True の場合はプロセスプールで解析し、ファイル順に結果をマージする
+        manifest を指定すると、前回から変更のない処理済みファイルを読み飛ばす
+        archives=True の場合はTXTの代わりにZIP / LZHアーカイブを探し、展開せずにメンバーを解析する
+        （並列処理はアーカイブ単位、マニフェストにはアーカイブ単位で記録する）
+        async_io=True の場合は asyncio のパイプラインで files_in_flight 件までのファイルを先読みしながら解析する
+        （ネットワーク上のファイルシステム向け、ingest_files_async を参照）
+        """
+        if archives and async_io:
+            raise ValueError("archives と async_io は同時に指定できません")
         processed_count = 0
+        venue_codes = resolve_venue_codes(venues, self.venue_mapping)
+        race_numbers = set(race_numbers) if race_numbers is not None else None
+        file_paths = (iter_archives if archives else iter_kfiles)(directory_path, start_date, end_date)
+        if manifest is not None:
+            file_paths = manifest.filter_unprocessed(file_paths)
         
-        # 2024年のファイルを検索
-        for month in range(1, 13):
-            if max_files and processed_count >= max_files:
-                break
-                
-            month_dir = f"2024{month:02d}"
-            month_path = directory / month_dir
-            
-            if month_path.exists():
-                txt_files = list(month_path.glob("*.TXT"))
-                if txt_files:
-                    # 各月の最初のファイルを処理
-                    first_file = sorted(txt_files)[0]
-                    if self.process_single_file(first_file):
-                        processed_count += 1
-                        print(f"  -> 処理完了: {len(self.race_data)} レコード")
+        if archives:
+            results = iter_parsed_archives(self.parser, file_paths, SectionFilter(venue_codes, race_numbers),
+                                           start_date, end_date, parallel, max_workers, chunksize)
+            processed_count = self.ingest_archive_results(results, venue_codes, max_files, manifest)
+        elif async_io:
+            processed_count = asyncio.run(self.ingest_files_async(
+                file_paths, SectionFilter(venue_codes, race_numbers), venue_codes, max_files, manifest,
+                files_in_flight, parallel, max_workers))
+        elif parallel:
+            section_filter = SectionFilter(venue_codes, race_numbers)
+            for file_path, parsed, error in iter_parsed_files(self.parser, file_paths, max_workers, chunksize,
+                                                              section_filter):
+                if max_files and processed_count >= max_files:
+                    break
+                print(f"処理中: {file_path.name}")
+                if error is not None:
+                    print(f"エラー: {file_path} - {error}")
+                    self.metrics.record_file(file_path, error=error)
+                    continue
+                record_count = len(self.race_data)
+                self.ingest_parsed_file(file_path, parsed, venue_codes)
+                if manifest is not None:
+                    manifest.mark_processed(file_path, len(self.race_data) - record_count)
+                processed_count += 1
+                print(f"  -> 処理完了: {len(self.race_data)} レコード")
+                self.flush_stream()
+        else:
+            for file_path in file_paths:
+                if max_files and processed_count >= max_files:
+                    break
+                record_count = len(self.race_data)
+                if self.process_single_file(file_path, venue_codes, race_numbers):
+                    if manifest is not None:
+                        manifest.mark_processed(file_path, len(self.race_data) - record_count)
+                    processed_count += 1
+                    print(f"  -> 処理完了: {len(self.race_data)} レコード")
+                    self.flush_stream()
         
         print(f"\n処理完了: {processed_count} ファイル, {len(self.race_data)} レコード")
+        self.metrics.finish()
         return processed_count
     
-    def get_human_readable_data(self) -> pd.DataFrame:
-        """人間が読みやすい形式でデータを取得"""
-        if not self.race_data:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(self.race_data)
-        
-        # データ型の最適化
-        df['日付'] = pd.to_datetime(df['日付'])
-        df['レース場コード'] = df['レース場コード'].astype('category')
-        df['レース場名'] = df['レース場名'].astype('category')
-        df['レーサー名'] = df['レーサー名'].astype('string')
+    async def ingest_files_async(self, file_paths: Iterable[Path], section_filter: Optional[SectionFilter] = None,
+                                 venue_codes: Optional[Set[str]] = None, max_files: Optional[int] = None,
+                                 manifest: Optional[IngestManifest] = None,
+                                 files_in_flight: int = DEFAULT_FILES_IN_FLIGHT,
+                                 parallel: bool = False, max_workers: Optional[int] = None) -> int:
+        """
+        ファイルを先読み・解析しながらファイル順に取り込む（実行中のイベントループからは await で直接呼ぶ）
+        読み込みはスレッド、解析は1スレッド（parallel=True ではプロセスプール）で行い、
+        取り込みとストリーミング出力のチャンクの書き出しもスレッドで行うため、その間も次のファイルの読み込みを続ける
+        """
+        def ingest(file_path: Path, parsed: ParsedKFile):
+            # マニフェストへの記録（ファイルのハッシュ計算）もイベントループの外で行う
+            record_count = len(self.race_data)
+            self.ingest_parsed_file(file_path, parsed, venue_codes)
+            if manifest is not None:
+                manifest.mark_processed(file_path, len(self.race_data) - record_count)
+
+        processed_count = 0
+        parse_executor = ProcessPoolExecutor(max_workers) if parallel else None
+        results = aiter_parsed_files(self.parser, file_paths, section_filter, files_in_flight, parse_executor)
+        try:
+            async for file_path, parsed, error in results:
+                if max_files and processed_count >= max_files:
+                    break
+                print(f"処理中: {file_path.name}")
+                if error is not None:
+                    print(f"エラー: {file_path} - {error}")
+                    self.metrics.record_file(file_path, error=error)
+                    continue
+                await asyncio.to_thread(ingest, file_path, parsed)
+                processed_count += 1
+                print(f"  -> 処理完了: {len(self.race_data)} レコード")
+                await asyncio.to_thread(self.flush_stream)
+        finally:
+            await results.aclose()
+            if parse_executor is not None:
+                parse_executor.shutdown(cancel_futures=True)
+        return processed_count
+    
+    def ingest_archive_results(self, results: Iterable[ArchiveResult], venue_codes: Optional[Set[str]] = None,
+                               max_files: Optional[int] = None, manifest: Optional[IngestManifest] = None) -> int:
+        """
+        アーカイブごとの解析結果をメンバー順に取り込む（max_files はメンバー数）
+        マニフェストには、すべてのメンバーを取り込めたアーカイブだけを記録する
+        """
+        processed_count = 0
+        for archive_path, member_results, error in results:
+            if max_files and processed_count >= max_files:
+                break
+            complete = error is None
+            if error is not None:
+                print(f"エラー: {archive_path} - {error}")
+                self.metrics.record_file(archive_path, error=error)
+            record_count = len(self.race_data)
+            for file_path, parsed, member_error in member_results:
+                if max_files and processed_count >= max_files:
+                    complete = False
+                    break
+                print(f"処理中: {archive_path.name}:{file_path.name}")
+                if member_error is not None:
+                    print(f"エラー: {file_path} - {member_error}")
+                    self.metrics.record_file(file_path, error=member_error)
+                    complete = False
+                    continue
+                self.ingest_parsed_file(file_path, parsed, venue_codes)
+                processed_count += 1
+                print(f"  -> 処理完了: {len(self.race_data)} レコード")
+                self.flush_stream()
+            if manifest is not None and complete:
+                manifest.mark_processed(archive_path, len(self.race_data) - record_count)
+        return processed_count
+    
+    def process_index(self, index: ArchiveIndex, venues: Optional[List[Union[str, int]]] = None,
+                      race_numbers: Optional[List[int]] = None,
+                      start_date: DateLike = None, end_date: DateLike = None) -> int:
+        """
+        アーカイブの索引から条件に一致するセクション・レースだけを読み込んで処理
+        ファイル全体を走査しないため、特定の会場・レース番号の抽出に向く
+        """
+        section_count = 0
+        for section, parsed in index.iter_parsed(self.parser, venues, race_numbers, start_date, end_date):
+            self.append_race_records(section.date, parsed)
+            section_count += 1
+            self.flush_stream()
+        print(f"\n処理完了: {section_count} セクション, {len(self.race_data)} レコード")
+        return section_count
+    
+    def apply_human_readable_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """人間が読みやすい形式のデータ型に変換（一部の列だけのDataFrameはある列のみ変換）"""
+        if '日付' in df.columns:
+            df['日付'] = pd.to_datetime(df['日付'])
+        for col in ['レース場コード', 'レース場名']:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        if 'レーサー名' in df.columns:
+            df['レーサー名'] = df['レーサー名'].astype('string')
         
         # 数値列の処理
         numeric_columns = ['レース番号', '選手枠番', '選手ナンバー', 'レーサーID', '年齢', '体重', 
@@ -273,77 +387,199 @@ class BoatRaceAnalyzer:
         
         return df
     
-    def get_ml_ready_data(self) -> pd.DataFrame:
-        """機械学習に適した形式でデータを取得"""
-        df = self.get_human_readable_data()
-        
-        if df.empty:
-            return df
-        
-        # 特徴量エンジニアリング
-        df_ml = df.copy()
+    def read_human_readable_data(self, writer: DatasetWriter, output_path: Path) -> pd.DataFrame:
+        """保存済みの人間が読みやすい形式のデータを読み込む"""
+        return self.restore_human_readable_dtypes(
+            writer.read(output_path, HUMAN_READABLE_NAME, dtype=HUMAN_READABLE_READ_DTYPES))
+    
+    def restore_human_readable_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """保存済みの人間が読みやすい形式から読み込んだデータの型を戻す（空文字列は欠損値として読まれる）"""
+        for col in ['レース場コード', 'レース場名', 'レースタイム']:
+            if col in df.columns:
+                df[col] = df[col].astype(object).fillna('')
+        return self.apply_human_readable_dtypes(df)
+    
+    def read_odds_data(self, writer: DatasetWriter, output_path: Path) -> pd.DataFrame:
+        """保存済みのオッズテーブルを読み込む"""
+        if not writer.exists(output_path, ODDS_NAME):
+            return self.apply_odds_dtypes(pd.DataFrame({name: [] for name, _ in ODDS_DATA_SCHEMA}))
+        return self.restore_odds_dtypes(writer.read(output_path, ODDS_NAME, dtype=ODDS_READ_DTYPES))
+    
+    def restore_odds_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """保存済みのオッズテーブルから読み込んだデータの型を戻す"""
+        if 'レース場コード' in df.columns:
+            df['レース場コード'] = df['レース場コード'].astype(object).fillna('')
+        return self.apply_odds_dtypes(df)
+    
+    def append_dataset(self, writer: DatasetWriter, output_path: Path, name: str,
+                       existing_df: pd.DataFrame, new_df: pd.DataFrame,
+                       manifest: IngestManifest) -> pd.DataFrame:
+        """
+        既存の出力に新しいレコードを追記し、結合後のデータを返す
+        内容が変わったファイルがある場合は、今回取り込んだレコードの日付の既存レコードを置き換え、列構成が変わる場合は全体を書き直す
+        （マニフェストはアーカイブ単位で記録するため、日付はファイル名ではなく取り込んだレコードから求める）
+        """
+        replaced_dates = pd.to_datetime(new_df['日付'].dropna().unique()) if manifest.changed_paths else []
+        if len(replaced_dates):
+            existing_df = existing_df[~existing_df['日付'].isin(replaced_dates)]
         
-        # 日付特徴量の作成
-        df_ml['年'] = df_ml['日付'].dt.year
-        df_ml['月'] = df_ml['日付'].dt.month
-        df_ml['日'] = df_ml['日付'].dt.day
-        df_ml['曜日'] = df_ml['日付'].dt.dayofweek
+        combined_df = pd.concat([existing_df, new_df], ignore_index=True)
+        if not len(replaced_dates) and set(new_df.columns) <= set(existing_df.columns):
+            target = writer.append(new_df.reindex(columns=existing_df.columns), output_path, name)
+            print(f"既存データに追記: {target} (+{len(new_df)} レコード)")
+        else:
+            target = writer.write(combined_df, output_path, name)
+            print(f"既存データを更新: {target} ({len(combined_df)} レコード)")
         
-        # カテゴリカル変数のエンコーディング
-        df_ml['レース場コード_encoded'] = pd.Categorical(df_ml['レース場コード']).codes
-        df_ml['レース場名_encoded'] = pd.Categorical(df_ml['レース場名']).codes
+        return combined_df
+    
+    def get_human_readable_data(self) -> pd.DataFrame:
+        """人間が読みやすい形式でデータを取得（オッズは get_odds_data で別に取得）"""
+        if not self.race_data:
+            return pd.DataFrame()
         
-        # 数値特徴量の正規化
-        numeric_features = ['年齢', '体重', '展示タイム', 'スタートタイミング']
-        for feature in numeric_features:
-            if feature in df_ml.columns:
-                df_ml[f'{feature}_normalized'] = (df_ml[feature] - df_ml[feature].mean()) / df_ml[feature].std()
+        # データ型の最適化（前回から追加されたレコードのみ変換してキャッシュに連結）
+        return self.human_cache.get(self.race_data)
+    
+    def apply_odds_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """オッズテーブルのデータ型に変換（一部の列だけのDataFrameはある列のみ変換）"""
+        if '日付' in df.columns:
+            df['日付'] = pd.to_datetime(df['日付'])
+        for col in ['レース場コード', '券種']:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        if 'レース番号' in df.columns:
+            df['レース番号'] = pd.to_numeric(df['レース番号']).astype('int64')
+        if '組番' in df.columns:
+            df['組番'] = df['組番'].astype('string')
+        if 'オッズ' in df.columns:
+            df['オッズ'] = pd.to_numeric(df['オッズ'], errors='coerce').astype('float64')
+        for col in ['払戻金', '人気']:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int64')
+        return df
+    
+    def get_odds_data(self) -> pd.DataFrame:
+        """オッズを (日付, レース場コード, レース番号, 券種, 組番) 単位の縦持ちテーブルで取得"""
+        if not self.odds_data:
+            return self.apply_odds_dtypes(pd.DataFrame({name: [] for name, _ in ODDS_DATA_SCHEMA}))
+        return self.odds_cache.get(self.odds_data)
+    
+    def query(self, output_dir: Optional[str] = None, name: str = HUMAN_READABLE_NAME,
+              output_format: str = 'csv', compression: Optional[str] = None,
+              partition: bool = False) -> DatasetQuery:
+        """
+        遅延評価のクエリを作成（select / where / limit で条件を加え、collect で読み込む）
+        output_dir を省略するとメモリ上の列指向バッファ、指定すると save_analysis_results で保存した出力が対象
+        """
+        if output_dir is None:
+            sources = {
+                HUMAN_READABLE_NAME: BufferSource(self.race_data, self.apply_human_readable_dtypes),
+                ODDS_NAME: BufferSource(self.odds_data, self.apply_odds_dtypes)
+            }
+            if name not in sources:
+                raise ValueError(f"メモリ上のデータで検索できるのは {', '.join(sources)} です")
+            return DatasetQuery(sources[name], venue_mapping=self.venue_mapping)
         
-        # オッズ関連の特徴量
-        odds_columns = [col for col in df_ml.columns if col.startswith('オッズ_')]
-        for col in odds_columns:
-            df_ml[f'{col}_normalized'] = (df_ml[col] - df_ml[col].mean()) / df_ml[col].std()
+        writer = get_writer(output_format, compression, ('日付', 'レース場コード') if partition else None)
+        if name == HUMAN_READABLE_NAME:
+            source = FileSource(writer, output_dir, name, HUMAN_READABLE_READ_DTYPES, self.restore_human_readable_dtypes)
+        elif name == ODDS_NAME:
+            source = FileSource(writer, output_dir, name, ODDS_READ_DTYPES, self.restore_odds_dtypes)
+        else:
+            source = FileSource(writer, output_dir, name, {'レース場コード': str})
+        return DatasetQuery(source, venue_mapping=self.venue_mapping)
+    
+    def pivot_odds(self, odds_df: pd.DataFrame, bet_types: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        オッズをレース単位の横持ち（オッズ_{券種}_{組番} 列）に変換
+        bet_types を指定するとその券種のみを展開する（例: ['single', 'exacta']）
+        """
+        if bet_types is not None:
+            odds_df = odds_df[odds_df['券種'].isin(bet_types)]
+        if odds_df.empty:
+            return pd.DataFrame(columns=RACE_KEY_COLUMNS)
         
-        return df_ml
+        columns = 'オッズ_' + odds_df['券種'].astype(str) + '_' + odds_df['組番'].astype(str).str.replace('-', '_')
+        wide = (odds_df.assign(列=columns.to_numpy())
+                .drop_duplicates(RACE_KEY_COLUMNS + ['列'], keep='last')
+                .pivot(index=RACE_KEY_COLUMNS, columns='列', values='オッズ'))
+        # 列は出現順に並べる
+        wide = wide[list(pd.unique(columns))]
+        wide.columns.name = None
+        return wide.reset_index()
     
-    def save_analysis_results(self, output_dir: str = "boat_race_analysis"):
-        """分析結果を保存"""
-        if not self.race_data:
-            print("保存するデータがありません")
-            return
+    def join_odds(self, df: pd.DataFrame, odds_df: pd.DataFrame,
+                  bet_types: Optional[List[str]] = None) -> pd.DataFrame:
+        """選手単位のデータにレース単位のオッズ列を結合"""
+        wide = self.pivot_odds(odds_df, bet_types)
+        if len(wide.columns) == len(RACE_KEY_COLUMNS):
+            return df
+        for col in RACE_KEY_COLUMNS:
+            wide[col] = wide[col].astype(df[col].dtype)
+        return df.merge(wide, on=RACE_KEY_COLUMNS, how='left')
+    
+    def get_ml_ready_data(self, odds_bet_types: Optional[List[str]] = None,
+                          transformer: Optional[FeatureTransformer] = None) -> pd.DataFrame:
+        """
+        機械学習に適した形式でデータを取得
+        odds_bet_types で結合するオッズの券種を指定（None は全券種、[] はオッズなし）
+        transformer を指定すると学習済みの統計量で変換し、省略時は全データで学習する
+        レコードが追加されるまでは前回の結果を再利用する
+        """
+        if transformer is not None:
+            return self.build_ml_ready_data(self.get_human_readable_data(), self.get_odds_data(),
+                                            odds_bet_types, transformer)
+        key = (self.race_data.state_key(), self.odds_data.state_key(),
+               None if odds_bet_types is None else tuple(odds_bet_types))
+        if self.ml_cache is None or self.ml_cache[0] != key:
+            df_ml = self.build_ml_ready_data(self.get_human_readable_data(), self.get_odds_data(), odds_bet_types)
+            self.ml_cache = (key, df_ml, self.feature_transformer)
+        _, df_ml, self.feature_transformer = self.ml_cache
+        return df_ml.copy(deep=False)
+    
+    def build_ml_ready_data(self, df: pd.DataFrame, odds_df: Optional[pd.DataFrame] = None,
+                            odds_bet_types: Optional[List[str]] = None,
+                            transformer: Optional[FeatureTransformer] = None) -> pd.DataFrame:
+        """
+        人間が読みやすい形式のデータとオッズテーブルから機械学習用の特徴量を作成
+        transformer を省略すると df で学習した変換器を作成し、self.feature_transformer に保持する
+        """
+        if df.empty:
+            return df
         
-        output_path = Path(output_dir)
-        output_path.mkdir(exist_ok=True)
+        if odds_df is not None:
+            df = self.join_odds(df, odds_df, odds_bet_types)
         
-        # 人間が読みやすい形式
-        human_df = self.get_human_readable_data()
-        human_file = output_path / "boat_race_human_readable.csv"
-        human_df.to_csv(human_file, index=False, encoding='utf-8-sig')
-        print(f"人間読みやすい形式保存: {human_file}")
-        
-        # 機械学習用形式
-        ml_df = self.get_ml_ready_data()
-        ml_file = output_path / "boat_race_ml_ready.csv"
-        ml_df.to_csv(ml_file, index=False, encoding='utf-8-sig')
-        print(f"機械学習用形式保存: {ml_file}")
-        
-        # 統計情報（JSONシリアライゼーション対応）
+        if transformer is None:
+            transformer = FeatureTransformer(self.venue_mapping).fit(df)
+            self.feature_transformer = transformer
+        else:
+            df = self.align_odds_columns(df, transformer)
+        return transformer.transform(df)
+    
+    def align_odds_columns(self, df: pd.DataFrame, transformer: FeatureTransformer) -> pd.DataFrame:
+        """オッズ列を学習時の列に揃える（出現しない組番は欠損値、学習時にない組番の列は除き、列構成を学習時と同じにする）"""
+        odds_columns = [col for col in transformer.stats if col.startswith(ODDS_PREFIX)]
+        return df.reindex(columns=[col for col in df.columns if not col.startswith(ODDS_PREFIX)] + odds_columns)
+    
+    def summarize(self, human_df: pd.DataFrame) -> RunningSummary:
+        """統計情報の集計（ストリーミング出力ではチャンクごとに update する）"""
+        return RunningSummary('日付', 'レース場名', 'レーサーID', sample_size=3).update(human_df)
+    
+    def save_analysis_stats(self, output_path: Path, summary: RunningSummary) -> Path:
+        """統計情報をJSONで保存"""
         stats = {
-            'total_records': int(len(human_df)),
-            'unique_venues': int(human_df['レース場名'].nunique()),
-            'unique_dates': int(human_df['日付'].nunique()),
-            'unique_racers': int(human_df['レーサーID'].nunique()),
-            'venue_distribution': {str(k): int(v) for k, v in human_df['レース場名'].value_counts().items()},
-            'date_range': {
-                'start': str(human_df['日付'].min()),
-                'end': str(human_df['日付'].max())
-            },
-            'columns': [str(col) for col in human_df.columns],
+            **summary.to_dict(),
+            'date_range': summary.date_range(),
+            'columns': summary.columns or [],
+            'racer_line_paths': dict(self.racer_line_counts),
+            'ingest_metrics': self.metrics.summary(),
             'sample_data': []
         }
         
         # サンプルデータをJSON対応形式で準備
-        sample_df = human_df.head(3)
+        sample_df = summary.sample if summary.sample is not None else pd.DataFrame()
         for _, row in sample_df.iterrows():
             sample_record = {}
             for col in sample_df.columns:
@@ -362,6 +598,155 @@ class BoatRaceAnalyzer:
         with open(stats_file, 'w', encoding='utf-8') as f:
             json.dump(stats, f, ensure_ascii=False, indent=2)
         print(f"統計情報保存: {stats_file}")
+        return stats_file
+    
+    def start_streaming(self, output_dir: str = "boat_race_analysis", output_format: str = 'csv',
+                        compression: Optional[str] = None, partition: bool = False,
+                        chunk_rows: int = DEFAULT_CHUNK_ROWS, odds_bet_types: Optional[List[str]] = None,
+                        racer_stats: Optional[RacerStatsStore] = None,
+                        transformer: Optional[FeatureTransformer] = None) -> StreamingSink:
+        """
+        ストリーミング出力を開始（既存の出力は置き換える）
+        以降に取り込んだレコードはファイルごとの処理の後でバッファが chunk_rows 行以上になるたびに書き出し、バッファを空にする
+        機械学習用形式は正規化に全期間の統計量が必要なため、学習済みの transformer を指定した場合のみチャンクごとに書き出す
+        省略時は全チャンクで統計量を学習し、finish_streaming で feature_transformer.json だけを保存する
+        """
+        writer = get_writer(output_format, compression, ('日付', 'レース場コード') if partition else None)
+        self.sink = StreamingSink(writer, Path(output_dir), chunk_rows, RunningSummary(
+            '日付', 'レース場名', 'レーサーID', sample_size=3))
+        self.stream_options = {'odds_bet_types': odds_bet_types, 'racer_stats': racer_stats,
+                               'transformer': transformer}
+        if transformer is None:
+            self.feature_transformer = FeatureTransformer(self.venue_mapping)
+        return self.sink
+    
+    def flush_stream(self, force: bool = False):
+        """バッファのレコードが chunk_rows 行以上（force=True では1行以上）ならチャンクとして書き出してバッファを空にする"""
+        sink = self.sink
+        if sink is None or len(self.race_data) < (1 if force else sink.chunk_rows):
+            return
+        racer_stats = self.stream_options['racer_stats']
+        transformer = self.stream_options['transformer']
+        
+        with self.metrics.stage('frame'):
+            human_df = self.get_human_readable_data()
+            odds_df = self.get_odds_data()
+            racer_features_df = racer_stats.transform(human_df) if racer_stats is not None else None
+            joined_df = self.join_odds(human_df, odds_df, self.stream_options['odds_bet_types'])
+            if transformer is not None:
+                # オッズ列は学習時の列に揃える（列構成をチャンク間で固定する）
+                ml_df = transformer.transform(self.align_odds_columns(joined_df, transformer))
+            else:
+                self.feature_transformer.partial_fit(joined_df)
+                ml_df = None
+        with self.metrics.stage('write'):
+            sink.write(HUMAN_READABLE_NAME, human_df)
+            sink.write(ODDS_NAME, odds_df)
+            if ml_df is not None:
+                sink.write(ML_READY_NAME, ml_df)
+            if racer_features_df is not None:
+                sink.write(RACER_FEATURES_NAME, racer_features_df)
+        sink.summary.update(human_df)
+        print(f"チャンク書き出し: {len(human_df)} レコード（累計 {sink.summary.total_records} レコード）")
+        
+        # 書き出したレコードを破棄（キャッシュも無効化）
+        self.race_data.clear()
+        self.odds_data.clear()
+        self.human_cache.invalidate()
+        self.odds_cache.invalidate()
+        self.ml_cache = None
+    
+    def finish_streaming(self) -> Optional[Dict[str, Path]]:
+        """残りのレコードを書き出してストリームを閉じ、特徴量変換・選手成績の統計量・統計情報を保存"""
+        sink = self.sink
+        if sink is None:
+            print("ストリーミング出力を開始していません")
+            return None
+        self.flush_stream(force=True)
+        targets = sink.close()
+        self.sink = None
+        for name, target in targets.items():
+            print(f"ストリーミング出力保存: {target}")
+        
+        transformer = self.stream_options['transformer'] or self.feature_transformer
+        transformer_file = sink.output_path / FEATURE_TRANSFORMER_FILE_NAME
+        transformer.save(transformer_file)
+        print(f"特徴量変換保存: {transformer_file}")
+        racer_stats = self.stream_options['racer_stats']
+        if racer_stats is not None:
+            print(f"選手成績の統計量保存: {racer_stats.save(sink.output_path / RACER_STATS_FILE_NAME)}")
+        self.save_analysis_stats(sink.output_path, sink.summary)
+        print(f"総レコード数: {sink.summary.total_records}")
+        return targets
+    
+    def save_analysis_results(self, output_dir: str = "boat_race_analysis",
+                              manifest: Optional[IngestManifest] = None,
+                              output_format: str = 'csv', compression: Optional[str] = None,
+                              partition: bool = False, odds_bet_types: Optional[List[str]] = None,
+                              racer_stats: Optional[RacerStatsStore] = None):
+        """
+        分析結果を保存
+        output_format は 'csv' / 'parquet' / 'feather'、partition=True で年/月/会場コードごとに分割して保存
+        オッズは縦持ちのテーブルとして別ファイルに保存し、機械学習用形式には odds_bet_types の券種を結合する
+        manifest を指定すると既存の出力に追記し、保存後にマニフェストを更新する
+        racer_stats を指定すると今回取り込んだレコードの選手の直近成績を保存し、統計量を更新して保存する
+        """
+        if not self.race_data:
+            print("保存するデータがありません")
+            return
+        
+        output_path = Path(output_dir)
+        output_path.mkdir(exist_ok=True)
+        
+        writer = get_writer(output_format, compression, ('日付', 'レース場コード') if partition else None)
+        
+        # 人間が読みやすい形式
+        with self.metrics.stage('frame'):
+            human_df = self.get_human_readable_data()
+            odds_df = self.get_odds_data()
+            # 選手の直近成績（反映済みの日付を含む場合は何も保存せずにエラーにする）
+            racer_features_df = racer_stats.transform(human_df) if racer_stats is not None else None
+        appending = manifest is not None and writer.exists(output_path, HUMAN_READABLE_NAME)
+        with self.metrics.stage('write'):
+            if appending:
+                human_df = self.apply_human_readable_dtypes(self.append_dataset(
+                    writer, output_path, HUMAN_READABLE_NAME,
+                    self.read_human_readable_data(writer, output_path), human_df, manifest))
+                odds_df = self.apply_odds_dtypes(self.append_dataset(
+                    writer, output_path, ODDS_NAME, self.read_odds_data(writer, output_path), odds_df, manifest))
+            else:
+                human_file = writer.write(human_df, output_path, HUMAN_READABLE_NAME)
+                print(f"人間読みやすい形式保存: {human_file}")
+                odds_file = writer.write(odds_df, output_path, ODDS_NAME)
+                print(f"オッズテーブル保存: {odds_file}")
+        
+        # 機械学習用形式（正規化は全期間のデータで行う）
+        with self.metrics.stage('frame'):
+            if appending:
+                ml_df = self.build_ml_ready_data(human_df, odds_df, odds_bet_types)
+            else:
+                ml_df = self.get_ml_ready_data(odds_bet_types)
+        with self.metrics.stage('write'):
+            ml_file = writer.write(ml_df, output_path, ML_READY_NAME)
+            print(f"機械学習用形式保存: {ml_file}")
+            transformer_file = output_path / FEATURE_TRANSFORMER_FILE_NAME
+            self.feature_transformer.save(transformer_file)
+            print(f"特徴量変換保存: {transformer_file}")
+            if racer_stats is not None:
+                if appending and writer.exists(output_path, RACER_FEATURES_NAME):
+                    racer_features_file = writer.append(racer_features_df, output_path, RACER_FEATURES_NAME)
+                else:
+                    racer_features_file = writer.write(racer_features_df, output_path, RACER_FEATURES_NAME)
+                print(f"選手の直近成績保存: {racer_features_file}")
+                racer_stats_file = racer_stats.save(output_path / RACER_STATS_FILE_NAME)
+                print(f"選手成績の統計量保存: {racer_stats_file}")
+        
+        # 統計情報
+        self.save_analysis_stats(output_path, self.summarize(human_df))
+        
+        if manifest is not None:
+            manifest.save()
+            print(f"マニフェスト更新: {manifest.manifest_path}")
         
         # データ概要の表示
         print("\n=== データ概要 ===")
@@ -375,29 +760,34 @@ class BoatRaceAnalyzer:
         
         return human_df, ml_df
 
-def main():
-    """デモンストレーション"""
+def main(incremental: bool = False):
+    """デモンストレーション（incremental=True で前回からの差分のみ処理）"""
     print("=== 競艇データ分析システム ===")
     
     analyzer = BoatRaceAnalyzer()
     
     # サンプルファイルの処理（実際のパスに変更してください）
     kekkaf_dir = r"G:\マイドライブ\BR_python\kekkaf"
+    output_dir = "boat_race_analysis"
+    manifest = IngestManifest.for_output_dir(output_dir) if incremental else None
     
     # ファイル処理
-    processed_count = analyzer.process_files(kekkaf_dir, max_files=5)
+    processed_count = analyzer.process_files(kekkaf_dir, max_files=5, manifest=manifest)
     
     if processed_count > 0:
         # 結果の保存
-        human_df, ml_df = analyzer.save_analysis_results()
+        human_df, ml_df = analyzer.save_analysis_results(output_dir, manifest=manifest)
         
         print("\n=== 分析完了 ===")
         print("以下のファイルが生成されました:")
         print("- boat_race_human_readable.csv (人間が読みやすい形式)")
         print("- boat_race_ml_ready.csv (機械学習用形式)")
+        print("- boat_race_odds.csv (オッズテーブル)")
         print("- analysis_stats.json (統計情報)")
+    elif incremental:
+        print("新しいファイルはありません")
     else:
         print("ファイル処理に失敗しました")
 
 if __name__ == "__main__":
-    main()
+    main(incremental='--incremental' in sys.argv)
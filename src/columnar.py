@@ -0,0 +1,204 @@
+"""
+列指向のレコードバッファ
+選手行を型付き配列（array.array）に列ごとに蓄積し、pandasへは列配列のまま渡す
+"""
+
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# 列の種類 → array.array の型コード
+#   int:   64bit整数
+#   float: 倍精度浮動小数点
+#   str:   文字列プールのコード（32bit整数）
+TYPECODES = {'int': 'q', 'float': 'd', 'str': 'i'}
+NUMPY_DTYPES = {'int': np.int64, 'float': np.float64, 'str': np.int32}
+
+
+class StringPool:
+    """文字列のインターン（同じ文字列は1度だけ保持し、整数コードで参照する）"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def intern(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """コード配列を文字列のobject配列に変換"""
+        return np.array(self.values, dtype=object)[codes]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ColumnarRecordBuffer:
+    """
+    固定スキーマの列指向バッファ
+    schema は (列名, 種類) のリスト
+    list of dict と同じように len / append / extend / 反復が使える
+    """
+
+    def __init__(self, schema: Sequence[Tuple[str, str]]):
+        self.schema = list(schema)
+        self.names = [name for name, _ in self.schema]
+        # clear() のたびに増える世代番号（キャッシュの無効化に使用）
+        self.version = 0
+        self.clear()
+
+    def clear(self):
+        """全レコードを破棄"""
+        self.version += 1
+        self.columns = {name: array(TYPECODES[kind]) for name, kind in self.schema}
+        self.pools = {name: StringPool() for name, kind in self.schema if kind == 'str'}
+        self.row_count = 0
+        # 列ごとの追加処理（文字列はインターンしてから格納）
+        self.appenders = [
+            (self.columns[name].append, self.pools[name].intern if kind == 'str' else None)
+            for name, kind in self.schema
+        ]
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def __bool__(self) -> bool:
+        return self.row_count > 0
+
+    def state_key(self) -> Tuple[int, int, int]:
+        """現在の内容を識別するキー（バッファ, 世代, 行数）"""
+        return (id(self), self.version, self.row_count)
+
+    def append_row(self, values: Sequence):
+        """
+        スキーマ順の値で1行追加（dictを作らない高速パス）
+        途中の列で失敗した場合は追加済みの列を元に戻し、列の長さを揃えたまま例外を送出する
+        """
+        if len(values) != len(self.appenders):
+            raise ValueError(f"値の数が列数と一致しません: {len(values)} != {len(self.appenders)}")
+        try:
+            for (append, intern), value in zip(self.appenders, values):
+                append(intern(value) if intern else value)
+        except BaseException:
+            for column in self.columns.values():
+                if len(column) > self.row_count:
+                    column.pop()
+            raise
+        self.row_count += 1
+
+    def append(self, record: Dict):
+        """dict形式のレコードを1行追加"""
+        for name in record:
+            if name not in self.columns:
+                raise KeyError(f"スキーマにない列です: {name}")
+        self.append_row([record[name] for name in self.names])
+
+    def extend(self, records: Iterable[Dict]):
+        """dict形式のレコードをまとめて追加"""
+        for record in records:
+            self.append(record)
+
+    def to_columns(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """指定範囲の行を列ごとのNumPy配列として取得"""
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        result = {}
+        for name, kind in self.schema:
+            values = np.frombuffer(self.columns[name], dtype=NUMPY_DTYPES[kind])[start:stop] \
+                if self.row_count else np.empty(0, dtype=NUMPY_DTYPES[kind])
+            result[name] = self.pools[name].decode(values) if kind == 'str' else values.copy()
+        return result
+
+    def raw_column(self, name: str) -> np.ndarray:
+        """列の生の値（文字列の列は文字列プールのコード）のコピー"""
+        return self._column_view(name).copy()
+
+    def _column_view(self, name: str) -> np.ndarray:
+        """
+        列の生の値をコピーせずに参照する（クラス内で即座に使い捨てる場合のみ）
+        参照が残っている間は配列を伸ばせず、append が BufferError になるため外には返さない
+        """
+        kind = dict(self.schema)[name]
+        if not self.row_count:
+            return np.empty(0, dtype=NUMPY_DTYPES[kind])
+        return np.frombuffer(self.columns[name], dtype=NUMPY_DTYPES[kind])
+
+    def take(self, rows: np.ndarray, names: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """指定した行番号・列だけを列ごとのNumPy配列として取得（文字列は対象の行だけ復号）"""
+        names = list(self.names) if names is None else list(names)
+        kinds = dict(self.schema)
+        result = {}
+        for name in names:
+            if name not in kinds:
+                raise KeyError(f"存在しない列です: {name}")
+            # take は常に新しい配列を返す（バッファへの参照を残さない）
+            values = self._column_view(name).take(rows)
+            result[name] = self.pools[name].decode(values) if kinds[name] == 'str' else values
+        return result
+
+    def to_frame(self, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        """指定範囲の行をDataFrameとして取得"""
+        if not self.row_count:
+            return pd.DataFrame()
+        return pd.DataFrame(self.to_columns(start, stop))
+
+    def __iter__(self) -> Iterator[Dict]:
+        """dict形式で1行ずつ返す（互換用、大量データでは to_frame を使用）"""
+        columns = self.to_columns()
+        for row in range(self.row_count):
+            record = {}
+            for name, kind in self.schema:
+                value = columns[name][row]
+                record[name] = value if kind == 'str' else value.item()
+            yield record
+
+    def nbytes(self) -> int:
+        """バッファが保持している配列のバイト数（文字列プールを除く）"""
+        return sum(column.buffer_info()[1] * column.itemsize for column in self.columns.values())
+
+
+class FrameCache:
+    """
+    列バッファから作成したDataFrameのキャッシュ
+    バッファに行が追加された場合は追加分だけを変換して末尾に連結し、clear() や差し替えで無効化する
+    """
+
+    def __init__(self, convert: Callable[[pd.DataFrame], pd.DataFrame]):
+        # 生の列データ → 型変換済みDataFrame
+        self.convert = convert
+        self.buffer: Optional[ColumnarRecordBuffer] = None
+        self.version = 0
+        self.rows = 0
+        self.frame: Optional[pd.DataFrame] = None
+
+    def get(self, buffer: ColumnarRecordBuffer) -> pd.DataFrame:
+        """バッファの現在の内容に対応するDataFrame（キャッシュと列データを共有するシャローコピー）"""
+        if self.frame is None or buffer is not self.buffer or buffer.version != self.version \
+                or len(buffer) < self.rows:
+            self.frame = self.convert(buffer.to_frame())
+        elif len(buffer) > self.rows:
+            added = self.convert(buffer.to_frame(self.rows, len(buffer)))
+            self.frame = concat_frames(self.frame, added)
+        self.buffer, self.version, self.rows = buffer, buffer.version, len(buffer)
+        return self.frame.copy(deep=False)
+
+    def invalidate(self):
+        """キャッシュを破棄"""
+        self.buffer = None
+        self.frame = None
+
+
+def concat_frames(head: pd.DataFrame, tail: pd.DataFrame) -> pd.DataFrame:
+    """型変換済みのDataFrameを連結（category列はカテゴリを統合してcategoryのまま保つ）"""
+    combined = pd.concat([head, tail], ignore_index=True)
+    for col in head.columns:
+        if isinstance(head[col].dtype, pd.CategoricalDtype) and col in tail.columns:
+            combined[col] = union_categoricals([head[col], tail[col]], sort_categories=True)
+    return combined
@@ -1,10 +1,47 @@
 import pandas as pd 
-import re
 import json
+import time
+from collections import Counter
 from pathlib import Path
 
+from .kfile_parser import KFileParser, SectionFilter, VENUE_SCAN_LINES
+from .pipeline import iter_parsed_files
+from .discovery import iter_kfiles, resolve_venue_codes
+from .writers import CsvWriter, get_writer
+from .columnar import ColumnarRecordBuffer
+from .metrics import IngestMetrics
+from .streaming import DEFAULT_CHUNK_ROWS, RunningSummary, StreamingSink
+
+# 出力データセット名（拡張子なし）
+MAIN_DATASET_NAME = "kekkaf_2024_main_dataset"
+
+# メインデータセットの列（要求された項目のみ）
+MAIN_COLUMNS = [
+    'date', 'venue_code', 'venue_name',    # レース場
+    'race_number', 'finish_position',      # 着順
+    'boat_number',                         # 艇番
+    'racer_id',                           # レーサーNo
+    'racer_name',                         # 選手名（参考）
+    'exhibition_time',                    # 展示タイム
+    'start_timing',                       # スタートタイミング
+    'race_time'                          # レースタイム
+]
+
+# 選手単位レコードの列
+RECORD_SCHEMA = [
+    ('date', 'str'), ('venue_code', 'str'), ('venue_name', 'str'), ('race_number', 'int'),
+    ('boat_number', 'int'),      # 艇番
+    ('racer_id', 'int'),         # レーサーNo
+    ('racer_name', 'str'), ('age', 'int'), ('weight', 'int'),
+    ('exhibition_time', 'float'),  # 展示タイム
+    ('start_timing', 'float'),     # スタートタイミング
+    ('race_time', 'str'),          # レースタイム
+    ('finish_position', 'int'),    # 着順
+    ('frame_number', 'int')
+]
+
 class QuickKekkaf2024Processor:
-    def __init__(self):
+    def __init__(self, use_mmap=False, metrics=None, parse_cache=None):
         self.venue_mapping = {
             '01': '桐生', '02': '戸田', '03': '江戸川', '04': '平和島', 
             '05': '多摩川', '06': '浜名湖', '07': '蒲郡', '08': '常滑',
@@ -13,159 +50,166 @@ class QuickKekkaf2024Processor:
             '17': '宮島', '18': '徳山', '19': '下関', '20': '若松',
             '21': '芦屋', '22': '福岡', '23': '唐津', '24': '大村'
         }
-        self.race_data = []
+        self.race_data = ColumnarRecordBuffer(RECORD_SCHEMA)
+        # 選手行の解析経路ごとの行数（固定列 / 正規表現 / 不一致）
+        self.racer_line_counts = Counter()
+        # 取り込みの計測（出力先を指定した IngestMetrics を渡すとファイルごとに出力する）
+        self.metrics = metrics or IngestMetrics()
+        # ストリーミング出力（start_streaming で開始し、finish_streaming で統計情報を保存して終了）
+        self.sink = None
+        
+        # 会場名の探索順
+        venue_patterns = ['多摩川', '浜名湖', '蒲郡', '常滑', '津', '三国',
+                          'びわこ', '住之江', '尼崎', '鳴門', '丸亀', '児島',
+                          '宮島', '徳山', '下関', '若松', '芦屋', '福岡',
+                          '唐津', '大村', '桐生', '戸田', '江戸川', '平和島']
+        # parse_cache（ParseCache）を渡すと解析結果をキャッシュする
+        self.parser = KFileParser(self.venue_mapping, venue_patterns, parse_odds=False, use_mmap=use_mmap,
+                                  cache=parse_cache)
     
     def extract_venue_from_line(self, lines):
         """会場情報を抽出"""
-        venue_patterns = ['多摩川', '浜名湖', '蒲郡', '常滑', '津', '三国',
-                         'びわこ', '住之江', '尼崎', '鳴門', '丸亀', '児島',
-                         '宮島', '徳山', '下関', '若松', '芦屋', '福岡',
-                         '唐津', '大村', '桐生', '戸田', '江戸川', '平和島']
-        
-        for line in lines[:30]:
-            for venue in venue_patterns:
-                if venue in line:
-                    # 逆引きで会場コードを取得
-                    for code, name in self.venue_mapping.items():
-                        if name == venue:
-                            return code, venue
+        for line in lines[:VENUE_SCAN_LINES]:
+            venue = self.parser.find_venue(line)
+            if venue is not None:
+                return venue.code, venue.name
         return '', ''
     
-    def process_file(self, file_path):
-        """単一ファイルを処理"""
+    def extract_date(self, filename):
+        """ファイル名から日付を抽出"""
+        if len(filename) >= 7 and filename.upper().startswith('K'):
+            year_code = filename[1:3]  # 24
+            month_code = filename[3:5]  # 01-12
+            day_code = filename[5:7]   # 01-31
+            year = 2000 + int(year_code)
+            month = int(month_code)
+            day = int(day_code)
+            return f"{year:04d}-{month:02d}-{day:02d}"
+        return "unknown"
+    
+    def append_records(self, date_str, section):
+        """会場セクションの解析結果を選手単位のレコードとして列バッファに追加"""
+        append_row = self.race_data.append_row
+        self.racer_line_counts.update(section.racer_line_counts)
+        for racer in section.racers:
+            append_row((
+                date_str, section.venue_code, section.venue_name, racer.race_number,
+                racer.boat_number, racer.racer_id, racer.racer_name, racer.age, racer.weight,
+                racer.exhibition_time, racer.start_timing, racer.race_time,
+                section.finish_position(racer.race_number, racer.boat_number),
+                racer.frame_number
+            ))
+    
+    def ingest_parsed_file(self, file_path, parsed, venue_codes=None):
+        """解析済みの結果を会場セクションごとにレコードとして追加（会場指定がある場合は一致するもののみ）"""
+        start = time.perf_counter()
+        date_str = self.extract_date(file_path.stem)
+        sections = parsed.select_venues(venue_codes)
+        for section in sections:
+            self.append_records(date_str, section)
+        self.metrics.record_file(file_path, parsed, sections, time.perf_counter() - start)
+    
+    def process_file(self, file_path, venue_codes=None, race_numbers=None):
+        """単一ファイルを処理（対象外の会場・レースは解析しない）"""
         print(f"処理中: {file_path.name}")
         
         try:
-            with open(file_path, 'r', encoding='shift_jis', errors='ignore') as f:
-                lines = f.readlines()
-            
-            # 日付抽出
-            filename = file_path.stem
-            if len(filename) >= 7 and filename.upper().startswith('K'):
-                year_code = filename[1:3]  # 24
-                month_code = filename[3:5]  # 01-12
-                day_code = filename[5:7]   # 01-31
-                year = 2000 + int(year_code)
-                month = int(month_code)
-                day = int(day_code)
-                date_str = f"{year:04d}-{month:02d}-{day:02d}"
-            else:
-                date_str = "unknown"
-            
-            # 会場情報
-            venue_code, venue_name = self.extract_venue_from_line(lines)
-            
-            # レース結果（着順）を解析
-            race_results = {}
-            for line in lines:
-                line = line.strip()
-                race_result_match = re.search(r'(\d+)R\s+([1-6]-[1-6]-[1-6])\s+(\d+)', line)
-                if race_result_match:
-                    race_number = int(race_result_match.group(1))
-                    finish_combination = race_result_match.group(2)
-                    positions = finish_combination.split('-')
-                    if len(positions) == 3:
-                        race_results[race_number] = {
-                            'first': int(positions[0]),
-                            'second': int(positions[1]), 
-                            'third': int(positions[2])
-                        }
-            
-            # 選手データを解析
-            current_race = None
-            for line_num, line in enumerate(lines):
-                line_original = line
-                line = line.strip()
-                
-                # レース番号の検出
-                race_match = re.search(r'(\d+)R', line)
-                if race_match:
-                    current_race = int(race_match.group(1))
-                
-                # 選手情報の行を検出（日本語文字エンコード対応）
-                if current_race and len(line_original) >= 40:
-                    try:
-                        # 正規表現で選手データを抽出
-                        # 例: "  01  1 3501 佐々木  康幸 50   12  6.89   1    0.08     1.49.7"
-                        match = re.match(r'\s*(\d{2})\s+(\d)\s+(\d{4})\s+(.{8,12})\s+(\d{2})\s+(\d{1,3})\s+(\d\.\d{2})\s+(\d)\s+([\d\.+-]+)\s+([\d\.:]*)', line_original)
-                        if match:
-                            frame_number = int(match.group(1))
-                            boat_number = int(match.group(2))
-                            racer_id = int(match.group(3))
-                            racer_name = match.group(4).strip()
-                            age = int(match.group(5))
-                            weight = int(match.group(6))
-                            exhibition_time = float(match.group(7))
-                            position = int(match.group(8))
-                            start_timing = float(match.group(9)) if match.group(9) and match.group(9) != '.' else 0.0
-                            race_time = match.group(10) if match.group(10) and match.group(10) != '.' else ""
-                            
-                            # 着順を計算
-                            finish_position = 0
-                            if current_race in race_results:
-                                result = race_results[current_race]
-                                if boat_number == result['first']:
-                                    finish_position = 1
-                                elif boat_number == result['second']:
-                                    finish_position = 2
-                                elif boat_number == result['third']:
-                                    finish_position = 3
-                                else:
-                                    finish_position = 4  # 4着以下
-                            
-                            # データを統合
-                            self.race_data.append({
-                                'date': date_str,
-                                'venue_code': venue_code,
-                                'venue_name': venue_name,
-                                'race_number': current_race,
-                                'boat_number': boat_number,     # 艇番
-                                'racer_id': racer_id,          # レーサーNo
-                                'racer_name': racer_name,
-                                'age': age,
-                                'weight': weight,
-                                'exhibition_time': exhibition_time,  # 展示タイム
-                                'start_timing': start_timing,        # スタートタイミング
-                                'race_time': race_time,              # レースタイム
-                                'finish_position': finish_position,  # 着順
-                                'frame_number': frame_number
-                            })
-                    except Exception as e:
-                        continue
-                        
+            # 1パスで着順・選手データを解析
+            parsed = self.parser.parse_file(file_path, SectionFilter(venue_codes, race_numbers))
+            self.ingest_parsed_file(file_path, parsed, venue_codes)
             return True
             
         except Exception as e:
             print(f"エラー: {file_path} - {e}")
+            self.metrics.record_file(file_path, error=str(e))
             return False
     
-    def process_sample_files(self, kekkaf_dir, max_files=10):
-        """サンプルファイルを処理"""
-        kekkaf_path = Path(kekkaf_dir)
+    def process_sample_files(self, kekkaf_dir, max_files=10, start_date=None, end_date=None, venues=None,
+                             parallel=False, max_workers=None, chunksize=1, manifest=None, race_numbers=None):
+        """
+        サンプルファイルを処理
+        kekkaf_dir 配下のK-fileを日付順に処理（start_date/end_date で期間、venues で会場、race_numbers でレース番号を指定）
+        会場・レース番号はセクション・レースの見出しで判定し、対象外の部分は解析しない
+        parallel=True でプロセスプールを使用、manifest 指定時は処理済みファイルを読み飛ばす
+        """
         processed_count = 0
+        venue_codes = resolve_venue_codes(venues, self.venue_mapping)
+        race_numbers = set(race_numbers) if race_numbers is not None else None
+        file_paths = iter_kfiles(kekkaf_dir, start_date, end_date)
+        if manifest is not None:
+            file_paths = manifest.filter_unprocessed(file_paths)
         
-        # 2024年の各月から少しずつファイルを処理
-        for month in range(1, 13):
-            if processed_count >= max_files:
-                break
-                
-            month_dir = f"2024{month:02d}"
-            month_path = kekkaf_path / month_dir
-            
-            if month_path.exists():
-                txt_files = list(month_path.glob("*.TXT"))
-                if txt_files:
-                    # 各月の最初のファイルを処理
-                    first_file = sorted(txt_files)[0]
-                    if self.process_file(first_file):
-                        processed_count += 1
-                        print(f"  -> 処理完了: {len(self.race_data)} レコード")
+        if parallel:
+            section_filter = SectionFilter(venue_codes, race_numbers)
+            for file_path, parsed, error in iter_parsed_files(self.parser, file_paths, max_workers, chunksize,
+                                                              section_filter):
+                if max_files and processed_count >= max_files:
+                    break
+                print(f"処理中: {file_path.name}")
+                if error is not None:
+                    print(f"エラー: {file_path} - {error}")
+                    self.metrics.record_file(file_path, error=error)
+                    continue
+                record_count = len(self.race_data)
+                self.ingest_parsed_file(file_path, parsed, venue_codes)
+                if manifest is not None:
+                    manifest.mark_processed(file_path, len(self.race_data) - record_count)
+                processed_count += 1
+                print(f"  -> 処理完了: {len(self.race_data)} レコード")
+                self.flush_stream()
+        else:
+            for file_path in file_paths:
+                if max_files and processed_count >= max_files:
+                    break
+                record_count = len(self.race_data)
+                if self.process_file(file_path, venue_codes, race_numbers):
+                    if manifest is not None:
+                        manifest.mark_processed(file_path, len(self.race_data) - record_count)
+                    processed_count += 1
+                    print(f"  -> 処理完了: {len(self.race_data)} レコード")
+                    self.flush_stream()
         
         print(f"\n処理完了: {processed_count} ファイル, {len(self.race_data)} レコード")
+        self.metrics.finish()
         return processed_count > 0
     
-    def save_sample_dataset(self, output_dir="kekkaf_2024_sample"):
-        """サンプルデータセットを保存"""
+    def with_typed_columns(self, main_dataset):
+        """列指向形式向けに日付をdatetime、会場をcategoryに変換"""
+        main_dataset['date'] = pd.to_datetime(main_dataset['date'], errors='coerce')
+        main_dataset['venue_code'] = main_dataset['venue_code'].astype('category')
+        main_dataset['venue_name'] = main_dataset['venue_name'].astype('category')
+        return main_dataset
+    
+    def append_main_dataset(self, writer, output_path, main_dataset, manifest):
+        """
+        既存のメインデータセットに追記し、結合後のデータを返す
+        内容が変わったファイルの日付のレコードは置き換えて全体を書き直す
+        """
+        existing = writer.read(output_path, MAIN_DATASET_NAME,
+                               dtype={'date': str, 'venue_code': str, 'venue_name': str, 'race_time': str})
+        if isinstance(writer, CsvWriter):
+            for col in ['venue_code', 'venue_name', 'race_time']:
+                existing[col] = existing[col].fillna('')
+        replaced_dates = {self.extract_date(Path(path).stem) for path in manifest.changed_paths}
+        
+        if replaced_dates:
+            existing = existing[~existing['date'].astype(str).isin(replaced_dates)]
+            combined = pd.concat([existing, main_dataset], ignore_index=True)
+            target = writer.write(combined, output_path, MAIN_DATASET_NAME)
+            print(f"メインデータセット更新: {target}")
+        else:
+            combined = pd.concat([existing, main_dataset], ignore_index=True)
+            target = writer.append(main_dataset, output_path, MAIN_DATASET_NAME)
+            print(f"メインデータセット追記: {target} (+{len(main_dataset)} レコード)")
+        return combined
+    
+    def save_sample_dataset(self, output_dir="kekkaf_2024_sample", manifest=None,
+                            output_format='csv', compression=None, partition=False):
+        """
+        サンプルデータセットを保存
+        output_format は 'csv' / 'parquet' / 'feather'、partition=True で年/月/会場コードごとに分割して保存
+        manifest を指定すると既存のデータセットに追記し、保存後にマニフェストを更新する
+        """
         if not self.race_data:
             print("保存するデータがありません")
             return
@@ -173,25 +217,22 @@ class QuickKekkaf2024Processor:
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
         
-        # DataFrame作成
-        df = pd.DataFrame(self.race_data)
-        
-        # メインデータセット（要求された項目のみ）
-        main_columns = [
-            'date', 'venue_code', 'venue_name',    # レース場
-            'race_number', 'finish_position',      # 着順
-            'boat_number',                         # 艇番
-            'racer_id',                           # レーサーNo
-            'racer_name',                         # 選手名（参考）
-            'exhibition_time',                    # 展示タイム
-            'start_timing',                       # スタートタイミング
-            'race_time'                          # レースタイム
-        ]
+        # DataFrame作成（列バッファから直接）
+        with self.metrics.stage('frame'):
+            df = self.race_data.to_frame()
         
-        main_dataset = df[main_columns].copy()
-        main_file = output_path / "kekkaf_2024_main_dataset.csv"
-        main_dataset.to_csv(main_file, index=False, encoding='utf-8-sig')
-        print(f"メインデータセット保存: {main_file}")
+        writer = get_writer(output_format, compression, ('date', 'venue_code') if partition else None)
+        with self.metrics.stage('frame'):
+            main_dataset = df[MAIN_COLUMNS].copy()
+            if not isinstance(writer, CsvWriter):
+                main_dataset = self.with_typed_columns(main_dataset)
+        with self.metrics.stage('write'):
+            if manifest is not None and writer.exists(output_path, MAIN_DATASET_NAME):
+                # 統計情報は追記後の全データで計算
+                df = main_dataset = self.append_main_dataset(writer, output_path, main_dataset, manifest)
+            else:
+                main_file = writer.write(main_dataset, output_path, MAIN_DATASET_NAME)
+                print(f"メインデータセット保存: {main_file}")
         print(f"レコード数: {len(main_dataset)}")
         
         # データサンプル表示
@@ -199,17 +240,65 @@ class QuickKekkaf2024Processor:
         print(main_dataset.head())
         
         # 統計情報
+        summary = RunningSummary('date', 'venue_name', 'racer_id').update(df)
+        summary.sample = main_dataset.head(5)
+        self.save_dataset_stats(output_path, summary)
+        
+        if manifest is not None:
+            manifest.save()
+            print(f"マニフェスト更新: {manifest.manifest_path}")
+    
+    def save_dataset_stats(self, output_path, summary):
+        """統計情報をJSONで保存"""
         stats = {
-            'total_records': len(df),
-            'unique_venues': df['venue_name'].nunique(),
-            'unique_dates': df['date'].nunique(),
-            'unique_racers': df['racer_id'].nunique(),
-            'venue_distribution': df['venue_name'].value_counts().to_dict(),
-            'sample_data': main_dataset.head(5).to_dict('records')
+            **summary.to_dict(),
+            'racer_line_paths': dict(self.racer_line_counts),
+            'ingest_metrics': self.metrics.summary(),
+            'sample_data': summary.sample.to_dict('records') if summary.sample is not None else []
         }
         
         stats_file = output_path / "dataset_stats.json"
         with open(stats_file, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
+            json.dump(stats, f, ensure_ascii=False, indent=2, default=str)
         print(f"統計情報保存: {stats_file}")
-
+        return stats_file
+    
+    def start_streaming(self, output_dir="kekkaf_2024_sample", output_format='csv', compression=None,
+                        partition=False, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        ストリーミング出力を開始（既存のメインデータセットは置き換える）
+        以降に取り込んだレコードはファイルごとの処理の後でバッファが chunk_rows 行以上になるたびに書き出し、バッファを空にする
+        """
+        writer = get_writer(output_format, compression, ('date', 'venue_code') if partition else None)
+        self.sink = StreamingSink(writer, Path(output_dir), chunk_rows, RunningSummary('date', 'venue_name', 'racer_id'))
+        return self.sink
+    
+    def flush_stream(self, force=False):
+        """バッファのレコードが chunk_rows 行以上（force=True では1行以上）ならチャンクとして書き出してバッファを空にする"""
+        sink = self.sink
+        if sink is None or len(self.race_data) < (1 if force else sink.chunk_rows):
+            return
+        with self.metrics.stage('frame'):
+            main_dataset = self.race_data.to_frame()[MAIN_COLUMNS]
+            if not isinstance(sink.writer, CsvWriter):
+                main_dataset = self.with_typed_columns(main_dataset)
+        with self.metrics.stage('write'):
+            sink.write(MAIN_DATASET_NAME, main_dataset)
+        sink.summary.update(main_dataset)
+        print(f"チャンク書き出し: {len(main_dataset)} レコード（累計 {sink.summary.total_records} レコード）")
+        self.race_data.clear()
+    
+    def finish_streaming(self):
+        """残りのレコードを書き出してストリームを閉じ、統計情報を保存"""
+        sink = self.sink
+        if sink is None:
+            print("ストリーミング出力を開始していません")
+            return None
+        self.flush_stream(force=True)
+        targets = sink.close()
+        self.sink = None
+        for target in targets.values():
+            print(f"メインデータセット保存: {target}")
+        self.save_dataset_stats(sink.output_path, sink.summary)
+        print(f"レコード数: {sink.summary.total_records}")
+        return targets
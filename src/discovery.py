@@ -0,0 +1,137 @@
+"""
+K-file・B-fileアーカイブのファイル探索
+os.scandirでディレクトリを逐次走査し、条件に合うK-file（競走成績）・B-file（番組表）を見つけ次第返す
+"""
+
+import os
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Pattern, Set, Union
+
+# K240101.TXT / k240101.txt など（大文字小文字を区別しない）
+KFILE_NAME_PATTERN = re.compile(r'^K(\d{2})(\d{2})(\d{2})\.TXT$', re.IGNORECASE)
+# B240101.TXT など（番組表）
+BFILE_NAME_PATTERN = re.compile(r'^B(\d{2})(\d{2})(\d{2})\.TXT$', re.IGNORECASE)
+
+# 年月フォルダ（202401）・年フォルダ（2024）
+MONTH_DIR_PATTERN = re.compile(r'^(\d{4})(\d{2})$')
+YEAR_DIR_PATTERN = re.compile(r'^(\d{4})$')
+
+DateLike = Union[str, date, None]
+
+
+def to_date(value: DateLike) -> Optional[date]:
+    """'YYYY-MM-DD' 文字列・date・datetimeをdateに変換"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+def parse_kfile_date(filename: str, name_pattern: Pattern = KFILE_NAME_PATTERN) -> Optional[date]:
+    """K-file（name_pattern を指定した場合はそのファイル名）から開催日を取得（一致しなければNone）"""
+    match = name_pattern.match(filename)
+    if not match:
+        return None
+    year, month, day = (int(g) for g in match.groups())
+    try:
+        return date(2000 + year, month, day)
+    except ValueError:
+        return None
+
+
+def resolve_venue_codes(venues: Optional[Iterable[Union[str, int]]], venue_mapping: Dict[str, str]) -> Optional[Set[str]]:
+    """会場名・会場コードの指定を会場コードの集合に変換"""
+    if venues is None:
+        return None
+    name_to_code = {name: code for code, name in venue_mapping.items()}
+    codes = set()
+    for venue in venues:
+        key = f"{venue:02d}" if isinstance(venue, int) else str(venue)
+        if key in venue_mapping:
+            codes.add(key)
+        elif key in name_to_code:
+            codes.add(name_to_code[key])
+        else:
+            raise ValueError(f"不明な会場: {venue}")
+    return codes
+
+
+class KFileDiscovery:
+    """
+    アーカイブ配下のK-fileを日付範囲で絞り込みながら列挙するクラス
+    年・年月フォルダは名前で範囲外を判定し、中身を走査せずに読み飛ばす
+    name_pattern に BFILE_NAME_PATTERN を指定するとB-fileを列挙する
+    """
+
+    def __init__(self, start_date: DateLike = None, end_date: DateLike = None,
+                 name_pattern: Pattern = KFILE_NAME_PATTERN):
+        self.start_date = to_date(start_date)
+        self.end_date = to_date(end_date)
+        self.name_pattern = name_pattern
+
+    def accepts_date(self, file_date: date) -> bool:
+        """開催日が範囲内かどうか"""
+        if self.start_date and file_date < self.start_date:
+            return False
+        if self.end_date and file_date > self.end_date:
+            return False
+        return True
+
+    def accepts_directory(self, name: str) -> bool:
+        """年・年月フォルダが範囲と重なるかどうか"""
+        month_match = MONTH_DIR_PATTERN.match(name)
+        if month_match:
+            year, month = int(month_match.group(1)), int(month_match.group(2))
+            if not 1 <= month <= 12:
+                return True
+            key = (year, month)
+        else:
+            year_match = YEAR_DIR_PATTERN.match(name)
+            if not year_match:
+                return True
+            year = int(year_match.group(1))
+            if self.start_date and year < self.start_date.year:
+                return False
+            if self.end_date and year > self.end_date.year:
+                return False
+            return True
+        if self.start_date and key < (self.start_date.year, self.start_date.month):
+            return False
+        if self.end_date and key > (self.end_date.year, self.end_date.month):
+            return False
+        return True
+
+    def iter_files(self, root: Union[str, Path]) -> Iterator[Path]:
+        """ルート配下を再帰的に走査し、K-fileを日付順（名前順）に返す"""
+        try:
+            with os.scandir(root) as it:
+                entries = sorted(it, key=lambda entry: entry.name.upper())
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if self.accepts_directory(entry.name):
+                    yield from self.iter_files(entry.path)
+            elif entry.is_file() and self.accepts_file(entry.name):
+                yield Path(entry.path)
+
+    def accepts_file(self, name: str) -> bool:
+        """対象のファイル名で、開催日が範囲内かどうか"""
+        file_date = parse_kfile_date(name, self.name_pattern)
+        return file_date is not None and self.accepts_date(file_date)
+
+
+def iter_kfiles(root: Union[str, Path], start_date: DateLike = None, end_date: DateLike = None) -> Iterator[Path]:
+    """K-fileを逐次列挙"""
+    return KFileDiscovery(start_date, end_date).iter_files(root)
+
+
+def iter_bfiles(root: Union[str, Path], start_date: DateLike = None, end_date: DateLike = None) -> Iterator[Path]:
+    """B-file（番組表）を逐次列挙"""
+    return KFileDiscovery(start_date, end_date, BFILE_NAME_PATTERN).iter_files(root)
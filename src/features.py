@@ -0,0 +1,180 @@
+"""
+機械学習用の特徴量変換
+正規化の統計量（件数・平均・偏差平方和）と会場コードの語彙を保持し、学習時と推論時で同じ変換を行う
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+# 正規化する数値特徴量（オッズ_ で始まる列も対象）
+NUMERIC_FEATURES = ['年齢', '体重', '展示タイム', 'スタートタイミング']
+ODDS_PREFIX = 'オッズ_'
+TRANSFORMER_VERSION = 1
+
+# レース内の相対特徴量を作る列（どちらも小さいほど良い）とレースを識別する列
+RACE_RELATIVE_FEATURES = ['展示タイム', 'スタートタイミング']
+RACE_KEY_COLUMNS = ['日付', 'レース場コード', 'レース番号']
+
+
+def add_race_relative_features(df: pd.DataFrame, columns: List[str] = RACE_RELATIVE_FEATURES) -> pd.DataFrame:
+    """
+    同じレースの出走艇と比べた特徴量を追加（レース内順位・レース平均との差・最良値との差）
+    レースごとのループは使わず、レース番号を振ってから groupby の transform / rank でまとめて計算する
+    """
+    columns = [col for col in columns if col in df.columns]
+    if not columns or df.empty:
+        return df
+    race_id = df.groupby(RACE_KEY_COLUMNS, sort=False, observed=True, dropna=False).ngroup().to_numpy()
+    grouped = df[columns].groupby(race_id, sort=False)
+    means = grouped.transform('mean')
+    bests = grouped.transform('min')
+    ranks = grouped.rank(method='min')
+    added = {}
+    for col in columns:
+        added[f'{col}_レース内順位'] = ranks[col].to_numpy()
+        added[f'{col}_レース平均差'] = (df[col] - means[col]).to_numpy()
+        added[f'{col}_最良差'] = (df[col] - bests[col]).to_numpy()
+    return attach_columns(df, added)
+
+
+def attach_columns(df: pd.DataFrame, columns: Dict[str, object]) -> pd.DataFrame:
+    """
+    列をまとめて追加（1列ずつ追加するとブロックが断片化するため、新しい列は1回の concat でつなぐ）
+    既にある列は同じ位置で置き換える
+    """
+    added = pd.DataFrame(columns, index=df.index)
+    existing = [col for col in added.columns if col in df.columns]
+    if existing:
+        df = df.copy()
+        df[existing] = added[existing]
+        added = added.drop(columns=existing)
+    return pd.concat([df, added], axis=1)
+
+
+class RunningStats:
+    """件数・平均・偏差平方和を逐次更新する（バッチ単位でWelford/Chanの方法で統合）"""
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, values: np.ndarray):
+        """欠損値を除いた値を統計量に加える"""
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        count = len(values)
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    @property
+    def std(self) -> float:
+        """標本標準偏差（pandasのstdと同じ ddof=1）"""
+        if self.count < 2:
+            return np.nan
+        return float(np.sqrt(self.m2 / (self.count - 1)))
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RunningStats':
+        return cls(data['count'], data['mean'], data['m2'])
+
+
+class FeatureTransformer:
+    """
+    人間が読みやすい形式のデータ（オッズ列結合済み）から機械学習用の特徴量を作成する
+    fit / partial_fit で統計量を蓄積し、transform は統計量を変えずにバッチ単位で変換する
+    会場コード・会場名のエンコーディングは venue_mapping の固定の語彙（コード順）を使う
+    """
+
+    def __init__(self, venue_mapping: Dict[str, str]):
+        self.venue_codes: List[str] = sorted(venue_mapping)
+        self.venue_names: List[str] = [venue_mapping[code] for code in self.venue_codes]
+        # 特徴量名 → 統計量（追加順が出力列の順序になる）
+        self.stats: Dict[str, RunningStats] = {}
+
+    def feature_columns(self, df: pd.DataFrame) -> List[str]:
+        """正規化の対象になる列"""
+        return [col for col in NUMERIC_FEATURES if col in df.columns] + \
+            [col for col in df.columns if col.startswith(ODDS_PREFIX)]
+
+    def fit(self, df: pd.DataFrame) -> 'FeatureTransformer':
+        """統計量を初期化してから学習"""
+        self.stats = {}
+        return self.partial_fit(df)
+
+    def partial_fit(self, df: pd.DataFrame) -> 'FeatureTransformer':
+        """バッチの統計量を既存の統計量に統合"""
+        for col in self.feature_columns(df):
+            stats = self.stats.setdefault(col, RunningStats())
+            stats.update(pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan))
+        return self
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """学習済みの統計量・語彙で特徴量を追加（入力は変更しない）"""
+        df_ml = df.copy()
+
+        # 日付特徴量の作成
+        df_ml['年'] = df_ml['日付'].dt.year
+        df_ml['月'] = df_ml['日付'].dt.month
+        df_ml['日'] = df_ml['日付'].dt.day
+        df_ml['曜日'] = df_ml['日付'].dt.dayofweek
+
+        # 同じレースの出走艇との比較（学習した統計量は使わない）
+        df_ml = add_race_relative_features(df_ml)
+
+        # カテゴリカル変数のエンコーディング（語彙にない値は -1）
+        df_ml['レース場コード_encoded'] = pd.Categorical(
+            df_ml['レース場コード'].astype(str), categories=self.venue_codes).codes
+        df_ml['レース場名_encoded'] = pd.Categorical(
+            df_ml['レース場名'].astype(str), categories=self.venue_names).codes
+
+        # 数値特徴量・オッズの正規化（学習時になかった列は欠損値）
+        normalized = {}
+        for col, stats in self.stats.items():
+            if col in df_ml.columns:
+                normalized[f'{col}_normalized'] = (df_ml[col] - stats.mean) / stats.std
+            else:
+                normalized[f'{col}_normalized'] = np.nan
+
+        return attach_columns(df_ml, normalized)
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': TRANSFORMER_VERSION,
+            'venue_codes': self.venue_codes,
+            'venue_names': self.venue_names,
+            'stats': {col: stats.to_dict() for col, stats in self.stats.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FeatureTransformer':
+        transformer = cls(dict(zip(data['venue_codes'], data['venue_names'])))
+        transformer.stats = {col: RunningStats.from_dict(stats) for col, stats in data['stats'].items()}
+        return transformer
+
+    def save(self, path: Union[str, Path]):
+        """JSONとして保存"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'FeatureTransformer':
+        """保存した変換器を読み込む"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
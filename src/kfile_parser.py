@@ -0,0 +1,651 @@
+"""
+K-file（競走成績TXT）ストリーミングパーサー
+ファイルハンドルから1行ずつ読み込み、レース番号・着順・払戻金・選手行を1パスで抽出する
+1日分のファイルは会場ごとのセクション（NNKBGN～NNKEND）に分割し、セクション単位で解析する
+use_mmap=True ではファイルをmmapしてバイト列のまま照合し、選手名・会場名だけをShift-JISから復号する
+"""
+
+import codecs
+import io
+import itertools
+import mmap
+import os
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import (AnyStr, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Sequence,
+                    Set, TextIO, Tuple, TYPE_CHECKING, Union)
+
+if TYPE_CHECKING:
+    from .parse_cache import ParseCache
+
+# 会場コード → 会場名
+VENUE_MAPPING = {
+    '01': '桐生', '02': '戸田', '03': '江戸川', '04': '平和島',
+    '05': '多摩川', '06': '浜名湖', '07': '蒲郡', '08': '常滑',
+    '09': '津', '10': '三国', '11': 'びわこ', '12': '住之江',
+    '13': '尼崎', '14': '鳴門', '15': '丸亀', '16': '児島',
+    '17': '宮島', '18': '徳山', '19': '下関', '20': '若松',
+    '21': '芦屋', '22': '福岡', '23': '唐津', '24': '大村'
+}
+
+# 正規表現パターン（モジュール読み込み時に1度だけコンパイル）
+RACE_NUMBER_PATTERN = re.compile(r'(\d+)R')
+RACE_RESULT_PATTERN = re.compile(r'(\d+)R\s+([1-6]-[1-6]-[1-6])\s+(\d+)')
+# 着順が F・L・K・S（フライング・出遅れ・欠場・失格）の選手行（着順がないため取り込まない）
+RACER_FAULT_PATTERN = re.compile(r'[FLKS][0-9]?\s+\d\s+\d{4}\s')
+RACER_INFO_PATTERN = re.compile(r'\s*(\d{2})\s+(\d)\s+(\d{4})\s+(.{8,12})\s+(\d{2})\s+(\d{1,3})\s+(\d\.\d{2})\s+(\d)\s+([\d\.+-]+)\s+([\d\.:]*)')
+
+# 払戻金行の行頭の券種名 → (券種, 組番の艇数)
+# 公式フォーマットは全角数字（２連単・３連複）で、半角数字の表記も受け付ける
+BET_TYPES = {
+    '単勝': ('single', 1), '複勝': ('place', 1),
+    '２連単': ('exacta', 2), '2連単': ('exacta', 2),
+    '２連複': ('quinella', 2), '2連複': ('quinella', 2),
+    '拡連複': ('wide', 2),
+    '３連単': ('trifecta', 3), '3連単': ('trifecta', 3),
+    '３連複': ('trio', 3), '3連複': ('trio', 3)
+}
+# 払戻金行は券種名の後に「組番 払戻金 [人気 N]」が空白区切りで並ぶ（払戻金は100円あたり、小数は旧形式のオッズ）
+# 複勝・拡連複は1行に複数の組番があり、拡連複の2組目以降は券種名のない継続行になる
+POPULARITY_LABEL = '人気'
+# 有効な組番（"1"・"1-2"・"1-2-3" 形式）→ 艇数
+COMBINATIONS = {
+    '-'.join(map(str, boats)): size
+    for size in (1, 2, 3) for boats in itertools.product(range(1, 7), repeat=size)
+}
+
+# 会場セクションの開始・終了行（例: 24KBGN / 24KEND、数字は会場コード）
+SECTION_BEGIN_PATTERN = re.compile(r'^\s*(\d{2})KBGN')
+SECTION_END_PATTERN = re.compile(r'^\s*(\d{2})KEND')
+
+KFILE_ENCODING = 'shift_jis'
+# 行単位・項目単位で復号するため、コーデックの検索を省いた復号関数を保持する
+SJIS_DECODER = codecs.getdecoder(KFILE_ENCODING)
+
+# バイト列パターンで文字列パターンの "." に相当する部分
+# Shift-JISの1文字: 2バイト文字（先行バイト + 後続バイト）または改行以外の1バイト文字
+SJIS_CHAR_BYTES = rb'(?:[\x81-\x9f\xe0-\xfc].|[^\r\n\x81-\x9f\xe0-\xfc])'
+
+# 選手行とみなす最小の行長（改行文字を含む）
+RACER_LINE_MIN_LENGTH = 40
+
+# 選手行の固定列（公式フォーマットのShift-JISのバイト位置、数字を "9" に置き換えて形を比較する）
+#   "  01  6 4691 桐　生　　太　郎 97   88  6.89   2    0.16     1.48.4"
+RACER_ROW_HEAD = b'  99  9 9999 '                # 0-13: 着・艇・登番
+RACER_NAME_END = 29                               # 13-29: 選手名（全角8文字 = 16バイト）
+RACER_ROW_BODY = b' 99   99  9.99   9    9.99 '  # 29-56: 年齢・体重・展示・進入・スタートタイミング
+RACER_DIGITS = bytes.maketrans(b'0123456789', b'9999999999')
+RACE_TIME_CHARS = b'0123456789.:'
+
+# 選手行の解析経路（固定列 / 正規表現 / どちらにも一致しない行 / 着順のない事故・欠場の行）
+RACER_PATH_FIXED = 'fixed'
+RACER_PATH_REGEX = 'regex'
+RACER_PATH_UNMATCHED = 'unmatched'
+RACER_PATH_FAULT = 'fault'
+
+# 会場名を探索する先頭行数
+VENUE_SCAN_LINES = 30
+
+
+class VenueFound(NamedTuple):
+    """会場情報イベント"""
+    code: str
+    name: str
+
+
+class RaceHeader(NamedTuple):
+    """レース番号を含む行のイベント（以降の払戻金はこのレースに属する）"""
+    race_number: int
+
+
+class RaceResult(NamedTuple):
+    """着順サマリー行のイベント"""
+    race_number: int
+    first: int
+    second: int
+    third: int
+
+
+class OddsEntry(NamedTuple):
+    """払戻金の1組番"""
+    bet_type: str      # single / place / exacta / quinella / wide / trifecta / trio
+    combination: str   # 組番（例: '1-3-2'）
+    payout: int        # 100円あたりの払戻金（円）
+    popularity: int    # 人気（記載のない券種は0）
+
+    @property
+    def odds(self) -> float:
+        """払戻金から求めたオッズ（倍）"""
+        return self.payout / 100
+
+
+class Payout(NamedTuple):
+    """払戻金行のイベント（複勝・拡連複は1行に複数の組番）"""
+    race_number: int
+    entries: List[OddsEntry]
+
+
+class RacerRow(NamedTuple):
+    """選手行のイベント"""
+    race_number: int
+    frame_number: int
+    boat_number: int
+    racer_id: int
+    racer_name: str
+    age: int
+    weight: int
+    exhibition_time: float
+    start_timing: float
+    race_time: str
+
+
+KFileEvent = Union[VenueFound, RaceHeader, RaceResult, Payout, RacerRow]
+
+
+class KFileSection(NamedTuple):
+    """会場セクションの行（区切り行のないファイルは venue_code が None の1セクション）"""
+    venue_code: Optional[str]
+    lines: List[AnyStr]
+
+
+class ParsedSection(NamedTuple):
+    """1会場セクション分の解析結果"""
+    venue_code: str
+    venue_name: str
+    race_results: Dict[int, Tuple[int, int, int]]
+    # レース番号 → 払戻金（払戻金行の出現順）
+    odds: Dict[int, List[OddsEntry]]
+    racers: List[RacerRow]
+    # 選手行の解析経路ごとの行数（RACER_PATH_*）
+    racer_line_counts: Dict[str, int]
+    # セクションの行数
+    line_count: int = 0
+
+    def finish_position(self, race_number: int, boat_number: int) -> int:
+        """着順サマリーから着順を算出（4着以下は4、結果なしは0）"""
+        result = self.race_results.get(race_number)
+        if result is None:
+            return 0
+        if boat_number == result[0]:
+            return 1
+        if boat_number == result[1]:
+            return 2
+        if boat_number == result[2]:
+            return 3
+        return 4
+
+
+class SectionFilter(NamedTuple):
+    """
+    解析前に適用する絞り込み条件（None は条件なし）
+    会場はセクションの区切り行、レース番号はレースの見出し行で判定し、対象外の行は正規表現にかけない
+    """
+    venue_codes: Optional[Set[str]] = None
+    race_numbers: Optional[Set[int]] = None
+
+    def accepts_venue(self, venue_code: str) -> bool:
+        return self.venue_codes is None or venue_code in self.venue_codes
+
+    def accepts_race(self, race_number: int) -> bool:
+        return self.race_numbers is None or race_number in self.race_numbers
+
+
+class ParsedKFile(NamedTuple):
+    """1ファイル分の解析結果（会場セクションの出現順）"""
+    sections: List[ParsedSection]
+    # 解析時間（秒）: 読み込み・復号・セクション分割 / 行の照合
+    read_seconds: float = 0.0
+    match_seconds: float = 0.0
+    # 解析結果のキャッシュから読み込んだかどうか
+    cached: bool = False
+
+    def select_venues(self, venue_codes: Optional[Set[str]]) -> List[ParsedSection]:
+        """指定した会場コードのセクションのみを返す（None は全セクション）"""
+        if venue_codes is None:
+            return list(self.sections)
+        return [section for section in self.sections if section.venue_code in venue_codes]
+
+    def racer_line_counts(self) -> Counter:
+        """全セクションの選手行の解析経路ごとの行数"""
+        counts = Counter()
+        for section in self.sections:
+            counts.update(section.racer_line_counts)
+        return counts
+
+
+def to_byte_pattern(pattern: Pattern) -> Pattern:
+    """
+    文字列の正規表現をShift-JISのバイト列に対する正規表現に変換
+    非ASCIIの文字はShift-JISのバイト列、"." はShift-JISの1文字として扱う
+    "\\s" はASCIIの空白のみに一致する（選手名の前後の全角スペースは名前の一部になり、復号後の strip で除かれる）
+    """
+    source = pattern.pattern
+    parts = []
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            parts.append(source[i:i + 2].encode('ascii'))
+            i += 2
+        elif char == '[':
+            # 文字クラスはASCIIのみを想定
+            end = source.index(']', i + 1)
+            parts.append(source[i:end + 1].encode('ascii'))
+            i = end + 1
+        elif char == '.':
+            parts.append(SJIS_CHAR_BYTES)
+            i += 1
+        elif ord(char) < 0x80:
+            parts.append(char.encode('ascii'))
+            i += 1
+        else:
+            parts.append(re.escape(char.encode(KFILE_ENCODING)))
+            i += 1
+    return re.compile(b''.join(parts))
+
+
+def decode_sjis(data: bytes) -> str:
+    """Shift-JISのバイト列を復号（不正なバイトは無視）"""
+    return SJIS_DECODER(data, 'ignore')[0]
+
+
+class PatternSet(NamedTuple):
+    """行の照合に使う正規表現一式（テキスト用・バイト列用）と、一致部分を文字列にする関数"""
+    race_number: Pattern
+    race_result: Pattern
+    racer_info: Pattern
+    racer_fault: Pattern
+    # 払戻金行の券種名 → (券種, 組番の艇数) と、行頭の判定に使う券種名のタプル
+    bet_types: Dict[AnyStr, Tuple[str, int]]
+    bet_prefixes: Tuple[AnyStr, ...]
+    # 組番 → (艇数, 文字列の組番)
+    combinations: Dict[AnyStr, Tuple[int, str]]
+    popularity: AnyStr
+    section_begin: Pattern
+    section_end: Pattern
+    decode: Callable[[AnyStr], str]
+    # 欠損値を表す "."（払戻金では旧形式のオッズの小数点）
+    dot: AnyStr
+    # 組番の区切り
+    dash: AnyStr
+    # レース番号・着順サマリーの行に必ず含まれる文字
+    race_token: AnyStr
+    # 選手行を固定列（バイト位置）で解析できるかどうか
+    fixed_columns: bool
+    # セクションの区切り行の判定に使う文字列（開始, 終了）
+    section_tokens: Tuple[AnyStr, AnyStr] = ('KBGN', 'KEND')
+
+
+BYTE_BET_TYPES = {keyword.encode(KFILE_ENCODING): bet_type for keyword, bet_type in BET_TYPES.items()}
+
+TEXT_PATTERNS = PatternSet(
+    RACE_NUMBER_PATTERN, RACE_RESULT_PATTERN, RACER_INFO_PATTERN, RACER_FAULT_PATTERN,
+    BET_TYPES, tuple(BET_TYPES), {combination: (size, combination) for combination, size in COMBINATIONS.items()},
+    POPULARITY_LABEL, SECTION_BEGIN_PATTERN, SECTION_END_PATTERN, str, '.', '-', 'R', False
+)
+BYTE_PATTERNS = PatternSet(
+    to_byte_pattern(RACE_NUMBER_PATTERN), to_byte_pattern(RACE_RESULT_PATTERN),
+    to_byte_pattern(RACER_INFO_PATTERN), to_byte_pattern(RACER_FAULT_PATTERN),
+    BYTE_BET_TYPES, tuple(BYTE_BET_TYPES),
+    {combination.encode('ascii'): (size, combination) for combination, size in COMBINATIONS.items()},
+    POPULARITY_LABEL.encode(KFILE_ENCODING),
+    to_byte_pattern(SECTION_BEGIN_PATTERN), to_byte_pattern(SECTION_END_PATTERN), decode_sjis, b'.', b'-', b'R', True,
+    (b'KBGN', b'KEND')
+)
+
+
+def split_sections(lines: Iterable[AnyStr], venue_codes: Optional[Set[str]] = None,
+                   patterns: PatternSet = TEXT_PATTERNS) -> Iterator[KFileSection]:
+    """
+    行イテレータを会場セクションに分割
+    区切り行の外側の行（STARTK など）は捨て、区切り行が1つもない場合はファイル全体を1セクションとして返す
+    venue_codes を指定すると、それ以外の会場のセクションは行を保持せずに読み飛ばす
+    """
+    begin_token, end_token = patterns.section_tokens
+    found = False
+    skipping = False
+    venue_code = None
+    section = None
+    outside = []
+
+    for line in lines:
+        if skipping:
+            # 対象外のセクションは区切り行の判定だけを行う
+            if begin_token not in line and end_token not in line:
+                continue
+            skipping = False
+        begin_match = patterns.section_begin.match(line)
+        if begin_match:
+            # 終了行がないまま次のセクションが始まった場合はそこで区切る
+            if section is not None:
+                yield KFileSection(venue_code, section)
+            found = True
+            outside = []
+            venue_code, section = patterns.decode(begin_match.group(1)), []
+            if venue_codes is not None and venue_code not in venue_codes:
+                skipping, section = True, None
+        elif section is not None:
+            if patterns.section_end.match(line):
+                yield KFileSection(venue_code, section)
+                section = None
+            else:
+                section.append(line)
+        elif not found:
+            outside.append(line)
+
+    if section is not None:
+        yield KFileSection(venue_code, section)
+    if not found:
+        yield KFileSection(None, outside)
+
+
+def open_kfile(file_path: Union[str, Path]) -> TextIO:
+    """K-fileをShift-JISのテキストストリームとして開く"""
+    return open(file_path, 'r', encoding=KFILE_ENCODING, errors='ignore')
+
+
+def iter_mmap_lines(file_path: Union[str, Path]) -> Iterator[bytes]:
+    """K-fileをmmapし、復号せずにバイト列の行として返す"""
+    with open(file_path, 'rb') as f:
+        # 空のファイルはmmapできない
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter(mapped.readline, b'')
+
+
+class KFileParser:
+    """
+    行ステートマシンによるK-fileパーサー
+    ファイル全体をメモリに読み込まず、会場セクション単位で行を区切ってイベントを生成する
+    """
+
+    def __init__(self, venue_mapping: Dict[str, str], venue_names: Optional[Sequence[str]] = None,
+                 parse_odds: bool = True, use_mmap: bool = False, cache: Optional['ParseCache'] = None):
+        self.venue_mapping = dict(venue_mapping)
+        # 会場名 → 会場コードの逆引き
+        self.venue_codes = {name: code for code, name in venue_mapping.items()}
+        # 会場名の探索順（先に一致したものを採用）
+        self.venue_names = list(venue_names) if venue_names is not None else list(venue_mapping.values())
+        self.parse_odds = parse_odds
+        # mmap + バイト列の正規表現で解析するかどうか
+        self.use_mmap = use_mmap
+        # 解析結果のキャッシュ（同じ内容のファイルは解析せずに読み込む）
+        self.cache = cache
+
+    def find_venue(self, line: str) -> Optional[VenueFound]:
+        """行に含まれる会場名を検索"""
+        for venue in self.venue_names:
+            if venue in line:
+                return VenueFound(self.venue_codes[venue], venue)
+        return None
+
+    def match_odds_line(self, line: AnyStr, previous: Optional[Tuple[str, int]] = None,
+                        patterns: PatternSet = TEXT_PATTERNS) -> Tuple[Optional[Tuple[str, int]], List[OddsEntry]]:
+        """
+        前後の空白を除いた行を払戻金行として解析し、(券種と組番の艇数, 払戻金のリスト) を返す
+        行頭の券種名で振り分け、券種名のない "1-3 ..." の行は previous（直前の払戻金行の券種）の継続行とする
+        払戻金行でない行は (None, [])
+        """
+        if line.startswith(patterns.bet_prefixes):
+            tokens = line.split()
+            current = patterns.bet_types.get(tokens[0])
+            if current is None:
+                # 券種名と組番の間に空白がない行
+                keyword = next(keyword for keyword in patterns.bet_prefixes if line.startswith(keyword))
+                current = patterns.bet_types[keyword]
+                tokens = line[len(keyword):].split()
+            else:
+                del tokens[0]
+        elif previous is not None and line[1:2] == patterns.dash and line[:1].isdigit():
+            current, tokens = previous, line.split()
+        else:
+            return None, []
+
+        bet_type, boats = current
+        combinations, popularity_label = patterns.combinations, patterns.popularity
+        entries = []
+        i, count = 0, len(tokens)
+        while i + 1 < count:
+            combination, value = tokens[i], tokens[i + 1]
+            i += 2
+            popularity = 0
+            if i + 1 < count and tokens[i] == popularity_label:
+                popularity = int(tokens[i + 1]) if tokens[i + 1].isdigit() else 0
+                i += 2
+            size, combination = combinations.get(combination, (0, None))
+            if size != boats:
+                continue
+            if value.isdigit():
+                payout = int(value)
+            else:
+                try:
+                    payout = round(float(value) * 100)
+                except ValueError:
+                    continue
+            entries.append(OddsEntry(bet_type, combination, payout, popularity))
+        return current, entries
+
+    def parse_odds_line(self, race_number: int, line: AnyStr,
+                        patterns: PatternSet = TEXT_PATTERNS) -> Iterator[Payout]:
+        """払戻金行（継続行を除く）から払戻金を抽出"""
+        _, entries = self.match_odds_line(line.strip(), None, patterns)
+        if entries:
+            yield Payout(race_number, entries)
+
+    def parse_racer_line(self, race_number: int, line: AnyStr,
+                         patterns: PatternSet = TEXT_PATTERNS) -> Optional[RacerRow]:
+        """選手行を解析（一致しない・変換できない行はNone）"""
+        match = patterns.racer_info.match(line)
+        if not match:
+            return None
+        # 数値の列は bytes のまま int / float に渡せるため、復号するのは選手名とレースタイムのみ
+        frame, boat, racer_id, name, age, weight, exhibition_time, _, start_timing, race_time = match.groups()
+        try:
+            return RacerRow(
+                race_number,
+                int(frame),
+                int(boat),
+                int(racer_id),
+                patterns.decode(name).strip(),
+                int(age),
+                int(weight),
+                float(exhibition_time),
+                float(start_timing) if start_timing and start_timing != patterns.dot else 0.0,
+                patterns.decode(race_time) if race_time and race_time != patterns.dot else ""
+            )
+        except ValueError:
+            return None
+
+    def parse_racer_columns(self, race_number: int, line: bytes) -> Optional[RacerRow]:
+        """
+        選手行を固定列のバイト位置で解析（形が公式フォーマットと一致しない行はNone）
+        形が一致した行は RACER_INFO_PATTERN と同じ結果になり、それ以外は正規表現で解析し直す
+        """
+        if line[:13].translate(RACER_DIGITS) != RACER_ROW_HEAD or \
+                line[RACER_NAME_END:56].translate(RACER_DIGITS) != RACER_ROW_BODY:
+            return None
+        name = line[13:RACER_NAME_END]
+        if name[:1].isspace() or b'\r' in name:
+            return None
+        try:
+            racer_name = SJIS_DECODER(name)[0]
+        except UnicodeDecodeError:
+            return None
+        if not 8 <= len(racer_name) <= 12:
+            return None
+        # レースタイムは空白の後の数字・"."・":" の並び（"." のみは欠損）
+        rest = line[56:].lstrip()
+        race_time = rest.split(None, 1)[0] if rest else b''
+        if race_time.strip(RACE_TIME_CHARS):
+            return None
+        return RacerRow(
+            race_number,
+            int(line[2:4]),
+            int(line[6:7]),
+            int(line[8:12]),
+            racer_name.strip(),
+            int(line[30:32]),
+            int(line[35:37]),
+            float(line[39:43]),
+            float(line[51:55]),
+            race_time.decode('ascii') if race_time and race_time != b'.' else ""
+        )
+
+    def iter_events(self, lines: Iterable[AnyStr], venue: Optional[VenueFound] = None,
+                    race_numbers: Optional[Set[int]] = None,
+                    patterns: PatternSet = TEXT_PATTERNS,
+                    racer_line_counts: Optional[Counter] = None) -> Iterator[KFileEvent]:
+        """
+        行イテレータからイベントを順に生成（venue を指定した場合は会場名を探索しない）
+        race_numbers を指定すると、それ以外のレースの払戻金行・選手行は解析しない
+        patterns に BYTE_PATTERNS を指定するとバイト列の行を解析し、選手行はまず固定列で解析する
+        racer_line_counts には選手行の解析経路ごとの行数を加算する
+        """
+        if racer_line_counts is None:
+            racer_line_counts = Counter()
+        fixed_columns = patterns.fixed_columns
+        bet_prefixes, dash = patterns.bet_prefixes, patterns.dash
+        current_race = None
+        # 直前の払戻金行の券種（拡連複などの継続行に使う）
+        bet_type = None
+        race_wanted = True
+        venue_found = venue is not None
+        if venue is not None:
+            yield venue
+
+        for line_num, line_original in enumerate(lines):
+            line = line_original.strip()
+
+            # 会場情報の検出（先頭行のみ）
+            if not venue_found and line_num < VENUE_SCAN_LINES:
+                venue = self.find_venue(patterns.decode(line_original))
+                if venue is not None:
+                    venue_found = True
+                    yield venue
+
+            # 着順サマリー・レース番号はどちらも "R" を含む行のみ照合する
+            # （着順サマリーはレース番号のパターンを含むため、レース番号に一致した行だけを照合する）
+            race_match = patterns.race_number.search(line) if patterns.race_token in line else None
+            if race_match:
+                result_match = patterns.race_result.search(line)
+                if result_match:
+                    positions = patterns.decode(result_match.group(2)).split('-')
+                    yield RaceResult(int(result_match.group(1)), int(positions[0]), int(positions[1]), int(positions[2]))
+
+            # レース番号の検出
+            if race_match:
+                current_race = int(race_match.group(1))
+                bet_type = None
+                race_wanted = race_numbers is None or current_race in race_numbers
+                if race_wanted:
+                    yield RaceHeader(current_race)
+                # レースの見出し・着順サマリーの行は選手行として照合しない（10R～12Rは2桁の数字で始まる）
+                continue
+            elif not race_wanted:
+                continue
+            elif current_race is not None and self.parse_odds:
+                # 払戻金行は券種名で始まる行と、その直後の "1-3 ..." の継続行だけを解析する
+                if line.startswith(bet_prefixes) or (bet_type is not None and line[1:2] == dash):
+                    bet_type, entries = self.match_odds_line(line, bet_type, patterns)
+                    if bet_type is not None:
+                        if entries:
+                            yield Payout(current_race, entries)
+                        continue
+                else:
+                    bet_type = None
+
+            # 選手情報の抽出（選手行は着順の2桁の数字で始まる）
+            if current_race and race_wanted and len(line_original) >= RACER_LINE_MIN_LENGTH \
+                    and line[:2].isdigit():
+                racer = self.parse_racer_columns(current_race, line_original) if fixed_columns else None
+                if racer is not None:
+                    racer_line_counts[RACER_PATH_FIXED] += 1
+                else:
+                    racer = self.parse_racer_line(current_race, line_original, patterns)
+                    racer_line_counts[RACER_PATH_REGEX if racer is not None else RACER_PATH_UNMATCHED] += 1
+                if racer is not None:
+                    yield racer
+            elif current_race and race_wanted and len(line_original) >= RACER_LINE_MIN_LENGTH \
+                    and patterns.racer_fault.match(line):
+                racer_line_counts[RACER_PATH_FAULT] += 1
+
+    def collect(self, events: Iterable[KFileEvent], racer_line_counts: Optional[Counter] = None,
+                line_count: int = 0) -> ParsedSection:
+        """イベントを集約して1セクション分の解析結果を作成"""
+        venue_code, venue_name = '', ''
+        race_results = {}
+        odds = {}
+        racers = []
+
+        for event in events:
+            if isinstance(event, RacerRow):
+                racers.append(event)
+            elif isinstance(event, Payout):
+                odds[event.race_number].extend(event.entries)
+            elif isinstance(event, RaceHeader):
+                odds[event.race_number] = []
+            elif isinstance(event, RaceResult):
+                race_results[event.race_number] = (event.first, event.second, event.third)
+            elif isinstance(event, VenueFound):
+                venue_code, venue_name = event
+
+        return ParsedSection(venue_code, venue_name, race_results, odds, racers, dict(racer_line_counts or {}),
+                             line_count)
+
+    def parse_section(self, section: KFileSection, race_numbers: Optional[Set[int]] = None,
+                      patterns: PatternSet = TEXT_PATTERNS) -> ParsedSection:
+        """
+        会場セクションを解析（セクション同士は独立しているため個別・並列に解析できる）
+        会場は区切り行の会場コードで決め、区切り行がない場合は先頭行の会場名から判定する
+        """
+        venue = None
+        if section.venue_code is not None:
+            venue = VenueFound(section.venue_code, self.venue_mapping.get(section.venue_code, ''))
+        racer_line_counts = Counter()
+        events = self.iter_events(section.lines, venue, race_numbers, patterns, racer_line_counts)
+        return self.collect(events, racer_line_counts, len(section.lines))
+
+    def parse(self, lines: Iterable[AnyStr], section_filter: Optional[SectionFilter] = None,
+              patterns: PatternSet = TEXT_PATTERNS) -> ParsedKFile:
+        """
+        会場セクションごとに解析して1ファイル分の解析結果を作成
+        section_filter の会場・レース番号に一致しない部分は解析せずに読み飛ばす
+        """
+        section_filter = section_filter or SectionFilter()
+        sections = []
+        match_seconds = 0.0
+        start = time.perf_counter()
+        # 行は split_sections が読み込むため、セクションの解析時間を除いた残りが読み込み・復号の時間になる
+        for section in split_sections(lines, section_filter.venue_codes, patterns):
+            section_start = time.perf_counter()
+            sections.append(self.parse_section(section, section_filter.race_numbers, patterns))
+            match_seconds += time.perf_counter() - section_start
+        return ParsedKFile(sections, time.perf_counter() - start - match_seconds, match_seconds)
+
+    def parse_file(self, file_path: Union[str, Path], section_filter: Optional[SectionFilter] = None) -> ParsedKFile:
+        """
+        ファイルをストリーミングで読み込んで解析（use_mmap=True の場合はバイト列のまま解析）
+        cache を指定した場合は、キャッシュにある内容のファイルは解析せずに読み込む
+        """
+        if self.cache is not None:
+            return self.cache.parse_file(self, file_path, section_filter)
+        if self.use_mmap:
+            return self.parse(iter_mmap_lines(file_path), section_filter, BYTE_PATTERNS)
+        with open_kfile(file_path) as f:
+            return self.parse(f, section_filter)
+
+    def parse_bytes(self, data: bytes, section_filter: Optional[SectionFilter] = None) -> ParsedKFile:
+        """読み込み済みのファイル内容を parse_file と同じ行の区切り・復号で解析"""
+        if self.use_mmap:
+            return self.parse(io.BytesIO(data), section_filter, BYTE_PATTERNS)
+        with io.TextIOWrapper(io.BytesIO(data), encoding=KFILE_ENCODING, errors='ignore') as f:
+            return self.parse(f, section_filter)
+
+    def parse_member(self, data: bytes, section_filter: Optional[SectionFilter] = None) -> ParsedKFile:
+        """アーカイブから取り出したファイル内容を解析（cache を指定した場合はキャッシュを使う）"""
+        if self.cache is not None:
+            return self.cache.parse_data(self, data, section_filter)
+        return self.parse_bytes(data, section_filter)
@@ -0,0 +1,94 @@
+"""
+インクリメンタル処理用のマニフェスト
+処理済みファイルのパス・サイズ・更新時刻・内容ハッシュ・レコード数を出力先に保存する
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+MANIFEST_FILE_NAME = "ingest_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_content_hash(file_path: Union[str, Path], block_size: int = 1 << 20) -> str:
+    """ファイル内容のSHA-1ハッシュ"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    処理済みK-fileの台帳
+    サイズと更新時刻が一致すれば未変更とみなし、異なる場合のみ内容ハッシュで比較する
+    """
+
+    def __init__(self, manifest_path: Union[str, Path]):
+        self.manifest_path = Path(manifest_path)
+        self.entries: Dict[str, Dict] = {}
+        # 今回の実行で内容が変わっていたファイル（既存レコードの置き換えが必要）
+        self.changed_paths: List[str] = []
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('files', {})
+
+    @classmethod
+    def for_output_dir(cls, output_dir: Union[str, Path]) -> 'IngestManifest':
+        """出力ディレクトリ内のマニフェストを開く"""
+        return cls(Path(output_dir) / MANIFEST_FILE_NAME)
+
+    @staticmethod
+    def key(file_path: Union[str, Path]) -> str:
+        """台帳のキー（絶対パス）"""
+        return str(Path(file_path).resolve())
+
+    def is_processed(self, file_path: Union[str, Path]) -> bool:
+        """前回から変更のない処理済みファイルかどうか"""
+        entry = self.entries.get(self.key(file_path))
+        if entry is None:
+            return False
+        stat = os.stat(file_path)
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        if stat.st_size == entry['size'] and file_content_hash(file_path) == entry['sha1']:
+            # 内容は同じで更新時刻のみ変わった場合は台帳を更新してスキップ
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return True
+        return False
+
+    def filter_unprocessed(self, file_paths: Iterable[Path]) -> Iterator[Path]:
+        """未処理・変更ありのファイルのみを返す"""
+        for file_path in file_paths:
+            if not self.is_processed(file_path):
+                yield file_path
+
+    def mark_processed(self, file_path: Union[str, Path], record_count: int):
+        """処理済みとして記録"""
+        key = self.key(file_path)
+        if key in self.entries:
+            self.changed_paths.append(key)
+        stat = os.stat(file_path)
+        self.entries[key] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': file_content_hash(file_path),
+            'records': record_count
+        }
+
+    def total_records(self) -> int:
+        """台帳上の総レコード数"""
+        return sum(entry['records'] for entry in self.entries.values())
+
+    def save(self):
+        """台帳を保存（書き込み途中で壊れないよう一時ファイル経由で置き換える）"""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        self.changed_paths = []
@@ -0,0 +1,149 @@
+"""
+取り込みの計測
+ファイルごとの処理時間・行数・一致件数・スキップした行の理由を集計し、JSON Lines またはコールバックで出力する
+大量のファイルを処理した後に、遅いファイルや形式の崩れたファイルを探すために使う
+"""
+
+import heapq
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .kfile_parser import ParsedKFile, ParsedSection, RACER_PATH_FAULT, RACER_PATH_UNMATCHED
+
+# スキップした行・ファイルの理由
+SKIP_RACER_UNMATCHED = 'racer_line_unmatched'  # 選手行の形だが解析できなかった行
+SKIP_RACER_FAULT = 'racer_line_fault'          # 着順が F・L・K・S の選手行
+SKIP_FILE_ERROR = 'file_error'                 # 解析・取り込みに失敗したファイル
+
+
+def section_counts(sections: Sequence[ParsedSection]) -> Tuple[Counter, Counter]:
+    """取り込んだセクションの件数と、選手行の解析経路ごとの行数"""
+    counts = Counter()
+    racer_paths = Counter()
+    for section in sections:
+        counts['sections'] += 1
+        counts['lines'] += section.line_count
+        counts['races'] += len(section.odds)
+        counts['results'] += len(section.race_results)
+        counts['odds'] += sum(len(race_odds) for race_odds in section.odds.values())
+        counts['racers'] += len(section.racers)
+        # 着順サマリーがないレースの選手行は最終着順が0になる
+        counts['no_finish_position'] += sum(
+            1 for racer in section.racers if racer.race_number not in section.race_results)
+        if not section.venue_code:
+            counts['unknown_venue_sections'] += 1
+        racer_paths.update(section.racer_line_counts)
+    return counts, racer_paths
+
+
+class IngestMetrics:
+    """
+    取り込みの計測値を集計する
+    path を指定するとレコードをJSON Lines形式で追記し、callback を指定するとレコード（dict）を渡す
+    レコードは event が 'file'（ファイルごと）/ 'stage'（保存などの段階）/ 'summary'（累計）のdict
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None,
+                 callback: Optional[Callable[[Dict], None]] = None, slowest: int = 10):
+        self.path = Path(path) if path is not None else None
+        self.callback = callback
+        self.slowest_limit = slowest
+        self.files = 0
+        self.errors = 0
+        # 段階 → 累計秒数（read / match / ingest はファイルごと、frame / write は保存時）
+        self.seconds = Counter()
+        self.counts = Counter()
+        self.racer_paths = Counter()
+        self.skipped = Counter()
+        # 解析時間の長いファイル（秒数, パス）のヒープ
+        self.slowest: List[Tuple[float, str]] = []
+
+    def emit(self, record: Dict):
+        """レコードを出力（出力先を指定していない場合は集計のみ）"""
+        if self.callback is None and self.path is None:
+            return
+        record = {'timestamp': datetime.now().isoformat(timespec='seconds'), **record}
+        if self.callback is not None:
+            self.callback(record)
+        if self.path is not None:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def record_file(self, file_path: Union[str, Path], parsed: Optional[ParsedKFile] = None,
+                    sections: Sequence[ParsedSection] = (), ingest_seconds: float = 0.0,
+                    error: Optional[str] = None) -> Dict:
+        """1ファイル分の計測値を集計して出力（sections は取り込んだセクション）"""
+        counts, racer_paths = section_counts(sections)
+        if parsed is not None and parsed.cached:
+            counts['cached_files'] += 1
+        skipped = Counter({
+            SKIP_RACER_UNMATCHED: racer_paths.get(RACER_PATH_UNMATCHED, 0),
+            SKIP_RACER_FAULT: racer_paths.get(RACER_PATH_FAULT, 0),
+            SKIP_FILE_ERROR: int(error is not None)
+        })
+        seconds = {
+            'read': parsed.read_seconds if parsed is not None else 0.0,
+            'match': parsed.match_seconds if parsed is not None else 0.0,
+            'ingest': ingest_seconds
+        }
+
+        self.files += 1
+        self.errors += int(error is not None)
+        self.seconds.update(seconds)
+        self.counts.update(counts)
+        self.racer_paths.update(racer_paths)
+        self.skipped.update(skipped)
+        parse_seconds = seconds['read'] + seconds['match']
+        if len(self.slowest) < self.slowest_limit:
+            heapq.heappush(self.slowest, (parse_seconds, str(file_path)))
+        elif self.slowest_limit and parse_seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (parse_seconds, str(file_path)))
+
+        record = {
+            'event': 'file',
+            'path': str(file_path),
+            'status': 'error' if error is not None else 'ok',
+            'error': error,
+            'seconds': seconds,
+            'counts': dict(counts),
+            'racer_paths': dict(racer_paths),
+            'skipped': {reason: count for reason, count in skipped.items() if count}
+        }
+        self.emit(record)
+        return record
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """処理段階（DataFrame作成・書き込みなど）の時間を計測"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.seconds[name] += elapsed
+            self.emit({'event': 'stage', 'stage': name, 'seconds': elapsed})
+
+    def summary(self) -> Dict:
+        """累計の計測値"""
+        return {
+            'event': 'summary',
+            'files': self.files,
+            'errors': self.errors,
+            'seconds': dict(self.seconds),
+            'counts': dict(self.counts),
+            'racer_paths': dict(self.racer_paths),
+            'skipped': {reason: count for reason, count in self.skipped.items() if count},
+            'slowest_files': [{'path': path, 'seconds': seconds}
+                              for seconds, path in sorted(self.slowest, reverse=True)]
+        }
+
+    def finish(self) -> Dict:
+        """累計の計測値を出力して返す"""
+        summary = self.summary()
+        self.emit(summary)
+        return summary
@@ -0,0 +1,175 @@
+"""
+解析結果のディスクキャッシュ
+ファイルの解析結果（ParsedKFile）を pickle + zlib の圧縮バイナリとして保存し、同じ内容のファイルは解析せずに読み込む
+キーは（ファイル内容のハッシュ, パーサーの版, パーサーの設定, 絞り込み条件）で、パーサーのソースが変われば自動的に無効になる
+合計サイズが上限を超えた場合は、最後に使われた時刻（更新時刻）の古いものから削除する
+"""
+
+import hashlib
+import os
+import pickle
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from . import kfile_parser
+from .kfile_parser import KFileParser, ParsedKFile, SectionFilter
+
+CACHE_SUFFIX = '.bin'
+# キャッシュの形式の版（形式を変えた場合に上げる）
+CACHE_FORMAT_VERSION = 1
+# キャッシュの合計サイズの既定の上限（バイト）
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def parser_version() -> str:
+    """パーサーの版（kfile_parser のソースとキャッシュの形式から求めるため、パーサーを変更すると変わる）"""
+    digest = hashlib.sha1(f'{CACHE_FORMAT_VERSION}:{pickle.HIGHEST_PROTOCOL}'.encode())
+    with open(kfile_parser.__file__, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    解析結果のLRUキャッシュ
+    ファイルは1件1ファイルで保存し（一時ファイル経由で置き換える）、読み込むたびに更新時刻を更新して最近の使用を記録する
+    並列解析のワーカープロセスから同時に使ってもよい（削除済みのファイルは未キャッシュとして扱う）
+    """
+
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: int = DEFAULT_MAX_BYTES, compress_level: int = 1):
+        if max_bytes < 1:
+            raise ValueError(f"キャッシュの上限には1以上を指定してください: {max_bytes}")
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.version = parser_version()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 合計サイズ（最初の保存時にディレクトリを走査して求める）
+        self.total_bytes: Optional[int] = None
+
+    def __getstate__(self) -> Dict:
+        # ワーカープロセスには設定だけを渡し、件数は各プロセスで数える
+        state = dict(self.__dict__)
+        state.update(hits=0, misses=0, evictions=0, total_bytes=None)
+        return state
+
+    def key(self, parser: KFileParser, data: bytes, section_filter: Optional[SectionFilter] = None) -> str:
+        """
+        キャッシュのキー（会場名の対応・オッズの解析有無・絞り込み条件によって結果が変わるためキーに含める）
+        選手行の解析経路ごとの行数（固定列 / 正規表現）は use_mmap で変わるため、これもキーに含める
+        """
+        section_filter = section_filter or SectionFilter()
+        digest = hashlib.sha1(self.version.encode())
+        digest.update(repr((
+            sorted(parser.venue_mapping.items()), parser.venue_names, parser.parse_odds, parser.use_mmap,
+            sorted(section_filter.venue_codes) if section_filter.venue_codes is not None else None,
+            sorted(section_filter.race_numbers) if section_filter.race_numbers is not None else None
+        )).encode())
+        digest.update(hashlib.sha1(data).digest())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir / f'{key}{CACHE_SUFFIX}'
+
+    def load(self, key: str) -> Optional[ParsedKFile]:
+        """キャッシュから読み込む（ない場合・壊れている場合は None）"""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                parsed = pickle.loads(zlib.decompress(f.read()))
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # 書き込み途中で壊れたファイルなどは削除して解析し直す
+            path.unlink(missing_ok=True)
+            return None
+        return parsed if isinstance(parsed, ParsedKFile) else None
+
+    def store(self, key: str, parsed: ParsedKFile):
+        """キャッシュに保存し、上限を超えた場合は古いものから削除する"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if self.total_bytes is None:
+            self.total_bytes = sum(size for _, size, _ in self.entries())
+        data = zlib.compress(pickle.dumps(parsed, pickle.HIGHEST_PROTOCOL), self.compress_level)
+        path = self.path(key)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.total_bytes += len(data)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def entries(self) -> List[Tuple[int, int, Path]]:
+        """キャッシュファイルの一覧（最終使用時刻[ns], サイズ, パス）"""
+        entries = []
+        if not self.cache_dir.exists():
+            return entries
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(CACHE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, Path(entry.path)))
+        return entries
+
+    def evict(self):
+        """合計サイズが上限以下になるまで、最後に使われた時刻の古いものから削除"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+        self.total_bytes = total
+
+    def parse_file(self, parser: KFileParser, file_path: Union[str, Path],
+                   section_filter: Optional[SectionFilter] = None) -> ParsedKFile:
+        """キャッシュがあれば読み込み、なければ解析して保存する"""
+        start = time.perf_counter()
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        return self.parse_data(parser, data, section_filter, start)
+
+    def parse_data(self, parser: KFileParser, data: bytes, section_filter: Optional[SectionFilter] = None,
+                   start: Optional[float] = None) -> ParsedKFile:
+        """読み込み済みのファイル内容（アーカイブのメンバーなど）をキャッシュから読み込むか解析して保存する"""
+        start = time.perf_counter() if start is None else start
+        key = self.key(parser, data, section_filter)
+        parsed = self.load(key)
+        if parsed is not None:
+            self.hits += 1
+            # 解析時間の代わりにキャッシュの読み込み時間を記録する
+            return parsed._replace(read_seconds=time.perf_counter() - start, match_seconds=0.0, cached=True)
+        self.misses += 1
+        parsed = parser.parse_bytes(data, section_filter)
+        self.store(key, parsed)
+        return parsed
+
+    def clear(self):
+        """キャッシュをすべて削除"""
+        for _, _, path in self.entries():
+            path.unlink(missing_ok=True)
+        self.total_bytes = 0
+
+    def stats(self) -> Dict:
+        """この実行でのヒット数・ミス数・削除数と、キャッシュの件数・合計サイズ"""
+        entries = self.entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'files': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes
+        }
@@ -0,0 +1,68 @@
+"""
+複数ファイルの並列解析
+ProcessPoolExecutorでK-file（B-fileは BFileParser を渡す）を解析し、入力順を保ったまま結果を返す
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .bfile_parser import BFileParser, ParsedBFile
+from .kfile_parser import KFileParser, ParsedKFile, SectionFilter
+
+# parse_file(file_path, section_filter) を持つパーサー
+FileParser = Union[KFileParser, BFileParser]
+# (ファイルパス, 解析結果, エラーメッセージ)
+FileResult = Tuple[Path, Optional[Union[ParsedKFile, ParsedBFile]], Optional[str]]
+
+
+def parse_file_chunk(parser: FileParser, file_paths: List[Path],
+                     section_filter: Optional[SectionFilter] = None) -> List[FileResult]:
+    """ワーカープロセスでファイル群を解析（例外は親プロセスへ文字列で返す）"""
+    results = []
+    for file_path in file_paths:
+        try:
+            results.append((file_path, parser.parse_file(file_path, section_filter), None))
+        except Exception as e:
+            results.append((file_path, None, str(e)))
+    return results
+
+
+def iter_parsed_files(parser: FileParser, file_paths: Iterable[Path],
+                      max_workers: Optional[int] = None, chunksize: int = 1,
+                      section_filter: Optional[SectionFilter] = None,
+                      parse_chunk: Callable[..., List] = parse_file_chunk) -> Iterator[FileResult]:
+    """
+    ファイルを並列に解析し、入力順に結果を返す
+    投入済みのチャンク数を上限で抑えるため、巨大なファイル一覧でも逐次的に処理できる
+    section_filter はワーカー側の解析時に適用する
+    parse_chunk は (parser, file_paths, section_filter=...) を受け取るモジュール関数（アーカイブの解析などに差し替える）
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, chunksize)
+    max_in_flight = max_workers * 2
+    task = partial(parse_chunk, parser, section_filter=section_filter)
+    paths = iter(file_paths)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        try:
+            while True:
+                # 上限まで次のチャンクを投入
+                while len(pending) < max_in_flight:
+                    chunk = list(islice(paths, chunksize))
+                    if not chunk:
+                        break
+                    pending.append(executor.submit(task, chunk))
+                if not pending:
+                    break
+                # 先頭のチャンクから順に結果を返す（決定的な順序）
+                yield from pending.popleft().result()
+        finally:
+            # 途中で打ち切られた場合は未着手のタスクを取り消す
+            for future in pending:
+                future.cancel()
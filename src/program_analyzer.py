@@ -0,0 +1,199 @@
+"""
+番組表（B-file）の取り込みと競走成績（K-file）との結合
+出走表を選手単位のレコードとして列指向バッファに蓄積し、(日付, 会場, レース番号, 艇番) のハッシュ結合で結果を付ける
+結合はキーを1つの整数に詰めたハッシュ表で行い、全期間のDataFrame同士のマージは行わない
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Union
+
+import numpy as np
+import pandas as pd
+
+from .bfile_parser import BFileParser, ParsedBFile, ParsedProgramSection
+from .boat_race_analyzer import BoatRaceAnalyzer
+from .columnar import ColumnarRecordBuffer, FrameCache
+from .discovery import BFILE_NAME_PATTERN, DateLike, iter_bfiles, parse_kfile_date, resolve_venue_codes
+from .kfile_parser import SectionFilter, VENUE_MAPPING
+from .pipeline import iter_parsed_files
+from .writers import get_writer
+
+# 出力データセット名（拡張子なし）
+PROGRAM_NAME = "boat_race_program"
+PROGRAM_RESULTS_NAME = "boat_race_program_results"
+
+# 出走表の選手単位レコードの列（選手ナンバーは艇番、K-file側の列名に合わせる）
+PROGRAM_DATA_SCHEMA = [
+    ('日付', 'str'), ('レース場コード', 'str'), ('レース場名', 'str'), ('レース番号', 'int'),
+    ('選手ナンバー', 'int'), ('レーサーID', 'int'), ('レーサー名', 'str'), ('年齢', 'int'), ('支部', 'str'),
+    ('体重', 'int'), ('級別', 'str'), ('全国勝率', 'float'), ('全国2連率', 'float'), ('当地勝率', 'float'),
+    ('当地2連率', 'float'), ('モーター番号', 'int'), ('モーター2連率', 'float'), ('ボート番号', 'int'),
+    ('ボート2連率', 'float')
+]
+
+# 競走成績から付ける列と、結果のない選手行の値
+RESULT_COLUMNS = {'展示タイム': np.nan, 'スタートタイミング': np.nan, 'レースタイム': '', '最終着順': 0}
+
+
+def pack_join_keys(buffer: ColumnarRecordBuffer) -> np.ndarray:
+    """
+    (日付, レース場コード, レース番号, 選手ナンバー) を1つのint64に詰めたキー
+    日付・会場は文字列プールの値ごとに1度だけ数値に変換し、コード配列から引く（日付の不明な行は負のキー）
+    """
+    def lookup(name: str, convert) -> np.ndarray:
+        table = np.array([convert(value) for value in buffer.pools[name].values] or [0], dtype=np.int64)
+        return table[buffer.raw_column(name)]
+
+    dates = lookup('日付', lambda value: int(value.replace('-', '')) if value[:1].isdigit() else -1)
+    venues = lookup('レース場コード', lambda value: int(value) if value.isdigit() else 0)
+    return ((dates * 100 + venues) * 100 + buffer.raw_column('レース番号')) * 10 + buffer.raw_column('選手ナンバー')
+
+
+def hash_join(build_keys: np.ndarray, probe_keys: np.ndarray) -> np.ndarray:
+    """
+    probe_keys の各行に一致する build_keys の行番号（一致しない行は -1）
+    同じキーが複数ある場合は後に取り込んだ行を使う
+    """
+    index = pd.Index(build_keys)
+    rows = np.arange(len(build_keys))
+    if not index.is_unique:
+        keep = ~index.duplicated(keep='last')
+        index, rows = index[keep], rows[keep]
+    positions = index.get_indexer(probe_keys)
+    return np.where(positions >= 0, rows[positions], -1)
+
+
+class BoatRaceProgramAnalyzer:
+    """
+    番組表（B-file）の分析用クラス
+    BoatRaceAnalyzer と同じ process_files / process_single_file で出走表を取り込み、join_results で競走成績と結合する
+    """
+
+    def __init__(self, venue_mapping: Optional[Dict[str, str]] = None):
+        self.venue_mapping = dict(venue_mapping or VENUE_MAPPING)
+        self.program_data = ColumnarRecordBuffer(PROGRAM_DATA_SCHEMA)
+        self.program_cache = FrameCache(self.apply_program_dtypes)
+        self.parser = BFileParser(self.venue_mapping)
+
+    def extract_date_from_filename(self, filename: str) -> str:
+        """ファイル名（B240101.TXT）から日付を抽出"""
+        file_date = parse_kfile_date(filename, BFILE_NAME_PATTERN)
+        return file_date.isoformat() if file_date is not None else "unknown"
+
+    def append_program_records(self, date_str: str, section: ParsedProgramSection):
+        """会場セクションの出走表を選手単位のレコードとして列バッファに追加"""
+        append_row = self.program_data.append_row
+        venue_code, venue_name = section.venue_code, section.venue_name
+        for entry in section.entries:
+            append_row((
+                date_str, venue_code, venue_name, entry.race_number, entry.boat_number, entry.racer_id,
+                entry.racer_name, entry.age, entry.branch, entry.weight, entry.racer_class,
+                entry.national_win_rate, entry.national_top2_rate, entry.local_win_rate, entry.local_top2_rate,
+                entry.motor_number, entry.motor_top2_rate, entry.boat_id, entry.boat_top2_rate
+            ))
+
+    def ingest_parsed_file(self, file_path: Path, parsed: ParsedBFile, venue_codes: Optional[Set[str]] = None):
+        """解析済みの結果を会場セクションごとにレコードとして追加"""
+        date_str = self.extract_date_from_filename(file_path.name)
+        for section in parsed.select_venues(venue_codes):
+            self.append_program_records(date_str, section)
+
+    def process_single_file(self, file_path: Path, venue_codes: Optional[Set[str]] = None,
+                            race_numbers: Optional[Set[int]] = None) -> bool:
+        """単一ファイルを処理（対象外の会場・レースは解析しない）"""
+        print(f"処理中: {file_path.name}")
+        try:
+            parsed = self.parser.parse_file(file_path, SectionFilter(venue_codes, race_numbers))
+            self.ingest_parsed_file(file_path, parsed, venue_codes)
+            return True
+        except Exception as e:
+            print(f"エラー: {file_path} - {e}")
+            return False
+
+    def process_files(self, directory_path: str, max_files: Optional[int] = None,
+                      start_date: DateLike = None, end_date: DateLike = None,
+                      venues: Optional[List[Union[str, int]]] = None,
+                      parallel: bool = False, max_workers: Optional[int] = None,
+                      chunksize: int = 1, race_numbers: Optional[List[int]] = None) -> int:
+        """
+        複数ファイルを処理
+        ディレクトリ配下の全B-fileを日付順に処理する（条件の指定は BoatRaceAnalyzer.process_files と同じ）
+        parallel=True の場合はプロセスプールで解析し、ファイル順に結果をマージする
+        """
+        processed_count = 0
+        venue_codes = resolve_venue_codes(venues, self.venue_mapping)
+        race_numbers = set(race_numbers) if race_numbers is not None else None
+        file_paths = iter_bfiles(directory_path, start_date, end_date)
+
+        if parallel:
+            section_filter = SectionFilter(venue_codes, race_numbers)
+            for file_path, parsed, error in iter_parsed_files(self.parser, file_paths, max_workers, chunksize,
+                                                              section_filter):
+                if max_files and processed_count >= max_files:
+                    break
+                print(f"処理中: {file_path.name}")
+                if error is not None:
+                    print(f"エラー: {file_path} - {error}")
+                    continue
+                self.ingest_parsed_file(file_path, parsed, venue_codes)
+                processed_count += 1
+        else:
+            for file_path in file_paths:
+                if max_files and processed_count >= max_files:
+                    break
+                if self.process_single_file(file_path, venue_codes, race_numbers):
+                    processed_count += 1
+
+        print(f"\n処理完了: {processed_count} ファイル, {len(self.program_data)} レコード")
+        return processed_count
+
+    def apply_program_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """出走表のデータ型に変換"""
+        if '日付' in df.columns:
+            df['日付'] = pd.to_datetime(df['日付'], errors='coerce')
+        for col in ['レース場コード', 'レース場名', '支部', '級別']:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        if 'レーサー名' in df.columns:
+            df['レーサー名'] = df['レーサー名'].astype('string')
+        return df
+
+    def get_program_data(self) -> pd.DataFrame:
+        """出走表を選手単位で取得"""
+        if not self.program_data:
+            return pd.DataFrame()
+        return self.program_cache.get(self.program_data)
+
+    def join_results(self, results: BoatRaceAnalyzer) -> pd.DataFrame:
+        """
+        出走表に競走成績（展示タイム・スタートタイミング・レースタイム・最終着順）を付けて返す
+        成績は (日付, レース場コード, レース番号, 選手ナンバー) のハッシュ結合で引き、成績のない選手行は欠損値（着順は0）
+        """
+        program_df = self.get_program_data()
+        if program_df.empty:
+            return program_df
+        result_rows = hash_join(pack_join_keys(results.race_data), pack_join_keys(self.program_data))
+        matched = result_rows >= 0
+        taken = results.race_data.take(result_rows[matched], list(RESULT_COLUMNS)) if results.race_data else {}
+        for name, missing in RESULT_COLUMNS.items():
+            column = np.full(len(program_df), missing, dtype=object if isinstance(missing, str) else None)
+            if matched.any():
+                column[matched] = taken[name]
+            program_df[name] = column
+        return program_df
+
+    def save_program_data(self, output_dir: str = "boat_race_analysis", results: Optional[BoatRaceAnalyzer] = None,
+                          output_format: str = 'csv', compression: Optional[str] = None,
+                          partition: bool = False) -> Dict[str, Path]:
+        """出走表（results を指定した場合は競走成績と結合したもの）を保存"""
+        output_path = Path(output_dir)
+        output_path.mkdir(exist_ok=True)
+        writer = get_writer(output_format, compression, ('日付', 'レース場コード') if partition else None)
+
+        targets = {PROGRAM_NAME: writer.write(self.get_program_data(), output_path, PROGRAM_NAME)}
+        print(f"出走表保存: {targets[PROGRAM_NAME]}")
+        if results is not None:
+            targets[PROGRAM_RESULTS_NAME] = writer.write(self.join_results(results), output_path,
+                                                         PROGRAM_RESULTS_NAME)
+            print(f"出走表と競走成績の結合データ保存: {targets[PROGRAM_RESULTS_NAME]}")
+        return targets
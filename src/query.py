@@ -0,0 +1,290 @@
+"""
+出力データセットに対する遅延評価のクエリ
+列の選択・日付/会場/レーサー/レース番号の絞り込み・件数の上限を組み立て、collect の時点で必要な行と列だけを読み込む
+対象はメモリ上の列指向バッファ、または保存済みの出力（パーティション分割したディレクトリを含む）
+"""
+
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .columnar import ColumnarRecordBuffer
+from .discovery import DateLike, resolve_venue_codes, to_date
+from .kfile_parser import VENUE_MAPPING
+from .writers import PARTITION_KEYS, UNKNOWN_PARTITION, CsvWriter, DatasetWriter, ParquetWriter
+
+# 絞り込みに使う列
+DATE_COLUMN = '日付'
+VENUE_COLUMN = 'レース場コード'
+RACER_COLUMN = 'レーサーID'
+RACE_NUMBER_COLUMN = 'レース番号'
+
+# CSVを読み込むときの1チャンクの行数
+CSV_CHUNK_ROWS = 100_000
+
+
+class QueryFilter(NamedTuple):
+    """絞り込み条件（None は条件なし）"""
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    venue_codes: Optional[FrozenSet[str]] = None
+    racer_ids: Optional[FrozenSet[int]] = None
+    race_numbers: Optional[FrozenSet[int]] = None
+
+    def merge(self, other: 'QueryFilter') -> 'QueryFilter':
+        """両方の条件を満たす絞り込み条件"""
+        def intersect(a, b):
+            if a is None or b is None:
+                return a if b is None else b
+            return a & b
+
+        return QueryFilter(
+            max(filter(None, (self.start_date, other.start_date)), default=None),
+            min(filter(None, (self.end_date, other.end_date)), default=None),
+            intersect(self.venue_codes, other.venue_codes),
+            intersect(self.racer_ids, other.racer_ids),
+            intersect(self.race_numbers, other.race_numbers)
+        )
+
+    def columns(self) -> List[str]:
+        """条件に使う列"""
+        columns = []
+        if self.start_date is not None or self.end_date is not None:
+            columns.append(DATE_COLUMN)
+        if self.venue_codes is not None:
+            columns.append(VENUE_COLUMN)
+        if self.racer_ids is not None:
+            columns.append(RACER_COLUMN)
+        if self.race_numbers is not None:
+            columns.append(RACE_NUMBER_COLUMN)
+        return columns
+
+    def match_date(self, value: str) -> bool:
+        """'YYYY-MM-DD' の日付が期間内かどうか（日付として解釈できない値は対象外）"""
+        try:
+            day = to_date(value)
+        except ValueError:
+            return False
+        return (self.start_date is None or day >= self.start_date) and \
+            (self.end_date is None or day <= self.end_date)
+
+    def match_partition(self, parts: Sequence[str]) -> bool:
+        """year=/month=/venue= のディレクトリが条件に一致し得るかどうか"""
+        values = dict(part.split('=', 1) for part in parts if '=' in part)
+        if any(key not in values for key in PARTITION_KEYS):
+            return True
+        month = (int(values['year']), int(values['month']))
+        if self.start_date is not None and month < (self.start_date.year, self.start_date.month):
+            return False
+        if self.end_date is not None and month > (self.end_date.year, self.end_date.month):
+            return False
+        if self.venue_codes is not None:
+            venue = '' if values['venue'] == UNKNOWN_PARTITION else values['venue']
+            return venue in self.venue_codes
+        return True
+
+    def frame_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """読み込んだDataFrameの各行が条件に一致するかどうか"""
+        mask = np.ones(len(df), dtype=bool)
+        if self.start_date is not None or self.end_date is not None:
+            dates = pd.to_datetime(df[DATE_COLUMN], errors='coerce')
+            if self.start_date is not None:
+                mask &= (dates >= pd.Timestamp(self.start_date)).to_numpy()
+            if self.end_date is not None:
+                mask &= (dates <= pd.Timestamp(self.end_date)).to_numpy()
+        if self.venue_codes is not None:
+            venues = df[VENUE_COLUMN].astype(object).fillna('').astype(str)
+            mask &= venues.isin(self.venue_codes).to_numpy()
+        if self.racer_ids is not None:
+            mask &= df[RACER_COLUMN].isin(self.racer_ids).to_numpy()
+        if self.race_numbers is not None:
+            mask &= df[RACE_NUMBER_COLUMN].isin(self.race_numbers).to_numpy()
+        return mask
+
+    def parquet_filters(self) -> Optional[List[tuple]]:
+        """pyarrowに渡す述語（Parquetの行グループ単位で読み飛ばす）"""
+        filters = []
+        if self.start_date is not None:
+            filters.append((DATE_COLUMN, '>=', pd.Timestamp(self.start_date)))
+        if self.end_date is not None:
+            filters.append((DATE_COLUMN, '<=', pd.Timestamp(self.end_date)))
+        if self.venue_codes is not None:
+            filters.append((VENUE_COLUMN, 'in', sorted(self.venue_codes)))
+        if self.racer_ids is not None:
+            filters.append((RACER_COLUMN, 'in', sorted(self.racer_ids)))
+        if self.race_numbers is not None:
+            filters.append((RACE_NUMBER_COLUMN, 'in', sorted(self.race_numbers)))
+        return filters or None
+
+
+class BufferSource:
+    """
+    メモリ上の列指向バッファ
+    絞り込みは文字列プールのコード・数値配列のまま行い、対象の行・列だけを復号する
+    """
+
+    def __init__(self, buffer: ColumnarRecordBuffer,
+                 convert: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None):
+        self.buffer = buffer
+        # 生の列データ → 型変換済みDataFrame
+        self.convert = convert
+
+    def code_mask(self, name: str, match: Callable[[str], bool]) -> np.ndarray:
+        """文字列の列の各行が条件に一致するかどうか（判定は文字列プールの値ごとに1回）"""
+        values = self.buffer.pools[name].values
+        allowed = np.fromiter((match(value) for value in values), dtype=bool, count=len(values))
+        return allowed[self.buffer.raw_column(name)]
+
+    def row_indices(self, query_filter: QueryFilter) -> np.ndarray:
+        """条件に一致する行番号"""
+        for column in query_filter.columns():
+            if column not in self.buffer.names:
+                raise ValueError(f"絞り込みに使う列がありません: {column}")
+        mask = np.ones(len(self.buffer), dtype=bool)
+        if query_filter.start_date is not None or query_filter.end_date is not None:
+            mask &= self.code_mask(DATE_COLUMN, query_filter.match_date)
+        if query_filter.venue_codes is not None:
+            mask &= self.code_mask(VENUE_COLUMN, query_filter.venue_codes.__contains__)
+        if query_filter.racer_ids is not None:
+            mask &= np.isin(self.buffer.raw_column(RACER_COLUMN), list(query_filter.racer_ids))
+        if query_filter.race_numbers is not None:
+            mask &= np.isin(self.buffer.raw_column(RACE_NUMBER_COLUMN), list(query_filter.race_numbers))
+        return np.flatnonzero(mask)
+
+    def read(self, columns: Optional[Sequence[str]], query_filter: QueryFilter,
+             limit: Optional[int]) -> pd.DataFrame:
+        rows = self.row_indices(query_filter)[:limit]
+        df = pd.DataFrame(self.buffer.take(rows, columns))
+        return self.convert(df) if self.convert is not None else df
+
+    def count(self, query_filter: QueryFilter) -> int:
+        return len(self.row_indices(query_filter))
+
+
+class FileSource:
+    """
+    保存済みの出力（writers.DatasetWriter の形式）
+    パーティション分割した出力は条件に一致し得るディレクトリだけを読み、必要な列だけを読み込む
+    Parquetは述語をpyarrowに渡し、CSVはチャンクごとに絞り込んで上限に達したら読み込みをやめる
+    """
+
+    def __init__(self, writer: DatasetWriter, output_path: Union[str, Path], name: str,
+                 dtype: Optional[Dict[str, type]] = None,
+                 convert: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None):
+        self.writer = writer
+        self.output_path = Path(output_path)
+        self.name = name
+        # CSVを読み込むときの列の型
+        self.dtype = dtype
+        # 読み込んだDataFrame → 型変換済みDataFrame
+        self.convert = convert
+
+    def paths(self, query_filter: QueryFilter) -> List[Path]:
+        """読み込むファイル（writer.read と同じ順）"""
+        target = self.writer.target(self.output_path, self.name)
+        if not target.exists():
+            raise FileNotFoundError(f"出力が見つかりません: {target}")
+        if not self.writer.partition_columns:
+            return [target]
+        return [path for path in sorted(target.rglob(f"*{self.writer.extension}"))
+                if query_filter.match_partition(path.relative_to(target).parts[:-1])]
+
+    def chunks(self, path: Path, columns: Optional[List[str]],
+               query_filter: QueryFilter) -> Iterator[pd.DataFrame]:
+        """1ファイル分をチャンクに分けて読み込む"""
+        if isinstance(self.writer, CsvWriter):
+            dtype = {col: kind for col, kind in (self.dtype or {}).items() if columns is None or col in columns}
+            yield from self.writer.read_file(path, usecols=columns, dtype=dtype or None,
+                                             chunksize=CSV_CHUNK_ROWS)
+        elif isinstance(self.writer, ParquetWriter):
+            yield self.writer.read_file(path, columns=columns, filters=query_filter.parquet_filters())
+        else:
+            yield self.writer.read_file(path, columns=columns)
+
+    def iter_frames(self, columns: Optional[Sequence[str]], query_filter: QueryFilter) -> Iterator[pd.DataFrame]:
+        """条件に一致する行を、選択した列だけのDataFrameとして順に返す"""
+        read_columns = None if columns is None else list(dict.fromkeys([*columns, *query_filter.columns()]))
+        for path in self.paths(query_filter):
+            for chunk in self.chunks(path, read_columns, query_filter):
+                if query_filter.columns():
+                    chunk = chunk[query_filter.frame_mask(chunk)]
+                yield chunk if columns is None else chunk[list(columns)]
+
+    def read(self, columns: Optional[Sequence[str]], query_filter: QueryFilter,
+             limit: Optional[int]) -> pd.DataFrame:
+        parts = []
+        remaining = limit
+        for frame in self.iter_frames(columns, query_filter):
+            if remaining is not None:
+                frame = frame.iloc[:remaining]
+                remaining -= len(frame)
+            parts.append(frame)
+            if remaining == 0:
+                break
+        if not parts:
+            return pd.DataFrame(columns=list(columns or []))
+        df = pd.concat(parts, ignore_index=True)
+        return self.convert(df) if self.convert is not None else df
+
+    def count(self, query_filter: QueryFilter) -> int:
+        return sum(len(frame) for frame in self.iter_frames(query_filter.columns() or None, query_filter))
+
+
+Source = Union[BufferSource, FileSource]
+
+
+class DatasetQuery:
+    """
+    遅延評価のクエリ
+    select / where / limit は条件を加えた新しいクエリを返すだけで、collect / count を呼ぶまでデータを読み込まない
+    """
+
+    def __init__(self, source: Source, columns: Optional[Sequence[str]] = None,
+                 query_filter: Optional[QueryFilter] = None, row_limit: Optional[int] = None,
+                 venue_mapping: Optional[Dict[str, str]] = None):
+        self.source = source
+        self.columns = list(columns) if columns is not None else None
+        self.query_filter = query_filter or QueryFilter()
+        self.row_limit = row_limit
+        self.venue_mapping = venue_mapping or VENUE_MAPPING
+
+    def _replace(self, **changes) -> 'DatasetQuery':
+        values = {'columns': self.columns, 'query_filter': self.query_filter, 'row_limit': self.row_limit}
+        values.update(changes)
+        return DatasetQuery(self.source, venue_mapping=self.venue_mapping, **values)
+
+    def select(self, *columns: str) -> 'DatasetQuery':
+        """読み込む列を指定（省略時は全列）"""
+        return self._replace(columns=columns)
+
+    def where(self, start_date: DateLike = None, end_date: DateLike = None,
+              venues: Optional[Iterable[Union[str, int]]] = None,
+              racer_ids: Optional[Iterable[int]] = None,
+              race_numbers: Optional[Iterable[int]] = None) -> 'DatasetQuery':
+        """絞り込み条件を追加（複数回呼ぶとすべての条件を満たす行）"""
+        venue_codes = resolve_venue_codes(venues, self.venue_mapping)
+        condition = QueryFilter(
+            to_date(start_date), to_date(end_date),
+            frozenset(venue_codes) if venue_codes is not None else None,
+            frozenset(int(racer_id) for racer_id in racer_ids) if racer_ids is not None else None,
+            frozenset(int(number) for number in race_numbers) if race_numbers is not None else None
+        )
+        return self._replace(query_filter=self.query_filter.merge(condition))
+
+    def limit(self, n: int) -> 'DatasetQuery':
+        """読み込む行数の上限（先頭から n 行）"""
+        if n < 0:
+            raise ValueError(f"上限には0以上を指定してください: {n}")
+        return self._replace(row_limit=n if self.row_limit is None else min(n, self.row_limit))
+
+    def collect(self) -> pd.DataFrame:
+        """条件に一致する行・選択した列だけを読み込んでDataFrameにする"""
+        return self.source.read(self.columns, self.query_filter, self.row_limit)
+
+    def count(self) -> int:
+        """条件に一致する行数（絞り込みに使う列だけを読み込む）"""
+        count = self.source.count(self.query_filter)
+        return count if self.row_limit is None else min(count, self.row_limit)
@@ -0,0 +1,230 @@
+"""
+選手ごとの直近成績の統計量ストア
+レーサーID（全体・会場別・艇番別）ごとに直近N走の勝率・3連対率・平均スタートタイミング・平均展示タイムを逐次更新する
+特徴量は日付ごとに「その日より前のレースだけ」から求め、その後でその日のレースを統計量に加える
+"""
+
+import json
+import os
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+RACER_STATS_FILE_NAME = "racer_stats.json"
+RACER_STATS_VERSION = 1
+# 統計量に使う直近の出走数
+DEFAULT_WINDOW = 30
+
+# 特徴量の範囲（列名の接頭辞）: 全体 / 会場別 / 艇番別
+SCOPES = ['選手', '選手会場', '選手艇番']
+STAT_NAMES = ['出走数', '勝率', '3連対率', '平均スタートタイミング', '平均展示タイム']
+
+# 1走分の記録: (最終着順, スタートタイミング, 展示タイム)
+Entry = Tuple[int, float, float]
+
+
+class RollingStats:
+    """直近 window 走の記録と、その合計値（追加・押し出しのたびに O(1) で更新）"""
+
+    __slots__ = ('entries', 'rated', 'wins', 'top3', 'start_sum', 'start_count',
+                 'exhibition_sum', 'exhibition_count')
+
+    def __init__(self, window: int):
+        self.entries: deque = deque(maxlen=window)
+        # 着順のあるレース数（最終着順 0 は勝率・3連対率の対象外）
+        self.rated = 0
+        self.wins = 0
+        self.top3 = 0
+        self.start_sum = 0.0
+        self.start_count = 0
+        self.exhibition_sum = 0.0
+        self.exhibition_count = 0
+
+    def _apply(self, entry: Entry, sign: int):
+        finish, start_timing, exhibition_time = entry
+        if finish > 0:
+            self.rated += sign
+            self.wins += sign * (finish == 1)
+            self.top3 += sign * (finish <= 3)
+        if not np.isnan(start_timing):
+            self.start_sum += sign * start_timing
+            self.start_count += sign
+        if not np.isnan(exhibition_time):
+            self.exhibition_sum += sign * exhibition_time
+            self.exhibition_count += sign
+
+    def add(self, entry: Entry):
+        """1走分を追加（window を超えた最も古い記録は押し出す）"""
+        if len(self.entries) == self.entries.maxlen:
+            self._apply(self.entries[0], -1)
+        self.entries.append(entry)
+        self._apply(entry, 1)
+
+    def features(self) -> Tuple[float, float, float, float, float]:
+        """(出走数, 勝率, 3連対率, 平均スタートタイミング, 平均展示タイム)"""
+        return (
+            float(len(self.entries)),
+            self.wins / self.rated if self.rated else np.nan,
+            self.top3 / self.rated if self.rated else np.nan,
+            self.start_sum / self.start_count if self.start_count else np.nan,
+            self.exhibition_sum / self.exhibition_count if self.exhibition_count else np.nan
+        )
+
+
+EMPTY_FEATURES = (0.0, np.nan, np.nan, np.nan, np.nan)
+
+
+def to_json_value(value: float) -> Optional[float]:
+    return None if np.isnan(value) else value
+
+
+def from_json_value(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+
+class RacerStatsStore:
+    """
+    レーサーIDごとの直近成績の統計量
+    update は日付の昇順にしか適用できない（特徴量が当日以降のレースを含まないようにするため）
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        # 統計量に反映済みの最後の日付（YYYY-MM-DD）
+        self.last_date: Optional[str] = None
+        self.overall: Dict[int, RollingStats] = {}
+        self.by_venue: Dict[Tuple[int, str], RollingStats] = {}
+        self.by_boat: Dict[Tuple[int, int], RollingStats] = {}
+
+    def __len__(self) -> int:
+        return len(self.overall)
+
+    @staticmethod
+    def feature_names() -> List[str]:
+        """特徴量の列名"""
+        return [f'{scope}_{stat}' for scope in SCOPES for stat in STAT_NAMES]
+
+    def lookup(self, racer_id: int, venue_code: str, boat_number: int) -> Tuple[float, ...]:
+        """現在の統計量から特徴量を取得（feature_names の順）"""
+        overall = self.overall.get(racer_id)
+        venue = self.by_venue.get((racer_id, venue_code))
+        boat = self.by_boat.get((racer_id, boat_number))
+        return (
+            (overall.features() if overall is not None else EMPTY_FEATURES) +
+            (venue.features() if venue is not None else EMPTY_FEATURES) +
+            (boat.features() if boat is not None else EMPTY_FEATURES)
+        )
+
+    def _stats(self, table: Dict, key) -> RollingStats:
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = RollingStats(self.window)
+        return stats
+
+    def check_date(self, date_str: str):
+        """統計量に反映済みの日付以前のデータは受け付けない"""
+        if self.last_date is not None and date_str <= self.last_date:
+            raise ValueError(f"{date_str} は統計量に反映済みの日付（{self.last_date}）以前です。"
+                             f"過去のデータが変わった場合は統計量を作り直してください")
+
+    def update(self, date_str: str, rows: Iterable[Tuple[int, str, int, int, float, float]]):
+        """
+        1日分のレースを統計量に加える
+        rows は (レーサーID, レース場コード, 艇番, 最終着順, スタートタイミング, 展示タイム)
+        """
+        self.check_date(date_str)
+        for racer_id, venue_code, boat_number, finish, start_timing, exhibition_time in rows:
+            entry = (finish, start_timing, exhibition_time)
+            self._stats(self.overall, racer_id).add(entry)
+            self._stats(self.by_venue, (racer_id, venue_code)).add(entry)
+            self._stats(self.by_boat, (racer_id, boat_number)).add(entry)
+        self.last_date = date_str
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        人間が読みやすい形式のデータに選手の直近成績の特徴量を付けて返し、df のレースで統計量を更新する
+        日付の昇順に、各日の特徴量を求めてからその日のレースを統計量に加える（同じ日のレースは特徴量に含まない）
+        """
+        keys = df[['日付', 'レース場コード', 'レース番号', '選手ナンバー', 'レーサーID']].reset_index(drop=True)
+        if keys.empty:
+            return keys.assign(**{name: pd.Series(dtype='float64') for name in self.feature_names()})
+
+        dates = pd.to_datetime(keys['日付']).dt.strftime('%Y-%m-%d').to_numpy()
+        racer_ids = keys['レーサーID'].to_numpy(dtype=np.int64)
+        venue_codes = keys['レース場コード'].astype(str).to_numpy()
+        boat_numbers = keys['選手ナンバー'].to_numpy(dtype=np.int64)
+        finishes = df['最終着順'].to_numpy(dtype=np.int64)
+        start_timings = df['スタートタイミング'].to_numpy(dtype=np.float64)
+        exhibition_times = df['展示タイム'].to_numpy(dtype=np.float64)
+
+        # 反映済みの日付を含む場合は統計量を変更する前に中止する
+        self.check_date(min(dates))
+        features = np.empty((len(keys), len(SCOPES) * len(STAT_NAMES)))
+        for date_str, positions in sorted(pd.Series(dates).groupby(dates).indices.items()):
+            self.check_date(date_str)
+            rows = [
+                (int(racer_ids[i]), venue_codes[i], int(boat_numbers[i]), int(finishes[i]),
+                 float(start_timings[i]), float(exhibition_times[i]))
+                for i in positions
+            ]
+            for i, (racer_id, venue_code, boat_number, *_) in zip(positions, rows):
+                features[i] = self.lookup(racer_id, venue_code, boat_number)
+            self.update(date_str, rows)
+
+        for column, name in enumerate(self.feature_names()):
+            keys[name] = features[:, column]
+        return keys
+
+    def to_dict(self) -> Dict:
+        def entries(stats: RollingStats) -> List[List]:
+            return [[finish, to_json_value(start_timing), to_json_value(exhibition_time)]
+                    for finish, start_timing, exhibition_time in stats.entries]
+
+        racers: Dict[str, Dict] = {}
+        for racer_id, stats in self.overall.items():
+            racers[str(racer_id)] = {'all': entries(stats), 'venue': {}, 'boat': {}}
+        for (racer_id, venue_code), stats in self.by_venue.items():
+            racers[str(racer_id)]['venue'][venue_code] = entries(stats)
+        for (racer_id, boat_number), stats in self.by_boat.items():
+            racers[str(racer_id)]['boat'][str(boat_number)] = entries(stats)
+        return {'version': RACER_STATS_VERSION, 'window': self.window, 'last_date': self.last_date,
+                'racers': racers}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RacerStatsStore':
+        if data.get('version') != RACER_STATS_VERSION:
+            raise ValueError(f"対応していない統計量のバージョンです: {data.get('version')}")
+        store = cls(data['window'])
+        store.last_date = data['last_date']
+
+        def restore(table: Dict, key, entries: List[List]):
+            stats = store._stats(table, key)
+            for finish, start_timing, exhibition_time in entries:
+                stats.add((finish, from_json_value(start_timing), from_json_value(exhibition_time)))
+
+        for racer_id, racer in data['racers'].items():
+            racer_id = int(racer_id)
+            restore(store.overall, racer_id, racer['all'])
+            for venue_code, entries in racer['venue'].items():
+                restore(store.by_venue, (racer_id, venue_code), entries)
+            for boat_number, entries in racer['boat'].items():
+                restore(store.by_boat, (racer_id, int(boat_number)), entries)
+        return store
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """JSONとして保存（一時ファイルに書いてから置き換える）"""
+        path = Path(path)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'RacerStatsStore':
+        """保存した統計量を読み込む"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
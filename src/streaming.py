@@ -0,0 +1,98 @@
+"""
+解析中のレコードのストリーミング出力
+列指向バッファが一定の行数に達するたびにチャンクとして書き出してバッファを空にし、メモリ使用量を一定に保つ
+統計情報はチャンクごとの累計から求め、全データのDataFrameは作らない
+"""
+
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+from .writers import DatasetStream, DatasetWriter
+
+# 1チャンク（Parquetの1行グループ）の目安の行数
+DEFAULT_CHUNK_ROWS = 200_000
+
+
+class RunningSummary:
+    """
+    統計情報の累計
+    レコード数・会場の分布・日付・レーサーIDをチャンクごとに集計する（日付・レーサーIDはユニークな値のみ保持）
+    """
+
+    def __init__(self, date_column: str, venue_column: str, racer_column: str, sample_size: int = 5):
+        self.date_column = date_column
+        self.venue_column = venue_column
+        self.racer_column = racer_column
+        self.sample_size = sample_size
+        self.total_records = 0
+        self.venue_counts = Counter()
+        self.dates = set()
+        self.racers = set()
+        self.columns: Optional[list] = None
+        # 先頭から sample_size 行
+        self.sample: Optional[pd.DataFrame] = None
+
+    def update(self, df: pd.DataFrame) -> 'RunningSummary':
+        """1チャンク分を集計に加える"""
+        if self.columns is None:
+            self.columns = [str(col) for col in df.columns]
+        self.total_records += len(df)
+        self.venue_counts.update({venue: int(count) for venue, count in df[self.venue_column].value_counts().items()
+                                  if count})
+        self.dates.update(df[self.date_column].dropna().unique())
+        self.racers.update(df[self.racer_column].dropna().unique())
+        if self.sample is None:
+            self.sample = df.head(self.sample_size)
+        elif len(self.sample) < self.sample_size:
+            self.sample = pd.concat([self.sample, df.head(self.sample_size - len(self.sample))], ignore_index=True)
+        return self
+
+    def date_range(self) -> Dict[str, str]:
+        return {
+            'start': str(min(self.dates)) if self.dates else None,
+            'end': str(max(self.dates)) if self.dates else None
+        }
+
+    def to_dict(self) -> Dict:
+        """件数・ユニーク数・会場の分布（件数の多い順）"""
+        return {
+            'total_records': self.total_records,
+            'unique_venues': len(self.venue_counts),
+            'unique_dates': len(self.dates),
+            'unique_racers': len(self.racers),
+            'venue_distribution': {str(venue): count for venue, count in self.venue_counts.most_common()}
+        }
+
+
+class StreamingSink:
+    """
+    チャンクの書き出し先
+    データセット名ごとにストリームを開き（既存の出力は置き換える）、close ですべて閉じる
+    """
+
+    def __init__(self, writer: DatasetWriter, output_path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 summary: Optional[RunningSummary] = None):
+        if chunk_rows < 1:
+            raise ValueError(f"チャンクの行数には1以上を指定してください: {chunk_rows}")
+        self.writer = writer
+        self.output_path = Path(output_path)
+        self.output_path.mkdir(exist_ok=True)
+        self.chunk_rows = chunk_rows
+        self.summary = summary
+        self.streams: Dict[str, DatasetStream] = {}
+
+    def write(self, name: str, df: pd.DataFrame):
+        """データセットに1チャンク分を書き出す（最初のチャンク以外の空のチャンクは読み飛ばす）"""
+        stream = self.streams.get(name)
+        if stream is None:
+            stream = self.streams[name] = self.writer.open_stream(self.output_path, name)
+        elif df.empty:
+            return
+        stream.write(df)
+
+    def close(self) -> Dict[str, Path]:
+        """すべてのストリームを閉じて、データセット名 → 出力先を返す"""
+        return {name: stream.close() for name, stream in self.streams.items()}
@@ -0,0 +1,290 @@
+"""
+合成K-file（競走成績）・B-file（番組表）ジェネレーター
+公式の結果TXT・番組表TXTと同じレイアウトのShift-JISファイルを生成し、ベンチマークや動作確認に使用する
+"""
+
+import argparse
+import random
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .kfile_parser import VENUE_MAPPING
+
+FAMILY_NAMES = ['川上', '中島', '津留', '田中', '山口', '江頭', '山崎', '大串',
+                '谷川', '森口', '眞鳥', '吉川', '宇土', '下條', '中北', '尾崎',
+                '宮本', '飯山', '佐藤', '鈴木', '高橋', '渡辺', '伊藤', '小林',
+                '加藤', '吉田', '松本', '井上', '木村', '林', '清水', '池田']
+GIVEN_NAMES = ['昇平', '浩哉', '浩一郎', '孝明', '真喜子', '賢太', '昂介', '重幸',
+               '将太', '和紀', '康太', '勇作', '泰就', '雄太郎', '涼', '雄二',
+               '夏樹', '晃三', '翔', '大輔', '健', '誠', '亮', '拓也']
+RACE_TYPES = ['予選', '一般', '特選', '選抜', '準優勝戦', '優勝戦']
+WEATHERS = ['晴', '曇り', '雨']
+WIND_DIRECTIONS = ['北', '南', '東', '西', '北東', '南西']
+BRANCHES = ['群馬', '埼玉', '東京', '静岡', '愛知', '三重', '福井', '滋賀', '大阪',
+            '兵庫', '徳島', '香川', '岡山', '広島', '山口', '福岡', '佐賀', '長崎']
+RACER_CLASSES = ['A1', 'A2', 'B1', 'B2']
+FULL_WIDTH_DIGITS = str.maketrans('0123456789', '０１２３４５６７８９')
+# 出走表（番組表）の列見出し
+PROGRAM_TABLE_HEADER = [
+    "-------------------------------------------------------------------------------",
+    "艇 選手 選手  年 支 体級    全国      当地     モーター   ボート   今節成績  早",
+    "番 登番  名   齢 部 重別 勝率  2率  勝率  2率  NO  2率  NO  2率  １２３４５６見",
+    "-------------------------------------------------------------------------------",
+]
+
+
+def format_racer_name(family: str, given: str) -> str:
+    """選手名を公式ファイルと同じ全角8文字の枠に整形"""
+    left = '　'.join(family) if len(family) == 2 else family
+    right = '　'.join(given) if len(given) == 2 else given
+    gap = 8 - len(left) - len(right)
+    return left + '　' * max(gap, 1) + right if len(left) + len(right) < 8 else (left + right)[:8]
+
+
+def format_program_name(family: str, given: str) -> str:
+    """選手名を番組表と同じ全角4文字の枠に整形（姓と名の間を全角スペースで埋める）"""
+    if len(family) + len(given) >= 4:
+        return (family + given)[:4]
+    return family + '　' * (4 - len(family) - len(given)) + given
+
+
+def full_width(value: int) -> str:
+    """数値を全角数字の文字列に変換"""
+    return str(value).translate(FULL_WIDTH_DIGITS)
+
+
+def spaced_venue_name(venue_name: str) -> str:
+    """見出し用の会場名（2文字の場合は全角スペースを挟む）"""
+    if len(venue_name) == 2:
+        return '　'.join(venue_name)
+    return venue_name.ljust(3, '　')
+
+
+class SyntheticKFileGenerator:
+    """
+    公式フォーマットに準拠した合成K-fileを生成するクラス
+    乱数シードを固定すれば同一内容のファイルを再現できる
+    """
+
+    def __init__(self, seed: int = 0, racer_pool_size: int = 1600, fault_rate: float = 0.01):
+        self.rng = random.Random(seed)
+        # 番組表の項目は別の乱数列で生成する（番組表の有無でK-fileの内容が変わらないようにする）
+        self.program_rng = random.Random(f'{seed}:program')
+        self.fault_rate = fault_rate
+        # レーサーID → 番組表の選手名
+        self.program_names: Dict[int, str] = {}
+        # レーサーID → (支部, 級別, 全国勝率, 全国2連率)
+        self.racer_profiles: Dict[int, Tuple[str, str, float, float]] = {}
+        self.racers = self._build_racer_pool(racer_pool_size)
+
+    def _build_racer_pool(self, size: int) -> List[Tuple[int, str]]:
+        """レーサーID・選手名のプールを作成"""
+        racer_ids = self.rng.sample(range(3000, 5400), size)
+        racers = []
+        for racer_id in racer_ids:
+            family, given = self.rng.choice(FAMILY_NAMES), self.rng.choice(GIVEN_NAMES)
+            racers.append((racer_id, format_racer_name(family, given)))
+            self.program_names[racer_id] = format_program_name(family, given)
+        return racers
+
+    def _race_lines(self, race_number: int, entrants: List[Tuple[int, str]]) -> Tuple[str, List[str]]:
+        """1レース分の明細行と払戻金サマリー行を生成（entrants は艇番順の出走選手）"""
+        rng = self.rng
+        finish_order = rng.sample(range(1, 7), 6)
+        first, second, third = finish_order[:3]
+        base_seconds = rng.randint(105, 115)
+
+        lines = [
+            f"   {race_number:>2}R       {rng.choice(RACE_TYPES):　<8}          H1800m  "
+            f"{rng.choice(WEATHERS)}　  風  {rng.choice(WIND_DIRECTIONS):　<3} {rng.randint(0, 8):>2}m  波　 {rng.randint(1, 10):>2}cm",
+            "  着 艇 登番 　選　手　名　　ﾓｰﾀｰ ﾎﾞｰﾄ 展示 進入 ｽﾀｰﾄﾀｲﾐﾝｸ ﾚｰｽﾀｲﾑ 差し    ",
+            "-------------------------------------------------------------------------------",
+        ]
+        for place, boat_number in enumerate(finish_order, 1):
+            racer_id, racer_name = entrants[boat_number - 1]
+            finish = f"{place:02d}" if rng.random() >= self.fault_rate else rng.choice(['F ', 'S0', 'K1'])
+            if place <= 4:
+                seconds = base_seconds + place + rng.randint(0, 2)
+                race_time = f"{seconds // 60}.{seconds % 60:02d}.{rng.randint(0, 9)}"
+            else:
+                race_time = ".  ."
+            lines.append(
+                f"  {finish}  {boat_number} {racer_id:4d} {racer_name} {rng.randint(10, 99):2d}   "
+                f"{rng.randint(10, 99):>2}  {rng.uniform(6.6, 6.95):.2f}   {rng.randint(1, 6)}    "
+                f"{rng.uniform(0.01, 0.35):.2f}     {race_time}"
+            )
+
+        trifecta = rng.randint(500, 30000)
+        trio = rng.randint(150, max(151, trifecta // 4))
+        exacta = rng.randint(200, 5000)
+        quinella = rng.randint(150, max(151, exacta))
+        wide = sorted([rng.randint(100, 2000) for _ in range(3)])
+        low, high = sorted([first, second])
+        lines += [
+            "",
+            f"        単勝     {first}        {rng.randint(100, 3000):>5}",
+            f"        複勝     {first}        {rng.randint(100, 800):>5}  {second}        {rng.randint(100, 1500):>5}",
+            f"        ２連単   {first}-{second}      {exacta:>5}  人気  {rng.randint(1, 30):>3}",
+            f"        ２連複   {low}-{high}      {quinella:>5}  人気  {rng.randint(1, 15):>3}",
+            f"        拡連複   {low}-{high}      {wide[0]:>5}  人気  {rng.randint(1, 15):>3}",
+            f"                 {min(first, third)}-{max(first, third)}      {wide[1]:>5}  人気  {rng.randint(1, 15):>3}",
+            f"                 {min(second, third)}-{max(second, third)}      {wide[2]:>5}  人気  {rng.randint(1, 15):>3}",
+            f"        ３連単   {first}-{second}-{third}    {trifecta:>5}  人気  {rng.randint(1, 120):>3}",
+            f"        ３連複   {'-'.join(str(b) for b in sorted([first, second, third]))}    {trio:>5}  人気  {rng.randint(1, 20):>3}",
+            "",
+        ]
+        summary = (
+            f"           {race_number:>2}R  {first}-{second}-{third}  {trifecta:>6}    "
+            f"{'-'.join(str(b) for b in sorted([first, second, third]))}  {trio:>6}    "
+            f"{first}-{second}  {exacta:>6}    {low}-{high}  {quinella:>6}"
+        )
+        return summary, lines
+
+    def venue_section(self, race_date: date, venue_code: str, races_per_venue: int = 12,
+                      program: Optional[List[List[Tuple[int, str]]]] = None) -> List[str]:
+        """1会場分のセクション（KBGN～KEND）を生成（program を渡すとレースごとの出走選手を追加する）"""
+        venue_name = VENUE_MAPPING[venue_code]
+        title = f"ＢＯＡＴＲＡＣＥ{venue_name}カップ"
+        summaries = []
+        details = []
+        for race_number in range(1, races_per_venue + 1):
+            entrants = self.rng.sample(self.racers, 6)
+            if program is not None:
+                program.append(entrants)
+            summary, lines = self._race_lines(race_number, entrants)
+            summaries.append(summary)
+            details.extend(lines)
+
+        header = [
+            f"{venue_code}KBGN",
+            f"{spaced_venue_name(venue_name)}［成績］     {race_date.month}/{race_date.day:>2}      {title}　第　１日",
+            "",
+            "                            *** 競走成績 ***",
+            "",
+            f"          {title}",
+            "",
+            f"   第 1日          {race_date.year}/{race_date.month:>2}/{race_date.day:>2}"
+            f"                             ボートレース{venue_name}",
+            "",
+            "               −内容については主催者発行のものと照合して下さい−",
+            "",
+            "   [払戻金]       ３連単           ３連複           ２連単         ２連複",
+        ]
+        return header + summaries + [""] + details + [f"{venue_code}KEND"]
+
+    def render_day(self, race_date: date, venue_codes: Sequence[str], races_per_venue: int = 12,
+                   program: Optional[Dict[str, List[List[Tuple[int, str]]]]] = None) -> str:
+        """1日分のK-file本文を生成（program を渡すと会場コード → レースごとの出走選手を追加する）"""
+        lines = ["STARTK"]
+        for venue_code in venue_codes:
+            races = program.setdefault(venue_code, []) if program is not None else None
+            lines.extend(self.venue_section(race_date, venue_code, races_per_venue, races))
+        lines.append("FINALK")
+        return "\r\n".join(lines) + "\r\n"
+
+    def _racer_profile(self, racer_id: int) -> Tuple[str, str, float, float]:
+        """選手の支部・級別・全国勝率・全国2連率（選手ごとに固定）"""
+        profile = self.racer_profiles.get(racer_id)
+        if profile is None:
+            rng = self.program_rng
+            win_rate = rng.uniform(2.0, 8.5)
+            profile = self.racer_profiles[racer_id] = (
+                rng.choice(BRANCHES), rng.choice(RACER_CLASSES), win_rate, min(win_rate * rng.uniform(5, 8), 99.0))
+        return profile
+
+    def program_section(self, race_date: date, venue_code: str, races: List[List[Tuple[int, str]]]) -> List[str]:
+        """1会場分の番組表のセクション（BBGN～BEND）を生成"""
+        rng = self.program_rng
+        venue_name = VENUE_MAPPING[venue_code]
+        title = f"ＢＯＡＴＲＡＣＥ{venue_name}カップ"
+        lines = [
+            f"{venue_code}BBGN",
+            f"ボートレース{venue_name}   {full_width(race_date.month):　>2}月{full_width(race_date.day):　>2}日  {title}　第　１日",
+            "",
+            "                            ＊＊＊　番組表　＊＊＊",
+            "",
+            f"          {title}",
+            "",
+            f"   第　１日          {full_width(race_date.year)}年{full_width(race_date.month):　>2}月"
+            f"{full_width(race_date.day):　>2}日                  ボートレース{venue_name}",
+            "",
+            "               −内容については主催者発行のものと照合して下さい−",
+            "",
+        ]
+        for race_number, entrants in enumerate(races, 1):
+            lines.append(f"{full_width(race_number):　>2}Ｒ  {rng.choice(RACE_TYPES):　<8}          Ｈ１８００ｍ  "
+                         f"電話投票締切予定{full_width(rng.randint(10, 20))}：{full_width(rng.randint(10, 59))}")
+            lines.extend(PROGRAM_TABLE_HEADER)
+            for boat_number, (racer_id, _) in enumerate(entrants, 1):
+                branch, racer_class, win_rate, top2_rate = self._racer_profile(racer_id)
+                local_win_rate = min(max(win_rate + rng.uniform(-1.5, 1.5), 0.0), 9.99)
+                lines.append(
+                    f"{boat_number} {racer_id:4d}{self.program_names[racer_id]}{rng.randint(20, 60):2d}{branch}"
+                    f"{rng.randint(47, 60):2d}{racer_class} {win_rate:4.2f} {top2_rate:5.2f} {local_win_rate:4.2f} "
+                    f"{min(local_win_rate * rng.uniform(5, 8), 99.0):5.2f} {rng.randint(10, 99):2d} "
+                    f"{rng.uniform(20, 60):5.2f} {rng.randint(10, 99):2d} {rng.uniform(20, 60):5.2f}"
+                    "                "
+                )
+            lines.append("")
+        return lines + [f"{venue_code}BEND"]
+
+    def render_program_day(self, race_date: date, program: Dict[str, List[List[Tuple[int, str]]]]) -> str:
+        """1日分のB-file本文を生成（program は render_day で集めた出走選手）"""
+        lines = ["STARTB"]
+        for venue_code, races in program.items():
+            lines.extend(self.program_section(race_date, venue_code, races))
+        lines.append("FINALB")
+        return "\r\n".join(lines) + "\r\n"
+
+    def write_archive(self, output_dir: str, start_date: date, days: int = 1,
+                      venues_per_day: int = 12, races_per_venue: int = 12,
+                      venue_codes: Optional[Sequence[str]] = None,
+                      program_dir: Optional[str] = None) -> List[Path]:
+        """
+        kekkaf/YYYYMM/KYYMMDD.TXT 形式のディレクトリ構成でファイルを書き出す
+        program_dir を指定すると、同じ出走選手の番組表を program_dir/YYYYMM/BYYMMDD.TXT に書き出す
+        """
+        output_path = Path(output_dir)
+        written = []
+        all_codes = list(venue_codes) if venue_codes else sorted(VENUE_MAPPING)
+        for offset in range(days):
+            race_date = start_date + timedelta(days=offset)
+            codes = sorted(self.rng.sample(all_codes, min(venues_per_day, len(all_codes))))
+            month = f"{race_date.year:04d}{race_date.month:02d}"
+            file_name = f"{race_date.year % 100:02d}{race_date.month:02d}{race_date.day:02d}.TXT"
+            program = {} if program_dir is not None else None
+            content = self.render_day(race_date, codes, races_per_venue, program)
+            written.append(self._write_file(output_path / month / f"K{file_name}", content))
+            if program is not None:
+                self._write_file(Path(program_dir) / month / f"B{file_name}", self.render_program_day(race_date, program))
+        return written
+
+    def _write_file(self, file_path: Path, content: str) -> Path:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(file_path, 'w', encoding='shift_jis', errors='replace', newline='') as f:
+            f.write(content)
+        return file_path
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """コマンドラインから合成アーカイブを作成"""
+    parser = argparse.ArgumentParser(description="合成K-fileアーカイブを作成")
+    parser.add_argument('output_dir', help="出力先（kekkaf ディレクトリ）")
+    parser.add_argument('--start', default='2024-01-01', help="開始日 (YYYY-MM-DD)")
+    parser.add_argument('--days', type=int, default=30, help="日数")
+    parser.add_argument('--venues', type=int, default=12, help="1日あたりの会場数")
+    parser.add_argument('--races', type=int, default=12, help="1会場あたりのレース数")
+    parser.add_argument('--seed', type=int, default=0, help="乱数シード")
+    parser.add_argument('--program-dir', help="番組表（B-file）の出力先（省略時は作成しない）")
+    args = parser.parse_args(argv)
+
+    generator = SyntheticKFileGenerator(seed=args.seed)
+    start_date = datetime.strptime(args.start, '%Y-%m-%d').date()
+    written = generator.write_archive(args.output_dir, start_date, args.days, args.venues, args.races,
+                                      program_dir=args.program_dir)
+    print(f"{len(written)} ファイルを作成しました: {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+データセットの出力形式
+CSV・Parquet・Featherを同じインターフェースで書き出し、年/月/会場コードでのパーティション分割とチャンクごとのストリーミング書き出しに対応する
+"""
+
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# パーティションのディレクトリ名（Hive形式: year=2024/month=01/venue=24）
+PARTITION_KEYS = ('year', 'month', 'venue')
+UNKNOWN_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+def require_pyarrow():
+    """Parquet/Featherの読み書きに必要なpyarrowを読み込む"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Parquet/Feather形式の入出力には pyarrow が必要です (pip install pyarrow)") from e
+
+
+class DatasetWriter:
+    """
+    出力形式の基底クラス
+    name はファイル名（拡張子なし）で、パーティション分割時は同名のディレクトリになる
+    """
+
+    extension = ''
+
+    def __init__(self, compression: Optional[str] = None,
+                 partition_columns: Optional[Tuple[str, str]] = None):
+        self.compression = compression
+        # (日付列, 会場コード列)
+        self.partition_columns = partition_columns
+
+    def target(self, output_path: Path, name: str) -> Path:
+        """出力先（ファイルまたはパーティションのルートディレクトリ）"""
+        if self.partition_columns:
+            return output_path / name
+        return output_path / f"{name}{self.extension}"
+
+    def exists(self, output_path: Path, name: str) -> bool:
+        """出力済みかどうか"""
+        return self.target(output_path, name).exists()
+
+    def write(self, df: pd.DataFrame, output_path: Path, name: str) -> Path:
+        """データセットを書き出す（既存の出力は置き換える）"""
+        target = self.target(output_path, name)
+        if self.partition_columns:
+            if target.exists():
+                shutil.rmtree(target)
+            self.write_partitions(df, target)
+        else:
+            self.write_file(df, target)
+        return target
+
+    def append(self, df: pd.DataFrame, output_path: Path, name: str) -> Path:
+        """既存のデータセットに行を追加"""
+        target = self.target(output_path, name)
+        if self.partition_columns:
+            self.write_partitions(df, target)
+        else:
+            self.write_file(pd.concat([self.read_file(target), df], ignore_index=True), target)
+        return target
+
+    def read(self, output_path: Path, name: str, **kwargs) -> pd.DataFrame:
+        """書き出したデータセットを読み込む"""
+        target = self.target(output_path, name)
+        if not self.partition_columns:
+            return self.read_file(target, **kwargs)
+        parts = [self.read_file(path, **kwargs) for path in sorted(target.rglob(f"*{self.extension}"))]
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, ignore_index=True)
+
+    def partition_keys(self, df: pd.DataFrame) -> pd.DataFrame:
+        """各行のパーティションキー（year, month, venue）"""
+        date_column, venue_column = self.partition_columns
+        dates = pd.to_datetime(df[date_column])
+        venues = df[venue_column].astype(str).replace('', UNKNOWN_PARTITION)
+        return pd.DataFrame({
+            'year': dates.dt.year.map('{:04d}'.format),
+            'month': dates.dt.month.map('{:02d}'.format),
+            'venue': venues.to_numpy()
+        }, index=df.index)
+
+    def write_partitions(self, df: pd.DataFrame, root: Path):
+        """year=/month=/venue= のディレクトリ構成で書き出す（追記時も既存ファイルを上書きしない）"""
+        token = f"{time.time_ns():x}"
+        keys = self.partition_keys(df)
+        for values, index in keys.groupby(list(PARTITION_KEYS), sort=True).groups.items():
+            partition_dir = root.joinpath(*(f"{key}={value}" for key, value in zip(PARTITION_KEYS, values)))
+            partition_dir.mkdir(parents=True, exist_ok=True)
+            self.write_file(df.loc[index].reset_index(drop=True), partition_dir / f"part-{token}{self.extension}")
+
+    def open_stream(self, output_path: Path, name: str) -> 'DatasetStream':
+        """チャンクごとに書き出すストリームを開く（既存の出力は置き換える）"""
+        target = self.target(output_path, name)
+        if self.partition_columns:
+            if target.exists():
+                shutil.rmtree(target)
+            return PartitionStream(self, target)
+        return self.file_stream(target)
+
+    def file_stream(self, path: Path) -> 'DatasetStream':
+        raise NotImplementedError
+
+    def write_file(self, df: pd.DataFrame, path: Path):
+        raise NotImplementedError
+
+    def read_file(self, path: Path, **kwargs) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def read_batches(self, path: Path) -> Iterator:
+        """ファイルを書き出したときの単位（行グループ・レコードバッチ）ごとにpyarrowのテーブルとして読み込む"""
+        raise NotImplementedError
+
+
+class DatasetStream:
+    """
+    チャンクごとに書き出すデータセット
+    2つ目以降のチャンクは最初のチャンクの列構成に揃える（ない列は欠損値、増えた列は書き出さない）
+    """
+
+    def __init__(self, writer: DatasetWriter, target: Path):
+        self.writer = writer
+        self.target = target
+        self.columns: Optional[List[str]] = None
+        self.rows = 0
+
+    def write(self, df: pd.DataFrame):
+        """1チャンク分を書き出す"""
+        if self.columns is None:
+            self.columns = list(df.columns)
+            self.open(df)
+        elif list(df.columns) != self.columns:
+            df = df.reindex(columns=self.columns)
+        self.write_chunk(df.reset_index(drop=True))
+        self.rows += len(df)
+
+    def open(self, df: pd.DataFrame):
+        """最初のチャンクの前に出力先を準備"""
+
+    def write_chunk(self, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def close(self) -> Path:
+        """ストリームを閉じて出力先を返す"""
+        return self.target
+
+
+class PartitionStream(DatasetStream):
+    """パーティション分割した出力（チャンクごとに各パーティションへ新しいパートファイルを追加）"""
+
+    def write_chunk(self, df: pd.DataFrame):
+        self.writer.write_partitions(df, self.target)
+
+
+class CsvStream(DatasetStream):
+    """CSVの末尾にチャンクを追記（圧縮時は圧縮ストリームを連結する）"""
+
+    def open(self, df: pd.DataFrame):
+        if self.writer.compression == 'zip':
+            raise ValueError("ZIP圧縮のCSVはストリーミング出力に対応していません")
+
+    def write_chunk(self, df: pd.DataFrame):
+        if self.rows == 0:
+            self.writer.write_file(df, self.target)
+        else:
+            df.to_csv(self.target, mode='a', header=False, index=False, encoding='utf-8',
+                      compression=self.writer.compression)
+
+
+class ArrowStream(DatasetStream):
+    """
+    Parquet（行グループ）・Feather（レコードバッチ）のファイルを開いたままチャンクを書き出す
+    category列はチャンクごとにカテゴリを追加していき、辞書の差分だけを書き出す
+    後のチャンクで既存のカテゴリより前に並ぶ値が現れた場合は、閉じるときに一括の書き出しと同じ昇順のカテゴリで書き直す
+    （カテゴリのコードを一括の書き出しと揃えるため）
+    """
+
+    def __init__(self, writer: DatasetWriter, target: Path, open_writer):
+        super().__init__(writer, target)
+        # (パス, スキーマ) → pyarrowのライター
+        self.open_writer = open_writer
+        self.arrow_writer = None
+        self.schema = None
+        self.categories: Dict[str, List] = {}
+
+    def open(self, df: pd.DataFrame):
+        import pyarrow as pa
+
+        # チャンクによってカテゴリ数が変わっても同じスキーマになるよう、辞書のインデックスは32bitに揃える
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        self.schema = pa.schema([
+            pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+            if pa.types.is_dictionary(field.type) else field
+            for field in schema
+        ], metadata=schema.metadata)
+        self.arrow_writer = self.open_writer(self.target, self.schema)
+
+    def write_chunk(self, df: pd.DataFrame):
+        import pyarrow as pa
+
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                known = self.categories.setdefault(col, [])
+                seen = set(known)
+                known.extend(value for value in df[col].cat.categories if value not in seen)
+                df[col] = df[col].cat.set_categories(known)
+        self.arrow_writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+
+    def close(self) -> Path:
+        if self.arrow_writer is not None:
+            self.arrow_writer.close()
+            self.arrow_writer = None
+            if any(known != sorted(known) for known in self.categories.values()):
+                self.rewrite_sorted()
+        return self.target
+
+    def rewrite_sorted(self):
+        """category列のカテゴリを昇順にして、チャンクごとに一時ファイルへ書き直してから置き換える"""
+        import pyarrow as pa
+
+        categories = {col: sorted(known) for col, known in self.categories.items()}
+        tmp_path = self.target.with_name(f'{self.target.name}.{os.getpid()}.tmp')
+        arrow_writer = self.open_writer(tmp_path, self.schema)
+        try:
+            for table in self.writer.read_batches(self.target):
+                df = table.to_pandas()
+                for col, values in categories.items():
+                    df[col] = df[col].cat.set_categories(values)
+                arrow_writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+        except BaseException:
+            arrow_writer.close()
+            tmp_path.unlink(missing_ok=True)
+            raise
+        arrow_writer.close()
+        os.replace(tmp_path, self.target)
+
+
+class CsvWriter(DatasetWriter):
+    """UTF-8（BOM付き）CSV"""
+
+    extension = '.csv'
+
+    def write_file(self, df: pd.DataFrame, path: Path):
+        df.to_csv(path, index=False, encoding='utf-8-sig', compression=self.compression)
+
+    def append(self, df: pd.DataFrame, output_path: Path, name: str) -> Path:
+        """列構成が同じ前提でCSVの末尾に追記"""
+        target = self.target(output_path, name)
+        if self.partition_columns or self.compression:
+            return super().append(df, output_path, name)
+        df.to_csv(target, mode='a', header=False, index=False, encoding='utf-8')
+        return target
+
+    def read_file(self, path: Path, **kwargs) -> pd.DataFrame:
+        return pd.read_csv(path, encoding='utf-8-sig', compression=self.compression, **kwargs)
+
+    def file_stream(self, path: Path) -> DatasetStream:
+        return CsvStream(self, path)
+
+
+class ParquetWriter(DatasetWriter):
+    """Parquet（列指向・型情報を保持、述語プッシュダウン対応）"""
+
+    extension = '.parquet'
+
+    def __init__(self, compression: Optional[str] = 'snappy',
+                 partition_columns: Optional[Tuple[str, str]] = None):
+        require_pyarrow()
+        super().__init__(compression, partition_columns)
+
+    def write_file(self, df: pd.DataFrame, path: Path):
+        df.to_parquet(path, engine='pyarrow', compression=self.compression, index=False)
+
+    def read_file(self, path: Path, columns: Optional[Sequence[str]] = None,
+                  filters: Optional[List[tuple]] = None, **kwargs) -> pd.DataFrame:
+        # filters はpyarrowの述語（例: [('レース番号', 'in', [1, 2])]）で、一致しない行グループは読み飛ばす
+        return pd.read_parquet(path, engine='pyarrow', columns=columns, filters=filters)
+
+    def read_batches(self, path: Path) -> Iterator:
+        import pyarrow.parquet as pq
+
+        with pq.ParquetFile(path) as parquet_file:
+            for index in range(parquet_file.num_row_groups):
+                yield parquet_file.read_row_group(index)
+
+    def file_stream(self, path: Path) -> DatasetStream:
+        import pyarrow.parquet as pq
+
+        return ArrowStream(self, path, lambda target, schema: pq.ParquetWriter(
+            target, schema, compression=self.compression))
+
+
+class FeatherWriter(DatasetWriter):
+    """Feather（Arrow IPC、高速な読み書き）"""
+
+    extension = '.feather'
+
+    def __init__(self, compression: Optional[str] = 'zstd',
+                 partition_columns: Optional[Tuple[str, str]] = None):
+        require_pyarrow()
+        super().__init__(compression, partition_columns)
+
+    def write_file(self, df: pd.DataFrame, path: Path):
+        df.reset_index(drop=True).to_feather(path, compression=self.compression)
+
+    def read_file(self, path: Path, columns: Optional[Sequence[str]] = None, **kwargs) -> pd.DataFrame:
+        return pd.read_feather(path, columns=columns)
+
+    def read_batches(self, path: Path) -> Iterator:
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+
+        with pa.memory_map(str(path)) as source:
+            reader = ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield pa.Table.from_batches([reader.get_batch(index)])
+
+    def file_stream(self, path: Path) -> DatasetStream:
+        import pyarrow.ipc as ipc
+
+        options = ipc.IpcWriteOptions(compression=self.compression, emit_dictionary_deltas=True)
+        return ArrowStream(self, path, lambda target, schema: ipc.new_file(target, schema, options=options))
+
+
+WRITERS: Dict[str, type] = {
+    'csv': CsvWriter,
+    'parquet': ParquetWriter,
+    'feather': FeatherWriter
+}
+
+
+def get_writer(output_format: str = 'csv', compression: Optional[str] = None,
+               partition_columns: Optional[Tuple[str, str]] = None) -> DatasetWriter:
+    """出力形式名からライターを作成（compression=None は形式ごとの既定値）"""
+    if output_format not in WRITERS:
+        raise ValueError(f"未対応の出力形式: {output_format} (対応形式: {', '.join(WRITERS)})")
+    writer_class = WRITERS[output_format]
+    if compression is None:
+        return writer_class(partition_columns=partition_columns)
+    return writer_class(compression, partition_columns)
@@ -0,0 +1,26 @@
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.synthetic import SyntheticKFileGenerator
+
+
+def write_kfiles(output_dir: Path, days: int = 2, venues_per_day: int = 3, seed: int = 0,
+                 program_dir: Optional[Path] = None):
+    """合成K-file（kekkaf/YYYYMM/KYYMMDD.TXT、program_dir を指定すると同じ出走選手のB-fileも）を書き出す"""
+    return SyntheticKFileGenerator(seed=seed).write_archive(
+        str(output_dir), date(2024, 1, 1), days=days, venues_per_day=venues_per_day,
+        program_dir=str(program_dir) if program_dir is not None else None)
+
+
+@pytest.fixture(scope='session')
+def kfile_dir(tmp_path_factory) -> Path:
+    """2日 x 3会場 x 12レースの合成K-file"""
+    output_dir = tmp_path_factory.mktemp('kekkaf')
+    write_kfiles(output_dir)
+    return output_dir
@@ -0,0 +1,17 @@
+import pandas as pd
+
+from src.archive_index import ArchiveIndex
+from src.boat_race_analyzer import BoatRaceAnalyzer
+
+
+def test_index_reads_match_a_direct_parse(kfile_dir, tmp_path):
+    index = ArchiveIndex.load(ArchiveIndex.build(kfile_dir).save(tmp_path / 'index.json'))
+    assert index.summary() == {'files': 2, 'sections': 6, 'races': 72}
+
+    venue = next(index.query()).venue_code
+    for filters in ({}, {'venues': [venue], 'race_numbers': [1, 7, 12]}, {'start_date': '2024-01-02'}):
+        indexed, direct = BoatRaceAnalyzer(), BoatRaceAnalyzer()
+        indexed.process_index(index, **filters)
+        direct.process_files(str(kfile_dir), **filters)
+        pd.testing.assert_frame_equal(indexed.get_human_readable_data(), direct.get_human_readable_data())
+        pd.testing.assert_frame_equal(indexed.get_odds_data(), direct.get_odds_data())
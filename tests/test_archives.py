@@ -0,0 +1,50 @@
+import zipfile
+
+import pandas as pd
+
+from src.boat_race_analyzer import BoatRaceAnalyzer
+from src.manifest import IngestManifest
+from src.writers import get_writer
+
+from conftest import write_kfiles
+
+SORT_KEYS = ['日付', 'レース場コード', 'レース番号', '選手ナンバー']
+
+
+def pack_monthly_archive(kfile_dir, archive_path):
+    """K-fileを1つのZIP（日付を含まない名前）にまとめる"""
+    with zipfile.ZipFile(archive_path, 'w') as archive:
+        for file_path in sorted(kfile_dir.rglob('K*.TXT')):
+            archive.write(file_path, file_path.name)
+
+
+def saved_records(analyzer, output_dir):
+    df = analyzer.read_human_readable_data(get_writer('csv'), output_dir)
+    return df.sort_values(SORT_KEYS).reset_index(drop=True)
+
+
+def test_changed_archive_replaces_member_dates(tmp_path):
+    archive_dir = tmp_path / 'downloads'
+    archive_dir.mkdir()
+    archive_path = archive_dir / 'rest-2024-01.zip'
+    output_dir = tmp_path / 'output'
+    write_kfiles(tmp_path / 'before', seed=0)
+    write_kfiles(tmp_path / 'after', seed=1)
+
+    pack_monthly_archive(tmp_path / 'before', archive_path)
+    first = BoatRaceAnalyzer()
+    manifest = IngestManifest.for_output_dir(output_dir)
+    assert first.process_files(str(archive_dir), archives=True, manifest=manifest) == 2
+    first.save_analysis_results(str(output_dir), manifest=manifest)
+
+    # 内容の変わったアーカイブを取り込み直すと、メンバーの日付のレコードが置き換わる
+    pack_monthly_archive(tmp_path / 'after', archive_path)
+    second = BoatRaceAnalyzer()
+    manifest = IngestManifest.for_output_dir(output_dir)
+    assert second.process_files(str(archive_dir), archives=True, manifest=manifest) == 2
+    second.save_analysis_results(str(output_dir), manifest=manifest)
+
+    full = BoatRaceAnalyzer()
+    full.process_files(str(archive_dir), archives=True)
+    expected = full.get_human_readable_data().sort_values(SORT_KEYS).reset_index(drop=True)
+    pd.testing.assert_frame_equal(saved_records(second, output_dir), expected, check_dtype=False, check_categorical=False)
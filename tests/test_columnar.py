@@ -0,0 +1,23 @@
+import pytest
+
+from src.columnar import ColumnarRecordBuffer
+
+SCHEMA = [('日付', 'str'), ('レース番号', 'int'), ('展示タイム', 'float')]
+
+
+def test_failed_append_keeps_columns_aligned():
+    buffer = ColumnarRecordBuffer(SCHEMA)
+    buffer.append_row(('2024-01-01', 1, 6.71))
+    # 2列目（int）で失敗しても、1列目に追加した値は取り消される
+    with pytest.raises(TypeError):
+        buffer.append_row(('2024-01-02', None, 6.80))
+    with pytest.raises(ValueError):
+        buffer.append_row(('2024-01-02', 2))
+    buffer.append_row(('2024-01-03', 3, 6.90))
+
+    assert len(buffer) == 2
+    assert {len(column) for column in buffer.columns.values()} == {2}
+    assert list(buffer) == [
+        {'日付': '2024-01-01', 'レース番号': 1, '展示タイム': 6.71},
+        {'日付': '2024-01-03', 'レース番号': 3, '展示タイム': 6.90}
+    ]
@@ -0,0 +1,29 @@
+from src.discovery import iter_bfiles, iter_kfiles
+
+
+def touch(root, *names):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+
+def test_discovery_finds_every_file_in_date_order(kfile_dir):
+    names = [path.name for path in iter_kfiles(kfile_dir)]
+    assert names == ['K240101.TXT', 'K240102.TXT']
+    assert [path.name for path in iter_kfiles(kfile_dir, start_date='2024-01-02')] == ['K240102.TXT']
+
+
+def test_discovery_spans_years_and_ignores_case(tmp_path):
+    # 年・年月フォルダにまたがり、ファイル名の大文字小文字も揃っていないアーカイブ
+    touch(tmp_path, '2023/202312/K231230.TXT', '2023/202312/k231231.txt', '2024/202401/K240101.TXT',
+          '2024/202401/k240102.Txt', '2024/202402/K240201.TXT', '2025/K250101.TXT', '2024/202401/B240101.TXT',
+          '2024/202401/readme.txt', '2024/202401/K240101.TXT.bak')
+
+    assert [path.name for path in iter_kfiles(tmp_path)] == [
+        'K231230.TXT', 'k231231.txt', 'K240101.TXT', 'k240102.Txt', 'K240201.TXT', 'K250101.TXT']
+    # 年をまたぐ期間（範囲外の年・年月フォルダは走査しない）
+    assert [path.name for path in iter_kfiles(tmp_path, '2023-12-31', '2024-01-31')] == [
+        'k231231.txt', 'K240101.TXT', 'k240102.Txt']
+    assert [path.name for path in iter_kfiles(tmp_path, start_date='2024-02-01')] == ['K240201.TXT', 'K250101.TXT']
+    assert [path.name for path in iter_bfiles(tmp_path)] == ['B240101.TXT']
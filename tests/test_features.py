@@ -0,0 +1,36 @@
+import numpy as np
+
+from src.boat_race_analyzer import BoatRaceAnalyzer
+from src.features import ODDS_PREFIX, RACE_KEY_COLUMNS, RACE_RELATIVE_FEATURES, add_race_relative_features
+
+
+def test_fitted_transformer_fixes_odds_columns(kfile_dir):
+    training = BoatRaceAnalyzer()
+    training.process_files(str(kfile_dir))
+    batch = BoatRaceAnalyzer()
+    batch.process_files(str(kfile_dir), max_files=1)
+
+    for train_bet_types, batch_bet_types in ((None, None), (None, ['single']), (['single'], None)):
+        train_df = training.get_ml_ready_data(train_bet_types)
+        transformer = training.feature_transformer
+        batch_df = batch.get_ml_ready_data(batch_bet_types, transformer=transformer)
+        # 推論バッチに出現しない組番・学習時にない券種があっても、列構成は学習時と同じになる
+        assert list(batch_df.columns) == list(train_df.columns)
+        assert any(col.startswith(ODDS_PREFIX) for col in batch_df.columns)
+
+
+def test_race_relative_features_match_a_per_race_loop(kfile_dir):
+    analyzer = BoatRaceAnalyzer()
+    analyzer.process_files(str(kfile_dir))
+    df = analyzer.get_human_readable_data()
+    result = add_race_relative_features(df.copy())
+
+    for _, race in df.groupby(RACE_KEY_COLUMNS):
+        for col in RACE_RELATIVE_FEATURES:
+            values = race[col]
+            # 欠損値は順位・差ともに欠損、同じ値は同順位（最小の順位）
+            for i, value in values.items():
+                expected_rank = (values < value).sum() + 1 if not np.isnan(value) else np.nan
+                np.testing.assert_equal(result.at[i, f'{col}_レース内順位'], expected_rank)
+            np.testing.assert_allclose(result.loc[race.index, f'{col}_レース平均差'], values - values.mean())
+            np.testing.assert_allclose(result.loc[race.index, f'{col}_最良差'], values - values.min())
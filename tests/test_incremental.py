@@ -0,0 +1,43 @@
+import pandas as pd
+
+from src.boat_race_analyzer import ML_READY_NAME, BoatRaceAnalyzer
+from src.manifest import IngestManifest
+from src.writers import get_writer
+
+from conftest import write_kfiles
+
+RACE_KEYS = ['日付', 'レース場コード', 'レース番号']
+
+
+def saved_outputs(output_dir):
+    analyzer, writer = BoatRaceAnalyzer(), get_writer('csv')
+    human_df = analyzer.read_human_readable_data(writer, output_dir)
+    odds_df = analyzer.read_odds_data(writer, output_dir)
+    return (human_df.sort_values(RACE_KEYS + ['選手ナンバー']).reset_index(drop=True),
+            odds_df.sort_values(RACE_KEYS + ['券種', '組番']).reset_index(drop=True))
+
+
+def ingest(kfile_dir, output_dir, manifest=None):
+    analyzer = BoatRaceAnalyzer()
+    processed_count = analyzer.process_files(str(kfile_dir), manifest=manifest)
+    analyzer.save_analysis_results(str(output_dir), manifest=manifest)
+    return processed_count
+
+
+def test_incremental_output_equals_full_run(tmp_path):
+    kfile_dir = tmp_path / 'kekkaf'
+    incremental_dir, full_dir = tmp_path / 'incremental', tmp_path / 'full'
+
+    write_kfiles(kfile_dir, days=2)
+    assert ingest(kfile_dir, incremental_dir, IngestManifest.for_output_dir(incremental_dir)) == 2
+    # 同じ乱数シードで日数を増やすと、既存の2日分は同じ内容で書き直される（更新時刻のみ変わる）
+    write_kfiles(kfile_dir, days=4)
+    assert ingest(kfile_dir, incremental_dir, IngestManifest.for_output_dir(incremental_dir)) == 2
+    assert ingest(kfile_dir, incremental_dir, IngestManifest.for_output_dir(incremental_dir)) == 0
+
+    ingest(kfile_dir, full_dir)
+    for incremental_df, full_df in zip(saved_outputs(incremental_dir), saved_outputs(full_dir)):
+        pd.testing.assert_frame_equal(incremental_df, full_df)
+    # 機械学習用形式は全期間で正規化し直す
+    ml_dfs = [get_writer('csv').read(output_dir, ML_READY_NAME) for output_dir in (incremental_dir, full_dir)]
+    pd.testing.assert_frame_equal(*(df.sort_values(RACE_KEYS + ['選手ナンバー']).reset_index(drop=True) for df in ml_dfs))
@@ -0,0 +1,98 @@
+from src.kfile_parser import (
+    BYTE_PATTERNS, KFILE_ENCODING, TEXT_PATTERNS, KFileParser, OddsEntry, RACER_PATH_FIXED, RACER_PATH_REGEX, RACER_PATH_UNMATCHED, SectionFilter,
+    VENUE_MAPPING, iter_mmap_lines
+)
+
+
+def test_race_lines_are_not_counted_as_unmatched_racer_lines(kfile_dir):
+    # 10R～12Rの見出し・着順サマリーの行は2桁の数字で始まるが、選手行として照合しない
+    for use_mmap in (False, True):
+        parser = KFileParser(VENUE_MAPPING, use_mmap=use_mmap)
+        for file_path in sorted(kfile_dir.rglob('K*.TXT')):
+            parsed = parser.parse_file(file_path)
+            assert parsed.racer_line_counts()[RACER_PATH_UNMATCHED] == 0
+            assert all(len(section.race_results) == 12 for section in parsed.sections)
+
+
+def test_fixed_column_and_regex_racer_paths_agree(kfile_dir):
+    parser = KFileParser(VENUE_MAPPING, use_mmap=True)
+    regex_patterns = BYTE_PATTERNS._replace(fixed_columns=False)
+    for file_path in sorted(kfile_dir.rglob('K*.TXT')):
+        fixed = parser.parse(iter_mmap_lines(file_path), None, BYTE_PATTERNS)
+        regex = parser.parse(iter_mmap_lines(file_path), None, regex_patterns)
+        text = KFileParser(VENUE_MAPPING).parse_file(file_path)
+
+        assert [section.racers for section in fixed.sections] == [section.racers for section in regex.sections]
+        assert [section.racers for section in fixed.sections] == [section.racers for section in text.sections]
+        fixed_counts, regex_counts = fixed.racer_line_counts(), regex.racer_line_counts()
+        assert fixed_counts[RACER_PATH_FIXED] > 0 and fixed_counts[RACER_PATH_REGEX] == 0
+        assert regex_counts[RACER_PATH_REGEX] == fixed_counts[RACER_PATH_FIXED]
+
+
+def test_records_are_tagged_with_their_own_venue_section(kfile_dir):
+    parser = KFileParser(VENUE_MAPPING)
+    for file_path in sorted(kfile_dir.rglob('K*.TXT')):
+        text = file_path.read_text(encoding='shift_jis')
+        parsed = parser.parse_file(file_path)
+        assert len({section.venue_code for section in parsed.sections}) == len(parsed.sections) == 3
+        for section in parsed.sections:
+            assert section.venue_name == VENUE_MAPPING[section.venue_code]
+            # 選手行はそのセクションの区切り行の間にある
+            body = text[text.index(f'{section.venue_code}KBGN'):text.index(f'{section.venue_code}KEND')]
+            assert section.racers and all(str(racer.racer_id) in body for racer in section.racers)
+
+
+def test_section_filter_matches_filtering_a_full_parse(kfile_dir):
+    for use_mmap in (False, True):
+        parser = KFileParser(VENUE_MAPPING, use_mmap=use_mmap)
+        for file_path in sorted(kfile_dir.rglob('K*.TXT')):
+            full = parser.parse_file(file_path)
+            venue_code = full.sections[1].venue_code
+            filtered = parser.parse_file(file_path, SectionFilter({venue_code}, {1, 12}))
+
+            section, = filtered.sections
+            expected = full.sections[1]
+            assert section.venue_code == venue_code
+            assert section.racers == [racer for racer in expected.racers if racer.race_number in (1, 12)]
+            assert all(section.race_results[number] == expected.race_results[number] for number in (1, 12))
+            assert section.odds == {number: expected.odds[number] for number in (1, 12)}
+            # 対象外の会場・レースの選手行は照合しない（2レース x 6艇）
+            assert sum(filtered.racer_line_counts().values()) == 2 * 6
+
+
+def test_payout_lines_are_labelled_by_bet_type():
+    parser = KFileParser(VENUE_MAPPING)
+    lines = ['単勝     3        1230', '複勝     3         240  5         510',
+             '２連単   3-5      4560  人気   18', '3連複 1-3-5 2010 人気 7',
+             '拡連複   3-5       980  人気   11', '1-3      1290  人気   16', '１-３ 100', '12R 1-3']
+    for patterns, encode in ((TEXT_PATTERNS, str), (BYTE_PATTERNS, lambda line: line.encode(KFILE_ENCODING))):
+        previous, results = None, []
+        for line in lines:
+            previous, entries = parser.match_odds_line(encode(line), previous, patterns)
+            results.append(entries)
+        assert results == [
+            [OddsEntry('single', '3', 1230, 0)],
+            [OddsEntry('place', '3', 240, 0), OddsEntry('place', '5', 510, 0)],
+            [OddsEntry('exacta', '3-5', 4560, 18)],
+            [OddsEntry('trio', '1-3-5', 2010, 7)],
+            [OddsEntry('wide', '3-5', 980, 11)],
+            # 券種名のない継続行は直前の券種（拡連複）
+            [OddsEntry('wide', '1-3', 1290, 16)],
+            [], []
+        ]
+
+
+def test_every_race_has_one_payout_per_bet_type(kfile_dir):
+    expected_counts = {'single': 1, 'place': 2, 'exacta': 1, 'quinella': 1, 'wide': 3, 'trifecta': 1, 'trio': 1}
+    for use_mmap in (False, True):
+        parser = KFileParser(VENUE_MAPPING, use_mmap=use_mmap)
+        for file_path in sorted(kfile_dir.rglob('K*.TXT')):
+            for section in parser.parse_file(file_path).sections:
+                assert len(section.odds) == 12
+                for race_number, entries in section.odds.items():
+                    counts = {}
+                    for entry in entries:
+                        counts[entry.bet_type] = counts.get(entry.bet_type, 0) + 1
+                    assert counts == expected_counts
+                    trifecta, = (entry for entry in entries if entry.bet_type == 'trifecta')
+                    assert trifecta.combination == '-'.join(map(str, section.race_results[race_number]))
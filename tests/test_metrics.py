@@ -0,0 +1,11 @@
+from src.boat_race_analyzer import BoatRaceAnalyzer
+from src.metrics import SKIP_RACER_UNMATCHED
+
+
+def test_well_formed_files_report_no_unmatched_racer_lines(kfile_dir):
+    analyzer = BoatRaceAnalyzer()
+    analyzer.process_files(str(kfile_dir))
+    summary = analyzer.metrics.summary()
+    assert summary['files'] == 2 and summary['errors'] == 0
+    assert SKIP_RACER_UNMATCHED not in summary['skipped']
+    assert summary['counts']['racers'] == len(analyzer.race_data)
@@ -0,0 +1,32 @@
+from src.kfile_parser import KFileParser, RACER_PATH_FIXED, RACER_PATH_REGEX, SectionFilter, VENUE_MAPPING
+from src.parse_cache import ParseCache
+
+
+def test_cached_result_equals_fresh_parse(kfile_dir, tmp_path):
+    cache = ParseCache(tmp_path / 'cache')
+    section_filter = SectionFilter({'01', '12', '24'}, {11, 12})
+    for file_path in sorted(kfile_dir.rglob('K*.TXT')):
+        for current_filter in (None, section_filter):
+            fresh = KFileParser(VENUE_MAPPING).parse_file(file_path, current_filter)
+            parser = KFileParser(VENUE_MAPPING, cache=cache)
+            assert not parser.parse_file(file_path, current_filter).cached
+            cached = parser.parse_file(file_path, current_filter)
+            assert cached.cached
+            assert cached.sections == fresh.sections
+    assert cache.stats()['hits'] == cache.stats()['misses'] == 4
+
+
+def test_cache_key_depends_on_parsing_mode(kfile_dir, tmp_path):
+    cache = ParseCache(tmp_path / 'cache')
+    file_path = sorted(kfile_dir.rglob('K*.TXT'))[0]
+    data = file_path.read_bytes()
+    text_parser = KFileParser(VENUE_MAPPING, cache=cache)
+    mmap_parser = KFileParser(VENUE_MAPPING, use_mmap=True, cache=cache)
+    assert cache.key(text_parser, data) != cache.key(mmap_parser, data)
+
+    # キャッシュがある状態でモードを切り替えても、そのモードの解析経路の行数を返す
+    assert text_parser.parse_file(file_path).racer_line_counts()[RACER_PATH_REGEX] > 0
+    parsed = mmap_parser.parse_file(file_path)
+    assert not parsed.cached
+    assert parsed.racer_line_counts()[RACER_PATH_FIXED] > 0
+    assert parsed.racer_line_counts()[RACER_PATH_REGEX] == 0
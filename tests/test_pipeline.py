@@ -0,0 +1,30 @@
+import pandas as pd
+
+from src.boat_race_analyzer import BoatRaceAnalyzer
+from src.manifest import IngestManifest
+
+
+def ingested_frames(kfile_dir, expected_count=2, **kwargs):
+    analyzer = BoatRaceAnalyzer()
+    assert analyzer.process_files(str(kfile_dir), **kwargs) == expected_count
+    return analyzer.get_human_readable_data(), analyzer.get_odds_data()
+
+
+def test_parallel_ingest_equals_serial(kfile_dir):
+    # プロセスプールで解析しても、ファイル順にマージした結果は逐次処理と同じ
+    for parallel_df, serial_df in zip(ingested_frames(kfile_dir, parallel=True, max_workers=2),
+                                      ingested_frames(kfile_dir)):
+        pd.testing.assert_frame_equal(parallel_df, serial_df)
+
+
+def test_async_ingest_equals_serial(kfile_dir, tmp_path):
+    serial = ingested_frames(kfile_dir)
+    for options in ({'files_in_flight': 1}, {'files_in_flight': 4}, {'parallel': True, 'max_workers': 2}):
+        for async_df, serial_df in zip(ingested_frames(kfile_dir, async_io=True, **options), serial):
+            pd.testing.assert_frame_equal(async_df, serial_df)
+
+    # マニフェストには取り込んだファイルを記録し、次回は読み飛ばす
+    manifest = IngestManifest.for_output_dir(tmp_path)
+    ingested_frames(kfile_dir, async_io=True, manifest=manifest)
+    assert manifest.total_records() == len(serial[0])
+    ingested_frames(kfile_dir, 0, async_io=True, manifest=manifest)
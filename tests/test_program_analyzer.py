@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from src.boat_race_analyzer import BoatRaceAnalyzer
+from src.program_analyzer import RESULT_COLUMNS, BoatRaceProgramAnalyzer
+
+from conftest import write_kfiles
+
+JOIN_KEYS = ['日付', 'レース場コード', 'レース番号', '選手ナンバー']
+
+
+def test_hash_join_matches_a_merge_on_race_and_boat(tmp_path):
+    kfile_dir, bfile_dir = tmp_path / 'kekkaf', tmp_path / 'bangumi'
+    write_kfiles(kfile_dir, program_dir=bfile_dir)
+    program = BoatRaceProgramAnalyzer()
+    assert program.process_files(str(bfile_dir)) == 2
+
+    for max_files in (None, 1):
+        results = BoatRaceAnalyzer()
+        results.process_files(str(kfile_dir), max_files=max_files)
+        joined = program.join_results(results)
+
+        results_df = results.get_human_readable_data()
+        expected = program.get_program_data().merge(
+            results_df[JOIN_KEYS + ['レーサーID'] + list(RESULT_COLUMNS)].rename(columns={'レーサーID': '成績レーサーID'}),
+            on=JOIN_KEYS, how='left')
+        matched = expected['成績レーサーID'].notna().to_numpy()
+        # 同じ出走選手の番組表なので、成績のある行はレーサーIDも一致する
+        assert (expected.loc[matched, '成績レーサーID'] == expected.loc[matched, 'レーサーID']).all()
+        assert matched.sum() == len(results_df)
+        for name, missing in RESULT_COLUMNS.items():
+            np.testing.assert_array_equal(joined.loc[matched, name].to_numpy(dtype=object),
+                                          expected.loc[matched, name].to_numpy(dtype=object))
+            # 成績のない選手行は欠損値（着順は0、レースタイムは空文字）
+            unmatched = joined.loc[~matched, name]
+            assert (unmatched.isna() if isinstance(missing, float) else unmatched == missing).all()
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from src.boat_race_analyzer import BoatRaceAnalyzer
+
+
+def test_held_query_results_do_not_block_ingest(kfile_dir):
+    file_paths = sorted(kfile_dir.rglob('K*.TXT'))
+    analyzer = BoatRaceAnalyzer()
+    assert analyzer.process_single_file(file_paths[0])
+    # 検索結果・生の列を保持したまま次のファイルを取り込む
+    held = [analyzer.query().where(race_numbers=[12]).collect(),
+            analyzer.query().select('レース番号').limit(5).collect(),
+            analyzer.race_data.raw_column('レース番号')]
+    assert analyzer.process_single_file(file_paths[1])
+
+    buffer = analyzer.race_data
+    assert {len(column) for column in buffer.columns.values()} == {len(buffer)}
+    full = BoatRaceAnalyzer()
+    full.process_files(str(kfile_dir))
+    pd.testing.assert_frame_equal(analyzer.query().collect(), full.query().collect())
+    assert len(held[2]) < len(buffer)
+
+
+def test_query_filters_match_dataframe_filters(kfile_dir):
+    analyzer = BoatRaceAnalyzer()
+    analyzer.process_files(str(kfile_dir))
+    df = analyzer.get_human_readable_data()
+    venue = df['レース場コード'].iloc[0]
+    result = analyzer.query().where(venues=[venue], race_numbers=[1, 12]).collect()
+    expected = df[(df['レース場コード'] == venue) & df['レース番号'].isin([1, 12])].reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected, check_categorical=False)
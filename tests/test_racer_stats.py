@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.boat_race_analyzer import BoatRaceAnalyzer
+from src.racer_stats import RacerStatsStore
+
+
+@pytest.fixture(scope='module')
+def human_df(kfile_dir):
+    analyzer = BoatRaceAnalyzer()
+    analyzer.process_files(str(kfile_dir))
+    return analyzer.get_human_readable_data()
+
+
+def test_features_use_only_earlier_days(human_df):
+    features = RacerStatsStore().transform(human_df)
+    checked = 0
+    for i, row in human_df.iterrows():
+        # 同じ日・後の日のレースは含まない
+        earlier = human_df[(human_df['レーサーID'] == row['レーサーID']) & (human_df['日付'] < row['日付'])]
+        rated = earlier[earlier['最終着順'] > 0]
+        assert features.at[i, '選手_出走数'] == len(earlier)
+        expected_wins = (rated['最終着順'] == 1).mean() if len(rated) else np.nan
+        np.testing.assert_equal(features.at[i, '選手_勝率'], expected_wins)
+        checked += len(earlier) > 0
+    assert checked > 0
+
+
+def test_incremental_updates_match_one_pass_and_reject_backfill(human_df):
+    first_day = human_df['日付'] == human_df['日付'].min()
+    incremental = RacerStatsStore()
+    parts = [incremental.transform(human_df[first_day]), incremental.transform(human_df[~first_day])]
+    one_pass = RacerStatsStore()
+    expected = one_pass.transform(human_df)
+    pd.testing.assert_frame_equal(pd.concat(parts, ignore_index=True),
+                                  pd.concat([expected[first_day.to_numpy()], expected[~first_day.to_numpy()]],
+                                            ignore_index=True))
+    assert incremental.to_dict() == one_pass.to_dict()
+
+    # 反映済みの日付のデータは受け付けず、統計量も変更しない
+    saved = incremental.to_dict()
+    with pytest.raises(ValueError):
+        incremental.transform(human_df)
+    assert incremental.to_dict() == saved
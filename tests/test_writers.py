@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from src.columnar import concat_frames
+from src.writers import get_writer
+
+
+def chunk(venues, start):
+    return pd.DataFrame({
+        'レース場コード': pd.Series(venues).astype('category'),
+        'レース番号': range(start, start + len(venues))
+    })
+
+
+@pytest.mark.parametrize('output_format', ['parquet', 'feather'])
+def test_streamed_categories_match_eager_write(tmp_path, output_format):
+    pytest.importorskip('pyarrow')
+    writer = get_writer(output_format)
+    # 2つ目のチャンクに既存のカテゴリより前に並ぶ値（'01'）が現れる
+    chunks = [chunk(['12', '24', '12'], 1), chunk(['01', '12'], 4)]
+    stream = writer.open_stream(tmp_path, 'streamed')
+    for df in chunks:
+        stream.write(df)
+    stream.close()
+    writer.write(concat_frames(*chunks), tmp_path, 'eager')
+
+    streamed, eager = writer.read(tmp_path, 'streamed'), writer.read(tmp_path, 'eager')
+    assert list(streamed['レース場コード'].cat.categories) == ['01', '12', '24']
+    assert list(streamed['レース場コード'].cat.codes) == list(eager['レース場コード'].cat.codes)
+    pd.testing.assert_frame_equal(streamed, eager)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f'eager.{output_format}', f'streamed.{output_format}']